@@ -213,6 +213,7 @@ class All2All(nn_units.NNLayerBase):
                 assert self.bias.size == self.neurons_number
 
         self._create_output()
+        self.cast_to_storage()
         self.init_vectors(self.input, self.output, self.weights, self.bias)
 
     def _create_output(self):
@@ -291,9 +292,10 @@ class All2All(nn_units.NNLayerBase):
         self.input.map_read()
         self.weights.map_read()
         self.bias.map_read()
-        mem = numpy.dot(self.input.matrix,
-                        self.weights.mem if self.weights_transposed
-                        else self.weights.mem.transpose())
+        weights = nn_units.upcast_half(self.weights.mem)
+        mem = numpy.dot(nn_units.upcast_half(self.input.matrix),
+                        weights if self.weights_transposed
+                        else weights.transpose())
         if self.include_bias:
             mem += self.bias.mem
         reshape(self.output.mem, mem.shape)[:] = mem[:]
@@ -180,6 +180,7 @@ class Conv(ConvolutionalBase, nn_units.NNLayerBase):
         assert self._kernel_app_per_image * self.n_kernels == \
             self.output.sample_size
 
+        self.cast_to_storage()
         self.init_vectors(self.input, self.output, self.weights, self.bias)
 
     def _gpu_init(self, blas_class):
@@ -325,8 +326,9 @@ class Conv(ConvolutionalBase, nn_units.NNLayerBase):
         nx = (sx_full - self.kx) // self.sliding[0] + 1
         ny = (sy_full - self.ky) // self.sliding[1] + 1
 
-        weights = (reshape_transposed(self.weights.mem)
-                   if self.weights_transposed else self.weights.mem)
+        weights = nn_units.upcast_half(
+            reshape_transposed(self.weights.mem)
+            if self.weights_transposed else self.weights.mem)
 
         assert self.kx >= 0 and self.ky >= 0
         for batch, _ in ((batch, ch)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Compressed sparse row matrices for the bag-of-words inputs.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import numpy
+
+
+class CSRMatrix(object):
+    """Compressed sparse row matrix which supports the few operations
+    required by the sparse input pipelines without depending on scipy.
+
+    Attributes:
+        indptr: row i occupies indices[indptr[i]:indptr[i + 1]].
+        indices: column indices of the nonzero values.
+        values: the nonzero values.
+        shape: (rows number, columns number).
+    """
+    def __init__(self, indptr, indices, values, shape):
+        self.indptr = numpy.asarray(indptr, dtype=numpy.int64)
+        self.indices = numpy.asarray(indices, dtype=numpy.int64)
+        self.values = numpy.asarray(values)
+        self.shape = tuple(shape)
+        if len(self.indptr) != self.shape[0] + 1:
+            raise ValueError("indptr must have %d elements (got %d)" %
+                             (self.shape[0] + 1, len(self.indptr)))
+        if len(self.indices) != len(self.values):
+            raise ValueError("indices and values lengths differ")
+
+    @property
+    def nnz(self):
+        return len(self.values)
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def row_lengths(self):
+        return numpy.diff(self.indptr)
+
+    @property
+    def row_ids(self):
+        """The row index of each nonzero value.
+        """
+        return numpy.repeat(numpy.arange(self.shape[0]), self.row_lengths)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, rows):
+        """Gathers the specified rows into the new matrix.
+        """
+        rows = numpy.asarray(rows, dtype=numpy.int64)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        indptr = numpy.zeros(len(rows) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=indptr[1:])
+        gather = numpy.repeat(starts - indptr[:-1], lengths) + \
+            numpy.arange(indptr[-1])
+        return CSRMatrix(indptr, self.indices[gather], self.values[gather],
+                         (len(rows), self.shape[1]))
+
+    def squared_norms(self):
+        """Returns the squared L2 norm of each row.
+        """
+        return numpy.bincount(self.row_ids, self.values * self.values,
+                              minlength=self.shape[0]).astype(self.dtype)
+
+    def dot(self, dense):
+        """Multiplies by the dense (columns number, k) matrix.
+        """
+        out = numpy.zeros((self.shape[0], dense.shape[1]),
+                          dtype=numpy.result_type(self.dtype, dense.dtype))
+        nonempty = self.row_lengths > 0
+        if self.nnz:
+            out[nonempty] = numpy.add.reduceat(
+                dense[self.indices] * self.values[:, numpy.newaxis],
+                self.indptr[:-1][nonempty], axis=0)
+        return out
+
+    def transpose_dot(self, dense):
+        """Multiplies the transposed matrix by the dense (rows number, k)
+        matrix.
+        """
+        out = numpy.zeros((self.shape[1], dense.shape[1]),
+                          dtype=numpy.result_type(self.dtype, dense.dtype))
+        if not self.nnz:
+            return out
+        order = numpy.argsort(self.indices, kind="mergesort")
+        columns = self.indices[order]
+        starts = numpy.flatnonzero(numpy.diff(columns)) + 1
+        starts = numpy.concatenate(([0], starts))
+        out[columns[starts]] = numpy.add.reduceat(
+            dense[self.row_ids[order]] *
+            self.values[order, numpy.newaxis], starts, axis=0)
+        return out
+
+    def todense(self, out=None):
+        if out is None:
+            out = numpy.zeros(self.shape, dtype=self.dtype)
+        else:
+            out[:] = 0
+        out[self.row_ids, self.indices] = self.values
+        return out
+
+
+def read_csr(lines, has_ids=False, has_classes=True, chunk_size=1 << 20,
+             dtype=numpy.float32):
+    """Parses "[id] [label] feature:value ... " lines into
+    :class:`CSRMatrix`, converting chunk_size pairs at a time, so that
+    the whole file is never kept in memory. The columns are the sorted
+    distinct feature numbers.
+
+    :param lines: iterable over the lines as bytes, e.g. an opened file.
+    :return: (matrix, features, labels, ids).
+    """
+    lengths = []
+    labels = []
+    ids = []
+    features = []
+    values = []
+    chunk = []
+
+    def flush():
+        if not chunk:
+            return
+        pairs = numpy.fromstring(b" ".join(chunk).replace(b":", b" "),
+                                 sep=" ").reshape(-1, 2)
+        features.append(pairs[:, 0].astype(numpy.int64))
+        values.append(pairs[:, 1].astype(dtype))
+        del chunk[:]
+
+    for line in lines:
+        fields = line.split(b" ")
+        offset = 0
+        if has_ids:
+            ids.append(fields[offset].decode("charmap"))
+            offset += 1
+        if has_classes:
+            labels.append(int(fields[offset]))
+            offset += 1
+        # the last field is the line ending
+        pairs = fields[offset:-1]
+        lengths.append(len(pairs))
+        chunk.extend(pairs)
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    indptr = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+    numpy.cumsum(lengths, out=indptr[1:])
+    if features:
+        features, indices = numpy.unique(numpy.concatenate(features),
+                                         return_inverse=True)
+        values = numpy.concatenate(values)
+    else:
+        features = indices = numpy.zeros(0, dtype=numpy.int64)
+        values = numpy.zeros(0, dtype=dtype)
+    return (CSRMatrix(indptr, indices, values, (len(lengths), len(features))),
+            features, labels, ids)
@@ -50,6 +50,7 @@ from veles.workflow import NoMoreJobs
 from veles.loader import CLASS_NAME, TRAIN, VALID
 from veles.result_provider import IResultProvider
 from veles.unit_registry import MappedUnitRegistry
+from veles.znicz.shared_memory import share, unshare
 
 
 class DecisionsRegistry(MappedUnitRegistry):
@@ -125,6 +126,9 @@ class DecisionBase(Unit):
             of the epoch before it.
         train_improved (mutable.Bool): like "improved", but for train.
         snapshot_suffix: the suitable suffix for the snapshot file name.
+        shared_memory: pass the large arrays of the payloads through
+            the shared memory (the master and the slaves must run on
+            the same host), see :mod:`veles.znicz.shared_memory`.
 
         minibatch_class: from loader (must be set before initialize()!)
         last_minibatch: from loader (must be set before initialize()!)
@@ -145,6 +149,8 @@ class DecisionBase(Unit):
         self.train_improved = Bool(False)
         self.snapshot_suffix = ""
         self.epoch_timestamp = False
+        self.shared_memory = kwargs.get(
+            "shared_memory", getattr(workflow, "shared_memory", False))
         self.demand("last_minibatch", "minibatch_class",
                     "class_lengths", "epoch_number", "epoch_ended")
 
@@ -194,7 +200,7 @@ class DecisionBase(Unit):
     def generate_data_for_master(self):
         data = {}
         self.on_generate_data_for_master(data)
-        return data
+        return share(data) if self.shared_memory else data
 
     def generate_data_for_slave(self, slave):
         if self.complete:
@@ -203,23 +209,26 @@ class DecisionBase(Unit):
             self.epoch_timestamp = time.time()
         data = {}
         self.on_generate_data_for_slave(data)
-        return data
+        return share(data) if self.shared_memory else data
 
     def apply_data_from_master(self, data):
         self.complete <<= False
-        self.on_apply_data_from_master(data)
+        self.on_apply_data_from_master(unshare(data))
 
     def apply_data_from_slave(self, data, slave):
         if slave is None:
             # Partial update
             return
-        self.on_apply_data_from_slave(data, slave)
+        self.on_apply_data_from_slave(unshare(data), slave)
         if self.last_minibatch:
             self._on_last_minibatch()
         self.has_data_for_slave = not self.complete
 
     def drop_slave(self, slave):
-        pass
+        # the loader gives the dropped minibatch to another slave, so only
+        # make sure the jobs are still given out
+        self.debug("Dropped %s", slave.id)
+        self.has_data_for_slave = not self.complete
 
     def initialize_arrays(self, minibatch_array, arrays):
         if minibatch_array:
@@ -325,6 +334,15 @@ class DecisionGD(DecisionBase):
                          validation error.
         confusion_matrixes: confusion matrixes.
         minibatch_confusion_matrix: confusion matrix for a minibatch.
+        minibatch_confusion_coo: sparse confusion matrix for a minibatch
+            (:class:`veles.znicz.evaluator.SparseConfusionMatrix`), the slaves
+            send only its (predicted, true, count) triples.
+        confusion_top: if set, the slaves send only this number of the most
+            frequent entries and confusion_tops receive the most
+            frequent confusions of each epoch instead of the dense
+            confusion_matrixes being filled.
+        confusion_tops: (predicted, true, count) of the most frequent
+            confusions.
         minibatch_max_err_y_sum: maximum of backpropagated gradient
                                  for a minibatch.
         max_err_y_sums: maximums of backpropagated gradient.
@@ -356,6 +374,9 @@ class DecisionGD(DecisionBase):
 
         self.confusion_matrixes = [None] * 3
         self.minibatch_confusion_matrix = None  # memory.Array()
+        self.minibatch_confusion_coo = None
+        self.confusion_top = kwargs.get("confusion_top")
+        self.confusion_tops = [None] * 3
         self.max_err_y_sums = [0] * 3
         self.minibatch_max_err_y_sum = None  # memory.Array()
         self.demand("minibatch_size")
@@ -406,6 +427,14 @@ class DecisionGD(DecisionBase):
             self.minibatch_confusion_matrix.map_read()
             self.confusion_matrixes[minibatch_class][:] = (
                 self.minibatch_confusion_matrix.mem[:])
+        coo = self.minibatch_confusion_coo
+        if coo is not None:
+            if self.confusion_top:
+                self.confusion_tops[minibatch_class] = coo.top(
+                    self.confusion_top)
+            else:
+                self.confusion_matrixes[minibatch_class] = coo.todense(
+                    self.confusion_matrixes[minibatch_class])
 
         if self.minibatch_n_err:
             self.minibatch_n_err.map_read()
@@ -458,6 +487,11 @@ class DecisionGD(DecisionBase):
             if attrval is not None:
                 attrval.map_read()
                 data[attr] = attrval.mem
+        coo = self.minibatch_confusion_coo
+        if coo is not None:
+            data["minibatch_confusion_coo"] = (
+                coo.top(self.confusion_top, errors_only=False)
+                if self.confusion_top else coo.coo())
 
     def on_generate_data_for_slave(self, data):
         data["improved"] = bool(self.improved)
@@ -477,7 +511,15 @@ class DecisionGD(DecisionBase):
             numpy.maximum(self.minibatch_max_err_y_sum.mem,
                           data["minibatch_max_err_y_sum"],
                           self.minibatch_max_err_y_sum.mem)
-        if self.minibatch_confusion_matrix is not None:
+        coo = data.get("minibatch_confusion_coo")
+        if coo is not None and self.minibatch_confusion_coo is not None:
+            self.minibatch_confusion_coo.merge(coo)
+        elif coo is not None and self.minibatch_confusion_matrix:
+            self.minibatch_confusion_matrix.map_write()
+            predicted, true, counts = coo
+            numpy.add.at(self.minibatch_confusion_matrix.mem,
+                         (predicted, true), counts)
+        elif self.minibatch_confusion_matrix:
             self.minibatch_confusion_matrix.map_write()
             self.minibatch_confusion_matrix.mem += data[
                 "minibatch_confusion_matrix"]
@@ -521,6 +563,8 @@ class DecisionGD(DecisionBase):
                 continue
             vec.map_invalidate()
             vec.mem[:] = 0
+        if self.minibatch_confusion_coo is not None:
+            self.minibatch_confusion_coo.reset()
 
 
 class DecisionMSE(DecisionGD):
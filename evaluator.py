@@ -55,6 +55,92 @@ from veles.unit_registry import MappedUnitRegistry
 from veles.units import Unit, UnitCommandLineArgumentsRegistry
 
 
+class SparseConfusionMatrix(object):
+    """Confusion matrix in the coordinate format for the huge label
+    spaces: only the (predicted, true) pairs which occurred are stored.
+    The entries are compacted lazily, so add() and merge() are cheap.
+
+    Attributes:
+        size: the number of classes.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.reset()
+
+    def __len__(self):
+        self._compact()
+        return len(self._keys[0]) if self._keys else 0
+
+    def reset(self):
+        # predicted * size + true
+        self._keys = []
+        self._counts = []
+        self._compacted = True
+
+    def add(self, predicted, true, counts=None):
+        keys = numpy.asarray(predicted, dtype=numpy.int64) * self.size + \
+            numpy.asarray(true, dtype=numpy.int64)
+        if not len(keys):
+            return
+        if counts is None:
+            counts = numpy.ones(len(keys), dtype=numpy.int64)
+        self._keys.append(keys)
+        self._counts.append(numpy.asarray(counts, dtype=numpy.int64))
+        self._compacted = False
+
+    def merge(self, coo):
+        """Adds the (predicted, true, counts) triples returned by coo() or
+        top().
+        """
+        self.add(*coo)
+
+    def _compact(self):
+        if self._compacted:
+            return
+        keys, inverse = numpy.unique(numpy.concatenate(self._keys),
+                                     return_inverse=True)
+        counts = numpy.zeros(len(keys), dtype=numpy.int64)
+        numpy.add.at(counts, inverse, numpy.concatenate(self._counts))
+        self._keys = [keys]
+        self._counts = [counts]
+        self._compacted = True
+
+    def coo(self):
+        """
+        :return: (predicted, true, counts) int32 arrays.
+        """
+        self._compact()
+        if not self._keys:
+            empty = numpy.zeros(0, dtype=numpy.int32)
+            return empty, empty, empty
+        keys = self._keys[0]
+        return ((keys // self.size).astype(numpy.int32),
+                (keys % self.size).astype(numpy.int32),
+                self._counts[0].astype(numpy.int32))
+
+    def top(self, n, errors_only=True):
+        """
+        :return: (predicted, true, counts) of the n most frequent entries,
+            in the descending order of counts.
+        """
+        predicted, true, counts = self.coo()
+        if errors_only:
+            errors = predicted != true
+            predicted, true, counts = \
+                predicted[errors], true[errors], counts[errors]
+        order = numpy.argsort(-counts, kind="mergesort")[:n]
+        return predicted[order], true[order], counts[order]
+
+    def todense(self, out=None):
+        if out is None:
+            out = numpy.zeros((self.size, self.size), dtype=numpy.int32)
+        else:
+            out[:] = 0
+        predicted, true, counts = self.coo()
+        numpy.add.at(out, (predicted, true), counts)
+        return out
+
+
 class EvaluatorsRegistry(UnitCommandLineArgumentsRegistry,
                          MappedUnitRegistry):
     mapping = "evaluators"
@@ -78,6 +164,7 @@ class EvaluatorBase(AcceleratedUnit, TriviallyDistributable):
         kwargs["view_group"] = kwargs.get("view_group", "EVALUATOR")
         super(EvaluatorBase, self).__init__(workflow, **kwargs)
         self.mean = kwargs.get("mean", True)
+        self.loss_scale = kwargs.get("loss_scale", 1.0)
         self.err_output = Array()
         self._merged_output = Array()
         self.krn_constants_i_ = None
@@ -99,6 +186,26 @@ class EvaluatorBase(AcceleratedUnit, TriviallyDistributable):
             raise TypeError("mean must be boolean (got %s)" % type(value))
         self._mean = value
 
+    @property
+    def loss_scale(self):
+        """
+        :return: The multiplier of err_output which keeps small gradients
+        representable in half precision. Gradient descent units divide
+        their gradients by it. Default is 1.0.
+        """
+        return self._loss_scale
+
+    @loss_scale.setter
+    def loss_scale(self, value):
+        value = float(value)
+        if value <= 0:
+            raise ValueError("loss_scale must be positive (got %f)" % value)
+        self._loss_scale = value
+
+    @property
+    def err_output_multiplier(self):
+        return (1.0 / self.batch_size if self.mean else 1.0) * self.loss_scale
+
     @property
     def merged_output(self):
         assert self.testing
@@ -174,6 +281,9 @@ class EvaluatorSoftmax(EvaluatorBase):
         batch_size: number of elements in output to evaluate.
         confusion_matrix: confusion matrix for the output.
         compute_confusion_matrix: compute confusion matrix or not.
+        sparse_confusion_matrix: accumulate the confusion matrix in
+            confusion_coo instead of the dense confusion_matrix.
+        confusion_coo: :class:`SparseConfusionMatrix` or None.
         max_idx: indexes of element with maximum real value for each sample.
         max_err_output_sum: maximum of backpropagated error sum by sample.
     """
@@ -181,7 +291,10 @@ class EvaluatorSoftmax(EvaluatorBase):
         super(EvaluatorSoftmax, self).__init__(workflow, **kwargs)
         self.compute_confusion_matrix = kwargs.get(
             "compute_confusion_matrix", True)
+        self.sparse_confusion_matrix = kwargs.get(
+            "sparse_confusion_matrix", False)
         self.confusion_matrix = Array()
+        self.confusion_coo = None
         self.n_err = Array()
         self.max_err_output_sum = Array()
         self.demand("labels", "max_idx")
@@ -200,7 +313,12 @@ class EvaluatorSoftmax(EvaluatorBase):
             assert self.n_err.size == 2
 
         out_size = self.output.sample_size
-        if self.compute_confusion_matrix:
+        if self.compute_confusion_matrix and self.sparse_confusion_matrix:
+            self.confusion_matrix.reset()
+            if self.confusion_coo is None or \
+                    self.confusion_coo.size != out_size:
+                self.confusion_coo = SparseConfusionMatrix(out_size)
+        elif self.compute_confusion_matrix:
             if not self.confusion_matrix:
                 self.confusion_matrix.reset(
                     numpy.zeros([out_size, out_size], numpy.int32))
@@ -254,10 +372,21 @@ class EvaluatorSoftmax(EvaluatorBase):
 
         self.krn_constants_i_[0] = self.batch_size
         self.set_arg(3, self.krn_constants_i_[0:1])
-        self.krn_constants_f_[0] = 1.0 / self.batch_size if self.mean else 1.0
+        self.krn_constants_f_[0] = self.err_output_multiplier
         self.set_arg(4, self.krn_constants_f_[0:1])
 
         self.execute_kernel(self._global_size, self._local_size)
+        self.update_confusion_coo()
+
+    def update_confusion_coo(self):
+        if self.confusion_coo is None:
+            return
+        self.max_idx.map_read()
+        self.labels.map_read()
+        labels = self.labels.mem[:self.batch_size]
+        valid = labels >= 0
+        self.confusion_coo.add(self.max_idx.mem[:self.batch_size][valid],
+                               labels[valid])
 
     def ocl_run(self):
         return self._gpu_run()
@@ -278,7 +407,7 @@ class EvaluatorSoftmax(EvaluatorBase):
 
         n_ok = 0
         n_total = 0
-        multiplier = 1.0 / batch_size if self.mean else 1.0
+        multiplier = self.err_output_multiplier
         for i in range(batch_size):  # loop by batch
             if labels[i] < 0:
                 self.err_output.mem[i] = 0.0
@@ -287,7 +416,8 @@ class EvaluatorSoftmax(EvaluatorBase):
             err_output = ravel(self.err_output[i])
 
             max_idx = self.max_idx[i]
-            confusion_matrix[max_idx, labels[i]] += 1
+            if confusion_matrix is not None:
+                confusion_matrix[max_idx, labels[i]] += 1
             if max_idx == labels[i]:
                 n_ok += 1
             n_total += 1
@@ -307,6 +437,7 @@ class EvaluatorSoftmax(EvaluatorBase):
             self.err_output.mem[batch_size:] = 0.0
         self.n_err[0] += batch_size - n_ok
         self.n_err[1] += n_total
+        self.update_confusion_coo()
 
 
 @implementer(IOpenCLUnit, ICUDAUnit, INumpyUnit)
@@ -454,7 +585,7 @@ class EvaluatorMSE(EvaluatorBase):
         batch_size = self.batch_size
         self.krn_constants_i_[0] = batch_size
         self.set_arg(2, self.krn_constants_i_[0:1])
-        self.krn_constants_f_[0] = 1.0 / self.batch_size if self.mean else 1.0
+        self.krn_constants_f_[0] = self.err_output_multiplier
         self.set_arg(3, self.krn_constants_f_[0:1])
 
         self.execute_kernel(self._global_size, self._local_size)
@@ -501,8 +632,7 @@ class EvaluatorMSE(EvaluatorBase):
         self.err_output.mem[batch_size:] = 0
         mse[:] = numpy.square(denormed_err_output).sum(axis=1) / \
             denormed_err_output.shape[1]
-        if self.mean:
-            err_output /= batch_size
+        err_output *= self.err_output_multiplier
         if self.root:
             numpy.sqrt(mse, mse)
         self.mse.mem[batch_size:] = 0
@@ -173,19 +173,21 @@ class GradientDescent(nn_units.GradientDescentBase):
     def initialize(self, device, **kwargs):
         super(GradientDescent, self).initialize(device=device, **kwargs)
 
+        weights = self.master_vector("weights")
+        bias = self.master_vector("bias")
         if "adadelta" in self.solvers:
             for vec in (self.adadelta.weights, self.adadelta.gweights):
-                vec.reset(numpy.zeros_like(self.weights.mem))
+                vec.reset(numpy.zeros_like(weights.mem))
             for vec in (self.adadelta.bias, self.adadelta.gbias):
-                vec.reset(numpy.zeros_like(self.bias.mem))
+                vec.reset(numpy.zeros_like(bias.mem))
 
         if "fast" in self.solvers:
-            self.fast.bias.reset(numpy.zeros_like(self.bias.mem))
-            self.fast.weights.reset(numpy.zeros_like(self.weights.mem))
+            self.fast.bias.reset(numpy.zeros_like(bias.mem))
+            self.fast.weights.reset(numpy.zeros_like(weights.mem))
 
         if "adagrad" in self.solvers:
-            self.adagrad.bias.reset(numpy.zeros_like(self.bias.mem))
-            self.adagrad.weights.reset(numpy.zeros_like(self.weights.mem))
+            self.adagrad.bias.reset(numpy.zeros_like(bias.mem))
+            self.adagrad.weights.reset(numpy.zeros_like(weights.mem))
 
         if "fast" in self.solvers:
             self.init_vectors(self.fast.weights, self.fast.bias)
@@ -338,22 +340,24 @@ class GradientDescent(nn_units.GradientDescentBase):
         f_ortho_use = False if s == 'bias' else self.factor_ortho
 
         if s == 'weights':
-            self.gradient_weights.map_read()
-            for vec in (self.weights,
+            self.gradient_weights.map_write()
+            for vec in (self.master_vector(s),
                         self.accumulated_gradient_weights,
                         self.gradient_weights_with_moment):
                 vec.map_write()
             v_trans = getattr(self, s + "_transposed")
         elif s == 'bias':
-            self.gradient_bias.map_read()
-            for vec in (self.bias,
+            self.gradient_bias.map_write()
+            for vec in (self.master_vector(s),
                         self.accumulated_gradient_bias,
                         self.gradient_bias_with_moment):
                 vec.map_write()
             v_trans = False
 
-        vec = getattr(self, s)
+        vec = self.master_vector(s)
         grad_vec = getattr(self, "gradient_" + s)
+        if self.loss_scale != 1.0:
+            grad_vec.mem *= 1.0 / self.loss_scale
         acc_vec = getattr(self, "accumulated_gradient_" + s)
         vec_old = getattr(self, "gradient_%s_with_moment" % s)
         if "fast" in self.solvers:
@@ -397,6 +401,9 @@ class GradientDescent(nn_units.GradientDescentBase):
         if "fast" in self.solvers and self.apply_gradient and not v_trans:
             vec.mem -= f_vec.mem
 
+        if self.apply_gradient:
+            self.store_master_vector(s)
+
     def apply_fast(self, f_vec, vec_old):
         f_vec.mem *= 0.95
         f_vec.mem[:] = f_vec + self.fast.learning_rate * vec_old.mem
@@ -437,9 +444,11 @@ class GradientDescent(nn_units.GradientDescentBase):
 
         self.gradient_weights.map_write()
         if self.weights_transposed:
-            numpy.dot(inp.transpose(), err_output, self.gradient_weights.mem)
+            nn_units.half_dot(inp.transpose(), err_output,
+                              self.gradient_weights.mem)
         else:
-            numpy.dot(err_output.transpose(), inp, self.gradient_weights.mem)
+            nn_units.half_dot(err_output.transpose(), inp,
+                              self.gradient_weights.mem)
 
         self.numpy_update('weights')
 
@@ -468,9 +477,10 @@ class GradientDescent(nn_units.GradientDescentBase):
             self.err_input.mem,
             [self.err_input.shape[0], self.err_input.sample_size])
         if self.weights_transposed:
-            numpy.dot(err_output, self.weights.mem.transpose(), err_input)
+            nn_units.half_dot(err_output, self.weights.mem.transpose(),
+                              err_input)
         else:
-            numpy.dot(err_output, self.weights.mem, err_input)
+            nn_units.half_dot(err_output, self.weights.mem, err_input)
 
     def numpy_run(self):
         """Do gradient descent.
@@ -479,13 +479,17 @@ class GradientDescentConv(ConvolutionalBase, nn_units.GradientDescentBase):
                                     sample)
         if self.weights_transposed:
             gd_weights = reshape_transposed(gd_weights)
+        if self.loss_scale != 1.0:
+            gd_weights *= 1.0 / self.loss_scale
 
         # update weights
+        weights = self.master_vector("weights")
+        weights.map_write()
         lr = self.learning_rate
         factor_l12 = self.weights_decay
         l1_vs_l2 = self.l1_vs_l2
         gradient = -nn_units.GradientDescentBase.numpy_gradient_step(
-            self.weights.mem, gd_weights, lr, factor_l12, l1_vs_l2,
+            weights.mem, gd_weights, lr, factor_l12, l1_vs_l2,
             self.factor_ortho, self.weights_transposed)
         if self.accumulate_gradient == self.OP_NONE:
             pass
@@ -503,7 +507,8 @@ class GradientDescentConv(ConvolutionalBase, nn_units.GradientDescentBase):
                          self.gradient_moment)
             self.gradient_weights.mem[:] = gradient[:]
         if self.apply_gradient:
-            self.weights.mem += gradient
+            weights.mem += gradient
+            self.store_master_vector("weights")
 
     def numpy_bias_update(self):
         if not self.include_bias:
@@ -524,13 +529,17 @@ class GradientDescentConv(ConvolutionalBase, nn_units.GradientDescentBase):
                                                      err_out_shape[2],
                                                      self.n_kernels)
             gd_bias += numpy.add.reduce(out)
+        if self.loss_scale != 1.0:
+            gd_bias *= 1.0 / self.loss_scale
         # update bias
+        bias = self.master_vector("bias")
+        bias.map_write()
         lr = self.learning_rate
         factor_l12 = self.weights_decay
         l1_vs_l2 = self.l1_vs_l2
 
         gd_bias_reg = -nn_units.GradientDescentBase.numpy_gradient_step(
-            self.bias.mem, gd_bias, lr, factor_l12, l1_vs_l2)
+            bias.mem, gd_bias, lr, factor_l12, l1_vs_l2)
 
         if self.accumulate_gradient == self.OP_NONE:
             pass
@@ -549,7 +558,8 @@ class GradientDescentConv(ConvolutionalBase, nn_units.GradientDescentBase):
                             self.gradient_moment_bias)
             self.gradient_bias_with_moment.mem[:] = gd_bias_reg[:]
         if self.apply_gradient:
-            self.bias.mem += gd_bias_reg
+            bias.mem += gd_bias_reg
+            self.store_master_vector("bias")
 
     def numpy_err_input_update(self):
         """Backpropagate error (will compute err_input).
@@ -570,8 +580,9 @@ class GradientDescentConv(ConvolutionalBase, nn_units.GradientDescentBase):
         sx_full = self.padding[0] + sx + self.padding[2]
         sy_full = self.padding[1] + sy + self.padding[3]
 
-        weights = (reshape_transposed(self.weights.mem)
-                   if self.weights_transposed else self.weights.mem)
+        weights = nn_units.upcast_half(
+            reshape_transposed(self.weights.mem)
+            if self.weights_transposed else self.weights.mem)
 
         self.err_input.mem[:] = 0
         # initialize sparse output error
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Lossy compression of the gradients exchanged by the slaves and the master.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+from __future__ import division
+
+import numpy
+
+
+#: Payload tags.
+FLOAT16 = "float16"
+TOPK = "topk"
+SIGN = "sign"
+
+
+def payload_nbytes(payload):
+    """Returns the number of bytes of the arrays in the payload, which is
+    roughly what is sent over the network.
+    """
+    if payload is None:
+        return 0
+    if isinstance(payload, numpy.ndarray):
+        return payload.nbytes
+    return sum(item.nbytes for item in payload
+               if isinstance(item, numpy.ndarray))
+
+
+def decompress_add(out, payload):
+    """Adds the (compressed) gradient to out in place without allocating
+    the dense array.
+
+    :param out: contiguous numpy array of the gradient shape.
+    :param payload: either the dense numpy array or the tuple returned by
+        :meth:`GradientCompressor.compress`.
+    """
+    if payload is None:
+        return out
+    if isinstance(payload, numpy.ndarray):
+        out += payload
+        return out
+    tag = payload[0]
+    if tag == FLOAT16:
+        _, scale, half = payload
+        out += half.astype(out.dtype).reshape(out.shape) * scale
+    elif tag == TOPK:
+        _, shape, indices, values = payload
+        if shape != out.shape:
+            raise ValueError("Gradient shape mismatch: %s != %s" %
+                             (shape, out.shape))
+        # the indices are unique, so the fancy indexing is enough
+        out.reshape(-1)[indices] += values
+    elif tag == SIGN:
+        _, shape, scales, bits = payload
+        rows = out.reshape(len(scales), -1)
+        signs = numpy.unpackbits(bits)[:rows.size].reshape(rows.shape)
+        rows += numpy.where(signs, scales[:, numpy.newaxis],
+                            -scales[:, numpy.newaxis])
+    else:
+        raise ValueError("Unknown gradient payload \"%s\"" % tag)
+    return out
+
+
+def decompress(payload, dtype=numpy.float32):
+    """Restores the dense gradient from the payload.
+    """
+    if payload is None or isinstance(payload, numpy.ndarray):
+        return payload
+    if payload[0] == FLOAT16:
+        shape = payload[2].shape
+    else:
+        shape = payload[1]
+    return decompress_add(numpy.zeros(shape, dtype=dtype), payload)
+
+
+class GradientCompressor(object):
+    """Encodes the gradients a slave sends to the master. This base class
+    sends them as is.
+
+    The lossy compressors with error feedback keep the part of the
+    gradient which was not transmitted in the per-name residuals and add it
+    to the next gradient, so that the compression error does not
+    accumulate in the weights.
+
+    Attributes:
+        min_size: the arrays with fewer elements, e.g. the biases, are sent
+            as is.
+        error_feedback: keep the residuals.
+        raw_bytes: the total size of the dense gradients passed to
+            compress().
+        compressed_bytes: the total size of the returned payloads.
+    """
+    TYPE = "none"
+
+    def __init__(self, **kwargs):
+        self.min_size = kwargs.get("min_size", 0)
+        self.error_feedback = kwargs.get("error_feedback", True)
+        self.residuals = {}
+        self.reset_stats()
+
+    @property
+    def compression_ratio(self):
+        """Achieved compression ratio.
+        """
+        return self.raw_bytes / max(self.compressed_bytes, 1)
+
+    def reset_stats(self):
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def reset(self):
+        self.residuals.clear()
+
+    def compress(self, name, gradient):
+        """Encodes the gradient.
+
+        :param name: the gradient identifier, e.g. "weights", the residual
+            is kept under.
+        :param gradient: numpy array, it is not modified.
+        :return: the payload for :func:`decompress_add`.
+        """
+        if gradient is None:
+            return None
+        if gradient.size < max(self.min_size, 1):
+            payload = gradient
+        else:
+            payload = self.encode(name, gradient)
+        self.raw_bytes += gradient.nbytes
+        self.compressed_bytes += payload_nbytes(payload)
+        return payload
+
+    def encode(self, name, gradient):
+        return gradient
+
+    def with_residual(self, name, gradient):
+        """Returns the float32 (or float64) copy of the gradient with
+        the residual added.
+        """
+        dtype = numpy.promote_types(gradient.dtype, numpy.float32)
+        corrected = gradient.astype(dtype)
+        if not self.error_feedback:
+            return corrected
+        residual = self.residuals.get(name)
+        if residual is not None and residual.shape == corrected.shape:
+            corrected += residual
+        return corrected
+
+    def keep_residual(self, name, corrected, transmitted):
+        if not self.error_feedback:
+            return
+        corrected -= transmitted
+        self.residuals[name] = corrected
+
+
+class Float16Compressor(GradientCompressor):
+    """Scales the gradient by its maximal absolute value and rounds it to
+    float16, so that the small gradients do not underflow.
+    """
+    TYPE = FLOAT16
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("error_feedback", False)
+        super(Float16Compressor, self).__init__(**kwargs)
+
+    def encode(self, name, gradient):
+        corrected = self.with_residual(name, gradient)
+        scale = float(numpy.abs(corrected).max())
+        if scale == 0:
+            scale = 1.0
+        half = (corrected / scale).astype(numpy.float16)
+        if self.error_feedback:
+            self.keep_residual(name, corrected,
+                               half.astype(corrected.dtype) * scale)
+        return FLOAT16, scale, half
+
+
+class TopKCompressor(GradientCompressor):
+    """Sends only the k largest by magnitude elements of the gradient as
+    (flat int32 indices, values) pairs.
+
+    Attributes:
+        ratio: the fraction of the elements to send.
+        k: the number of the elements to send, overrides ratio.
+    """
+    TYPE = TOPK
+
+    def __init__(self, **kwargs):
+        super(TopKCompressor, self).__init__(**kwargs)
+        self.ratio = kwargs.get("ratio", 0.01)
+        self.k = kwargs.get("k")
+        if self.k is None and not 0 < self.ratio <= 1:
+            raise ValueError("ratio must be in (0, 1] (got %s)" % self.ratio)
+
+    def count(self, size):
+        k = self.k if self.k is not None else int(size * self.ratio)
+        return min(max(k, 1), size)
+
+    def encode(self, name, gradient):
+        corrected = self.with_residual(name, gradient)
+        flat = corrected.reshape(-1)
+        k = self.count(flat.size)
+        if k < flat.size:
+            indices = numpy.argpartition(numpy.abs(flat), flat.size - k)
+            indices = numpy.sort(indices[flat.size - k:])
+        else:
+            indices = numpy.arange(flat.size)
+        values = flat[indices].astype(gradient.dtype)
+        if self.error_feedback:
+            flat[indices] -= values
+            self.residuals[name] = corrected
+        return TOPK, gradient.shape, indices.astype(numpy.int32), values
+
+
+class SignCompressor(GradientCompressor):
+    """Sends the sign of each element as a bit and the mean absolute value
+    of each row (the first dimension) as its scale.
+    """
+    TYPE = SIGN
+
+    def encode(self, name, gradient):
+        corrected = self.with_residual(name, gradient)
+        rows = corrected.reshape(
+            gradient.shape[0] if gradient.ndim > 1 else 1, -1)
+        scales = numpy.abs(rows).mean(axis=1).astype(gradient.dtype)
+        positive = rows >= 0
+        if self.error_feedback:
+            self.keep_residual(name, corrected, numpy.where(
+                positive, scales[:, numpy.newaxis],
+                -scales[:, numpy.newaxis]).reshape(gradient.shape))
+        return SIGN, gradient.shape, scales, numpy.packbits(positive)
+
+
+COMPRESSORS = {cls.TYPE: cls for cls in (
+    GradientCompressor, Float16Compressor, TopKCompressor, SignCompressor)}
+
+
+def create_compressor(config):
+    """Creates the compressor from the configuration.
+
+    :param config: None, the compressor type ("none", "float16", "topk",
+        "sign"), the dict with "type" and the constructor kwargs or
+        the :class:`GradientCompressor` instance.
+    """
+    if isinstance(config, GradientCompressor):
+        return config
+    if config is None:
+        config = GradientCompressor.TYPE
+    if isinstance(config, str):
+        config = {"type": config}
+    kwargs = dict(config)
+    type_ = kwargs.pop("type", GradientCompressor.TYPE)
+    if type_ not in COMPRESSORS:
+        raise ValueError("Unknown gradient compression \"%s\", supported: %s"
+                         % (type_, ", ".join(sorted(COMPRESSORS))))
+    return COMPRESSORS[type_](**kwargs)
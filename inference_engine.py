@@ -0,0 +1,505 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Compiles forward propagation units into a single fused numpy callable.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+from __future__ import division
+import numpy
+from numpy.lib.stride_tricks import as_strided
+
+import veles.error as error
+from veles.znicz import activation, all2all, conv, cutter, dropout, \
+    normalization, pooling
+from veles.znicz.nn_units import upcast_half, HALF_DTYPE, \
+    HALF_COMPUTE_DTYPE
+
+
+def _tanh(mem):
+    mem *= all2all.All2AllTanh.B
+    numpy.tanh(mem, mem)
+    mem *= all2all.All2AllTanh.A
+
+
+def _relu(mem):
+    mem[:] = numpy.where(mem > 15, mem, numpy.log(numpy.exp(mem) + 1.0))
+
+
+def _strict_relu(mem):
+    numpy.maximum(mem, 0, mem)
+
+
+def _sigmoid(mem):
+    numpy.exp(-mem, mem)
+    mem += 1
+    numpy.reciprocal(mem, mem)
+
+
+def _softmax(mem):
+    mem -= mem.max(axis=1)[:, numpy.newaxis]
+    numpy.exp(mem, mem)
+    mem /= mem.sum(axis=1)[:, numpy.newaxis]
+
+
+#: In-place numpy implementations of the activations of All2All* and Conv*
+#: (see their activation_mode).
+ACTIVATIONS = {
+    "ACTIVATION_LINEAR": None,
+    "ACTIVATION_TANH": _tanh,
+    "ACTIVATION_RELU": _relu,
+    "ACTIVATION_STRICT_RELU": _strict_relu,
+    "ACTIVATION_SIGMOID": _sigmoid,
+}
+
+
+def _forward_tanh(unit):
+    def run(mem):
+        numpy.tanh(mem, mem)
+        mem *= 1.7159
+    return run
+
+
+def _forward_sigmoid(unit):
+    def run(mem):
+        numpy.reciprocal(1.0 + numpy.exp(-mem), mem)
+    return run
+
+
+def _forward_mul(unit):
+    if unit.factor is None:
+        raise error.BadFormatError(
+            "%s: factor must be set before the compilation" % unit)
+    factor = unit.factor
+
+    def run(mem):
+        mem *= factor
+    return run
+
+
+def _forward_log(unit):
+    def run(mem):
+        numpy.log(mem + numpy.sqrt(numpy.square(mem) + 1), mem)
+    return run
+
+
+def _forward_sincos(unit):
+    def run(mem):
+        flat = mem.reshape(mem.size)
+        flat[1::2] = numpy.sin(flat[1::2])
+        flat[0::2] = numpy.cos(flat[0::2])
+    return run
+
+
+#: Elementwise forward units which are fused into the preceding operation.
+ELEMENTWISE = {
+    activation.ForwardTanh: _forward_tanh,
+    activation.ForwardSigmoid: _forward_sigmoid,
+    activation.ForwardMul: _forward_mul,
+    activation.ForwardRELU: lambda unit: _relu,
+    activation.ForwardStrictRELU: lambda unit: _strict_relu,
+    activation.ForwardLog: _forward_log,
+    activation.ForwardSinCos: _forward_sincos,
+}
+
+
+class FusedOperation(object):
+    """Single operation of :class:`InferenceEngine` followed by the fused
+    elementwise functions.
+
+    Attributes:
+        unit: the forward unit this operation was compiled from.
+        post: the list of in-place elementwise functions applied to
+              the output.
+        input_shape: the sample shape of the input.
+        output_shape: the sample shape of the output.
+    """
+    def __init__(self, unit, input_shape):
+        self.unit = unit
+        self.post = []
+        self.input_shape = tuple(input_shape)
+        self.output_shape = self.calculate_output_shape()
+
+    @property
+    def name(self):
+        return "%s[%s]" % (self.unit.__class__.__name__, "+".join(
+            getattr(f, "__name__", "?") for f in self.post))
+
+    def calculate_output_shape(self):
+        return self.input_shape
+
+    def reserve(self, batch_size, dtype):
+        """Allocates the scratch memory for up to batch_size samples.
+        """
+        pass
+
+    def cast(self, dtype):
+        """Converts the compiled parameters to the compute dtype.
+        """
+        for attr in "weights", "bias":
+            value = getattr(self, attr, None)
+            if value is not None:
+                setattr(self, attr, value.astype(dtype, copy=False))
+
+    def execute(self, inp, out):
+        raise NotImplementedError()
+
+    def __call__(self, inp, out):
+        self.execute(inp, out)
+        for fn in self.post:
+            fn(out)
+
+
+class CopyOperation(FusedOperation):
+    """Starts the chain if the first unit is elementwise.
+    """
+    def execute(self, inp, out):
+        numpy.copyto(out, inp)
+
+
+class All2AllOperation(FusedOperation):
+    """Matrix multiplication; batches of up to GEMV_MAX_BATCH samples are
+    processed row by row as matrix-vector products.
+    """
+    GEMV_MAX_BATCH = 4
+
+    def __init__(self, unit, input_shape):
+        super(All2AllOperation, self).__init__(unit, input_shape)
+        unit.weights.map_read()
+        weights = upcast_half(unit.weights.mem)
+        # (input sample size, neurons number) for numpy.dot
+        self.weights = numpy.ascontiguousarray(
+            weights if unit.weights_transposed else weights.transpose())
+        if unit.include_bias:
+            unit.bias.map_read()
+            self.bias = upcast_half(unit.bias.mem).copy()
+        else:
+            self.bias = None
+        fn = ACTIVATIONS[unit.activation_mode]
+        if fn is not None:
+            self.post.append(fn)
+        if isinstance(unit, all2all.All2AllSoftmax):
+            self.post.append(_softmax)
+
+    def calculate_output_shape(self):
+        return tuple(self.unit.output_sample_shape)
+
+    def execute(self, inp, out):
+        batch = inp.shape[0]
+        out = out.reshape(batch, out.size // batch)
+        inp = inp.reshape(batch, inp.size // batch)
+        if batch <= self.GEMV_MAX_BATCH:
+            for index in range(batch):
+                numpy.dot(inp[index], self.weights, out[index])
+        else:
+            numpy.dot(inp, self.weights, out)
+        if self.bias is not None:
+            out += self.bias
+
+
+class ConvOperation(FusedOperation):
+    """Convolution through the unrolled (im2col) input and a single GEMM.
+    """
+    def __init__(self, unit, input_shape):
+        self.padding = unit.padding
+        self.sliding = unit.sliding
+        super(ConvOperation, self).__init__(unit, input_shape)
+        unit.weights.map_read()
+        weights = upcast_half(unit.weights.mem)
+        # (kernel size, n_kernels) for numpy.dot
+        self.weights = numpy.ascontiguousarray(
+            weights if unit.weights_transposed else weights.transpose())
+        if unit.include_bias:
+            unit.bias.map_read()
+            self.bias = upcast_half(unit.bias.mem).copy()
+        else:
+            self.bias = None
+        fn = ACTIVATIONS[unit.activation_mode]
+        if fn is not None:
+            self.post.append(fn)
+        self._padded = None
+
+    def calculate_output_shape(self):
+        sy, sx = self.input_shape[:2]
+        left, top, right, bottom = self.padding
+        ny = (sy + top + bottom - self.unit.ky) // self.sliding[1] + 1
+        nx = (sx + left + right - self.unit.kx) // self.sliding[0] + 1
+        return ny, nx, self.unit.n_kernels
+
+    def reserve(self, batch_size, dtype):
+        sy, sx = self.input_shape[:2]
+        channels = int(numpy.prod(self.input_shape[2:]))
+        left, top, right, bottom = self.padding
+        # the borders are never written and stay zero
+        self._padded = numpy.zeros(
+            (batch_size, sy + top + bottom, sx + left + right, channels),
+            dtype)
+
+    def execute(self, inp, out):
+        batch = inp.shape[0]
+        sy, sx = self.input_shape[:2]
+        channels = self._padded.shape[3]
+        inp = inp.reshape(batch, sy, sx, channels)
+        left, top = self.padding[:2]
+        padded = self._padded[:batch]
+        padded[:, top:top + sy, left:left + sx] = inp
+        ny, nx, n_kernels = self.output_shape
+        strides = padded.strides
+        windows = as_strided(
+            padded, (batch, ny, nx, self.unit.ky, self.unit.kx, channels),
+            (strides[0], strides[1] * self.sliding[1],
+             strides[2] * self.sliding[0]) + strides[1:])
+        unrolled = windows.reshape(batch * ny * nx, self.weights.shape[0])
+        numpy.dot(unrolled, self.weights, out.reshape(batch * ny * nx,
+                                                      n_kernels))
+        if self.bias is not None:
+            out += self.bias
+
+
+class PoolingOperation(FusedOperation):
+    """Max, max absolute and average pooling over the strided windows.
+    Incomplete windows at the right and bottom edges are treated like in
+    :class:`veles.znicz.pooling.Pooling`.
+    """
+    def __init__(self, unit, input_shape):
+        self.kx, self.ky = unit.kx, unit.ky
+        self.sliding = unit.sliding
+        super(PoolingOperation, self).__init__(unit, input_shape)
+        if isinstance(unit, pooling.MaxAbsPooling):
+            self.mode = "maxabs"
+        elif isinstance(unit, pooling.MaxPooling):
+            self.mode = "max"
+        elif isinstance(unit, pooling.AvgPooling):
+            self.mode = "avg"
+        else:
+            raise error.BadFormatError(
+                "%s is not supported by the inference engine" % unit)
+        self._padded = None
+        if self.mode == "avg":
+            sy, sx = self.input_shape[:2]
+            ones = numpy.zeros(self._padded_shape(1, 1)[1:3])
+            ones[:sy, :sx] = 1
+            self.counts = self._windows(
+                ones.reshape((1,) + ones.shape + (1,))).sum(axis=(3, 4))
+
+    def calculate_output_shape(self):
+        sy, sx, channels = self.input_shape
+        outs = []
+        for size, kernel, slide in ((sy, self.ky, self.sliding[1]),
+                                    (sx, self.kx, self.sliding[0])):
+            last = size - kernel
+            outs.append(last // slide + 1 + (1 if last % slide else 0))
+        return outs[0], outs[1], channels
+
+    def _padded_shape(self, batch, channels):
+        ny, nx = self.output_shape[:2]
+        return (batch, (ny - 1) * self.sliding[1] + self.ky,
+                (nx - 1) * self.sliding[0] + self.kx, channels)
+
+    def reserve(self, batch_size, dtype):
+        self._padded = numpy.empty(
+            self._padded_shape(batch_size, self.input_shape[2]), dtype)
+
+    def _windows(self, padded):
+        ny, nx = self.output_shape[:2]
+        strides = padded.strides
+        return as_strided(
+            padded, (padded.shape[0], ny, nx, self.ky, self.kx,
+                     padded.shape[3]),
+            (strides[0], strides[1] * self.sliding[1],
+             strides[2] * self.sliding[0]) + strides[1:])
+
+    def execute(self, inp, out):
+        batch = inp.shape[0]
+        sy, sx, channels = self.input_shape
+        inp = inp.reshape((batch,) + self.input_shape)
+        padded = self._padded[:batch]
+        padded[:] = -numpy.inf if self.mode == "max" else 0
+        padded[:, :sy, :sx] = inp
+        windows = self._windows(padded).reshape(
+            batch, self.output_shape[0], self.output_shape[1],
+            self.ky * self.kx, channels)
+        out = out.reshape((batch,) + self.output_shape)
+        if self.mode == "max":
+            numpy.max(windows, axis=3, out=out)
+        elif self.mode == "maxabs":
+            index = numpy.abs(windows).argmax(axis=3)[:, :, :, numpy.newaxis]
+            out[:] = numpy.take_along_axis(windows, index, axis=3)[
+                :, :, :, 0]
+        else:
+            numpy.sum(windows, axis=3, out=out)
+            out /= self.counts
+
+
+class CutterOperation(FusedOperation):
+    def calculate_output_shape(self):
+        sy, sx, channels = self.input_shape
+        left, top, right, bottom = self.unit.padding
+        return sy - top - bottom, sx - left - right, channels
+
+    def execute(self, inp, out):
+        batch = inp.shape[0]
+        inp = inp.reshape((batch,) + self.input_shape)
+        left, top = self.unit.padding[:2]
+        sy, sx = self.output_shape[:2]
+        out.reshape((batch,) + self.output_shape)[:] = \
+            inp[:, top:top + sy, left:left + sx]
+
+
+class LRNOperation(FusedOperation):
+    def execute(self, inp, out):
+        batch = inp.shape[0]
+        unit = self.unit
+        inp = inp.reshape((batch,) + self.input_shape)
+        subsums = unit._subsums(numpy.square(inp), unit.n)
+        subsums *= unit.alpha
+        subsums += unit.k
+        subsums **= unit.beta
+        numpy.divide(inp, subsums, out.reshape(inp.shape))
+
+
+#: Forward unit class -> operation class. The first isinstance() match wins.
+OPERATIONS = (
+    (all2all.All2All, All2AllOperation),
+    (conv.Conv, ConvOperation),
+    (pooling.Pooling, PoolingOperation),
+    (cutter.Cutter, CutterOperation),
+    (normalization.LRNormalizerForward, LRNOperation),
+)
+
+
+class InferenceEngine(object):
+    """Executes the compiled chain of forward propagation units as a single
+    callable without the unit scheduling overhead.
+
+    Elementwise units (activations) are fused into the producing operation,
+    dropout is removed and intermediate results are stored into two
+    ping-pong buffers. Any batch size is accepted: the buffers grow
+    geometrically when a larger batch arrives and smaller batches use
+    the leading views of them, so nothing is reinitialized or padded.
+
+    Attributes:
+        operations: the list of :class:`FusedOperation`.
+        max_batch_size: the number of samples the buffers currently fit.
+        dtype: the compute dtype.
+    """
+    GROWTH_FACTOR = 2
+
+    def __init__(self, forwards, max_batch_size=None, dtype=None):
+        if not forwards:
+            raise ValueError("There are no forward units to compile")
+        first = forwards[0]
+        self.input_shape = tuple(first.input.shape[1:])
+        self.max_batch_size = 0
+        if dtype is None:
+            dtype = (HALF_COMPUTE_DTYPE if first.input.dtype == HALF_DTYPE
+                     else first.input.dtype)
+        self.dtype = numpy.dtype(dtype)
+        self.operations = self.compile(forwards, self.input_shape)
+        for op in self.operations:
+            op.cast(self.dtype)
+        self._sample_size = max(int(numpy.prod(op.output_shape))
+                                for op in self.operations)
+        self._buffers = None
+        self.reserve(max_batch_size or first.input.shape[0])
+
+    @property
+    def output_shape(self):
+        return self.operations[-1].output_shape
+
+    @staticmethod
+    def compile(forwards, input_shape):
+        """Converts forward units to the list of fused operations.
+        """
+        operations = []
+        shape = input_shape
+        for unit in forwards:
+            if isinstance(unit, dropout.DropoutForward):
+                continue
+            elementwise = ELEMENTWISE.get(type(unit))
+            if elementwise is not None:
+                if not operations:
+                    operations.append(CopyOperation(unit, shape))
+                operations[-1].post.append(elementwise(unit))
+                continue
+            for clazz, op_class in OPERATIONS:
+                if isinstance(unit, clazz):
+                    op = op_class(unit, shape)
+                    break
+            else:
+                raise error.BadFormatError(
+                    "%s is not supported by the inference engine" % unit)
+            operations.append(op)
+            shape = op.output_shape
+        return operations
+
+    def reserve(self, batch_size):
+        """Ensures the buffers fit at least batch_size samples.
+        """
+        if batch_size <= self.max_batch_size:
+            return
+        batch_size = max(batch_size,
+                         self.max_batch_size * self.GROWTH_FACTOR)
+        self._buffers = tuple(
+            numpy.zeros(batch_size * self._sample_size, self.dtype)
+            for _ in range(2))
+        for op in self.operations:
+            op.reserve(batch_size, self.dtype)
+        self.max_batch_size = batch_size
+
+    def _view(self, index, batch_size, shape):
+        size = batch_size * int(numpy.prod(shape))
+        return self._buffers[index][:size].reshape((batch_size,) + shape)
+
+    def predict(self, batch):
+        """Propagates the batch of samples through the compiled network.
+
+        :param batch: numpy array of shape (n, \\*input sample shape).
+        :return: numpy array of shape (n, \\*output_shape).
+        """
+        batch = numpy.asarray(batch)
+        batch_size = batch.shape[0]
+        self.reserve(batch_size)
+        inp = batch.reshape((batch_size,) + self.input_shape).astype(
+            self.dtype, copy=False)
+        for index, op in enumerate(self.operations):
+            out = self._view(index % 2, batch_size, op.output_shape)
+            op(inp, out)
+            inp = out
+        return inp.copy()
+
+    __call__ = predict
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__,
+                           " -> ".join(op.name for op in self.operations))
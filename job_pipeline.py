@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Pipelining of the slave jobs.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import threading
+import time
+
+from six.moves import queue
+
+from veles.logger import Logger
+
+
+class JobPipeline(Logger):
+    """Slave side job loop which requests the next jobs from the master
+    while the current one is being computed, so that the network round
+    trip is hidden behind the computation.
+
+    The jobs are applied strictly in the order they were received and
+    a job is applied only after the update of the previous one has been
+    generated, so the units see the same sequence of
+    apply_data_from_master() and generate_data_for_master() calls as
+    without the pipelining. On the master, the job k + 1 is generated
+    before the update k arrives, so it carries the weights version and
+    the learning rates one update older. The weights deltas stay
+    consistent because they are applied in order.
+
+    When run() returns because of stop() or an error, the jobs requested
+    in advance are not processed. They are collected in unprocessed,
+    including the one the fetcher thread may still be receiving; join()
+    waits for it. The caller should hand them back to the master, e.g. by
+    reconnecting so that the master calls drop_slave().
+
+    Example:
+        pipeline = JobPipeline(
+            fetch=client.request_job,
+            process=lambda job: workflow.do_job_sync(job),
+            send=client.send_update, depth=1)
+        pipeline.run()
+
+    Attributes:
+        fetch: callable() which requests the job from the master and
+            blocks until it arrives. It returns None if there are no more
+            jobs and is always called from the same background thread.
+        process: callable(job) which applies the job, runs the workflow
+            and returns the update for the master.
+        send: callable(update) which sends the update to the master. It is
+            always called from the thread which called run().
+        depth: the number of the jobs requested in advance; 0 disables
+            the pipelining.
+        jobs: the number of processed jobs.
+        fetch_wait: the total time in seconds the loop waited for the jobs.
+        unprocessed: the received jobs which were not processed, in the
+            order of arrival.
+    """
+    def __init__(self, fetch, process, send, **kwargs):
+        super(JobPipeline, self).__init__()
+        self.fetch = fetch
+        self.process = process
+        self.send = send
+        self.depth = kwargs.get("depth", 1)
+        if self.depth < 0:
+            raise ValueError("depth must not be negative (got %s)" %
+                             self.depth)
+        self.jobs = 0
+        self.fetch_wait = 0.0
+        self.elapsed = 0.0
+        self.unprocessed = []
+        self._stopped = False
+        self._lock = threading.Lock()
+        # the queue of the current run(), None if it is not running
+        self._queue = None
+        self._fetcher = None
+
+    @property
+    def throughput(self):
+        return self.jobs / self.elapsed if self.elapsed else 0.0
+
+    def stop(self):
+        """Makes run() return after the current job.
+        """
+        self._stopped = True
+
+    def join(self, timeout=None):
+        """Waits for the fetcher thread of the last run() to exit, after
+        that unprocessed does not change.
+
+        :return: True if the fetcher has exited.
+        """
+        if self._fetcher is None:
+            return True
+        self._fetcher.join(timeout)
+        return not self._fetcher.is_alive()
+
+    def run(self):
+        """Processes the jobs until the master has no more of them.
+
+        :return: the number of the processed jobs.
+        """
+        # the current job and the ones requested in advance
+        slots = threading.Semaphore(self.depth + 1)
+        jobs = queue.Queue()
+        fetcher = threading.Thread(target=self._fetch, args=(slots, jobs),
+                                   name="%s fetcher" % type(self).__name__)
+        fetcher.daemon = True
+        self._stopped = False
+        self._queue = jobs
+        self._fetcher = fetcher
+        start = time.time()
+        fetcher.start()
+        try:
+            while not self._stopped:
+                t0 = time.time()
+                job, exception = jobs.get()
+                self.fetch_wait += time.time() - t0
+                if exception is not None:
+                    raise exception
+                if job is None:
+                    break
+                self.send(self.process(job))
+                self.jobs += 1
+                slots.release()
+        finally:
+            with self._lock:
+                self._stopped = True
+                self._queue = None
+                while not jobs.empty():
+                    job, _ = jobs.get()
+                    if job is not None:
+                        self.unprocessed.append(job)
+            # unblock the fetcher
+            slots.release()
+            self.elapsed += time.time() - start
+        self.debug("Processed %d jobs, %.1f jobs/sec, waited for the jobs "
+                   "%.2f sec", self.jobs, self.throughput, self.fetch_wait)
+        return self.jobs
+
+    def _fetch(self, slots, jobs):
+        while True:
+            slots.acquire()
+            if self._stopped or self._queue is not jobs:
+                return
+            try:
+                job = self.fetch()
+            except Exception as e:
+                jobs.put((None, e))
+                return
+            with self._lock:
+                if self._queue is not jobs:
+                    # run() has already returned
+                    if job is not None:
+                        self.unprocessed.append(job)
+                    return
+                jobs.put((job, None))
+            if job is None:
+                return
@@ -68,6 +68,14 @@ class KohonenBase(object):
         return [numpy.linalg.norm(dist[i]) for i in range(dist.shape[0])]
 
 
+def sparse_distances(batch, weights):
+    """Squared distances between the rows of CSR batch and the neurons.
+    """
+    return (batch.squared_norms()[:, numpy.newaxis] -
+            2 * batch.dot(weights.transpose()) +
+            numpy.sum(weights * weights, axis=1))
+
+
 @implementer(IOpenCLUnit, INumpyUnit)
 class KohonenForward(KohonenBase, AcceleratedUnit):
     """Kohonen forward layer.
@@ -79,6 +87,7 @@ class KohonenForward(KohonenBase, AcceleratedUnit):
         minibatch_size (if total == True)
         batch_size (if total == True)
         argmins speeds up run() if linked from KohonenTrainer
+        sparse_input replaces input in numpy_run() if not None
 
     Updates after run():
         output
@@ -88,6 +97,8 @@ class KohonenForward(KohonenBase, AcceleratedUnit):
 
     Attributes:
         input: input as batch of samples.
+        sparse_input: :class:`veles.znicz.csr.CSRMatrix` with the current
+            minibatch; input then only defines the shape.
         weights: the weights of the neurons in Kohonen layer.
         output: the list of winners.
         total: if total=True is passed in __init__(), the overall winners table
@@ -96,6 +107,7 @@ class KohonenForward(KohonenBase, AcceleratedUnit):
         super(KohonenForward, self).__init__(workflow, **kwargs)
         self.demand("input", "weights")
         self.argmins = None
+        self.sparse_input = None
         self._distances = Array()
         self.output = Array()
         self._chunk_size_ = 0
@@ -243,6 +255,15 @@ class KohonenForward(KohonenBase, AcceleratedUnit):
 
         length = self.minibatch_size if self.total is not None \
             else self.input.mem.shape[0]
+        if self.argmins is None and self.sparse_input is not None:
+            length = self.sparse_input.shape[0]
+            self.output.mem[:length] = sparse_distances(
+                self.sparse_input, self.weights.mem).argmin(axis=1)
+            if self.total is not None:
+                offset = self.minibatch_offset - self.minibatch_size
+                self.total.mem[offset:offset + length] = \
+                    self.output.mem[:length]
+            return
         for sindex in range(length):
             if self.argmins is None:
                 dist = self.weights.mem - self.input[sindex]
@@ -276,6 +297,8 @@ class KohonenTrainer(KohonenBase, AcceleratedUnit):
     Attributes:
         weights: weights of the current layer.
         input: input of the current layer as batch of 1D samples.
+        sparse_input: :class:`veles.znicz.csr.CSRMatrix` with the current
+            minibatch which replaces input in numpy_run() if not None.
         krn_dist_: computes distances between input and neuron weights.
         _krn_argmin_: finds indexes of minimal computed distances.
         krn_gravity_: computes gravity to the winner neuron.
@@ -288,6 +311,7 @@ class KohonenTrainer(KohonenBase, AcceleratedUnit):
         self._coords = Array()
         self.weights = Array()
         self.winners = Array()
+        self.sparse_input = None
         self.weights_filling = kwargs.get("weights_filling", "uniform")
         self.weights_stddev = kwargs.get("weights_stddev", None)
         self.weights_transposed = kwargs.get("weights_transposed", False)
@@ -471,6 +495,9 @@ class KohonenTrainer(KohonenBase, AcceleratedUnit):
 
     @iteration
     def numpy_run(self):
+        if self.sparse_input is not None:
+            self.numpy_run_sparse()
+            return
         batch_size = self.input.mem.shape[0]
         neurons_number = self._neurons_number
         dists = numpy.empty(neurons_number)
@@ -494,8 +521,36 @@ class KohonenTrainer(KohonenBase, AcceleratedUnit):
                 (self.input[sindex] - self.weights.mem) * gmult
         self.weights.mem += gradients
 
+    def numpy_run_sparse(self):
+        """Processes the whole minibatch at once touching only the nonzero
+        input values: the distances are expanded as
+        |x|^2 - 2 x.w + |w|^2 and the gradient of neuron n as
+        gmult * sum_s(g_ns * x_s) - gmult * sum_s(g_ns) * w_n.
+        """
+        sigma = self.gravity_radius
+        gmult = self.gradient_multiplier
+        self.weights.map_write()
+        self.winners.map_write()
+        self.argmins.map_write()
+
+        batch = self.sparse_input
+        weights = self.weights.mem
+        argmins = sparse_distances(batch, weights).argmin(axis=1)
+        self.argmins.mem[:len(argmins)] = argmins
+        numpy.add.at(self.winners.mem, argmins, 1)
+        coords = self._coords.mem
+        dists = coords[:, numpy.newaxis, :] - coords[argmins]
+        gravity = numpy.exp(numpy.sum(dists * dists, axis=2) /
+                            (-2 * sigma * sigma))
+        gradients = batch.transpose_dot(gravity.transpose()).transpose()
+        gradients -= gravity.sum(axis=1)[:, numpy.newaxis] * weights
+        weights += gradients * gmult
+
     @iteration
     def ocl_run(self):
+        if self.sparse_input is not None:
+            raise ValueError(
+                "Sparse input is supported only by numpy backend")
         self.unmap_vectors(self.input, self.weights, self.winners,
                            self._distances, self.argmins, self._coords)
 
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Binary cache of the parsed text datasets.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy
+import six
+
+from veles.config import root
+
+
+class BinaryCacheMixin(object):
+    """Caches the parsed FullBatchLoader dataset in the binary form.
+
+    The subclass wraps its parsing code in load_data() like this:
+
+        if self.load_cache(sources, **config) is not None:
+            return
+        ... parse the text sources ...
+        self.save_cache(sources, **config)
+
+    The cache is a directory with original_data.npy, original_labels.npy,
+    the extra arrays and meta.json. Its name consists of the hash of the
+    loader class, the sources' paths and the keyword arguments which
+    affect parsing and the hash of the sources' sizes and modification
+    times. save_cache() removes the stale caches with the same first
+    hash; the caches of the other datasets and configurations stay in
+    cache_dir until removed manually. original_data is
+    memory-mapped copy-on-write, so that the loading time does not depend
+    on the dataset size and the in-place normalization still works.
+    If original_data is a numpy.broadcast_to() placeholder, only its shape
+    is stored.
+
+    Attributes:
+        binary_cache: enables the cache.
+        cache_dir: the directory where the caches are stored.
+    """
+    CACHE_VERSION = 1
+
+    def __init__(self, workflow, **kwargs):
+        super(BinaryCacheMixin, self).__init__(workflow, **kwargs)
+        self.binary_cache = kwargs.get("binary_cache", True)
+        self.cache_dir = kwargs.get(
+            "cache_dir", os.path.join(root.common.dirs.cache, "loaders"))
+
+    def cache_path(self, sources, **config):
+        if isinstance(sources, six.string_types):
+            sources = sources,
+        key = {"class": "%s.%s" % (type(self).__module__,
+                                   type(self).__name__),
+               "version": self.CACHE_VERSION,
+               "config": config,
+               "sources": [os.path.abspath(s) for s in sources]}
+        stats = []
+        for source in sources:
+            stat = os.stat(source)
+            stats.append((stat.st_size, stat.st_mtime))
+        return os.path.join(self.cache_dir, "%s_%s_%s" % (
+            type(self).__name__, self._digest(key), self._digest(stats)))
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha1(json.dumps(
+            value, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+
+    def remove_stale_caches(self, path):
+        """Removes the caches of the previous versions of the sources
+        which path is the cache of.
+        """
+        directory, name = os.path.split(path)
+        prefix = name[:name.rindex("_") + 1]
+        for sibling in os.listdir(directory):
+            if not sibling.startswith(prefix) or sibling == name:
+                continue
+            self.info("Removing the stale cache %s", sibling)
+            shutil.rmtree(os.path.join(directory, sibling),
+                          ignore_errors=True)
+
+    def load_cache(self, sources, **config):
+        """Restores original_data, original_labels and class_lengths.
+
+        :return: None if the cache is disabled, missing or invalid;
+            otherwise, the dict with the extra values passed to
+            save_cache().
+        """
+        if not self.binary_cache:
+            return None
+        path = self.cache_path(sources, **config)
+        meta_file = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_file):
+            return None
+        try:
+            with open(meta_file, "r") as fin:
+                meta = json.load(fin)
+            if meta["placeholder"] is not None:
+                shape, dtype = meta["placeholder"]
+                data = numpy.broadcast_to(numpy.zeros(1, dtype), shape)
+            else:
+                data = numpy.load(os.path.join(path, "original_data.npy"),
+                                  mmap_mode="c")
+            labels = numpy.load(os.path.join(path, "original_labels.npy"))
+            extra = meta["extra"]
+            for name in meta["arrays"]:
+                extra[name] = numpy.load(
+                    os.path.join(path, name + ".npy"), mmap_mode="r")
+        except Exception as e:
+            self.warning("Failed to load the cache %s: %s", path, e)
+            return None
+        self.original_data.mem = data
+        self.original_labels[:] = labels.tolist()
+        self.class_lengths[:] = meta["class_lengths"]
+        self.info("Loaded %s from the cache %s", "x".join(
+            str(d) for d in data.shape), path)
+        return extra
+
+    def save_cache(self, sources, extra=None, **config):
+        """Writes original_data, original_labels, class_lengths and extra
+        values to the cache. Extra numpy arrays are saved in .npy files,
+        the rest must be JSON serializable. Failures are not fatal.
+        """
+        if not self.binary_cache:
+            return
+        path = self.cache_path(sources, **config)
+        extra = dict(extra or {})
+        arrays = sorted(name for name, value in extra.items()
+                        if isinstance(value, numpy.ndarray))
+        data = self.original_data.mem
+        # broadcast placeholders are stored by their shape only
+        placeholder = 0 in data.strides
+        meta = {"class_lengths": [int(l) for l in self.class_lengths],
+                "placeholder": [list(data.shape), data.dtype.str]
+                if placeholder else None,
+                "arrays": arrays,
+                "extra": {name: value for name, value in extra.items()
+                          if name not in arrays}}
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            # the cache appears atomically when it is complete
+            tmp = tempfile.mkdtemp(dir=self.cache_dir)
+            try:
+                if not placeholder:
+                    numpy.save(os.path.join(tmp, "original_data.npy"),
+                               numpy.ascontiguousarray(data))
+                numpy.save(os.path.join(tmp, "original_labels.npy"),
+                           numpy.array(self.original_labels,
+                                       dtype=numpy.int32))
+                for name in arrays:
+                    numpy.save(os.path.join(tmp, name + ".npy"), extra[name])
+                with open(os.path.join(tmp, "meta.json"), "w") as fout:
+                    json.dump(meta, fout)
+                if os.path.exists(path):
+                    shutil.rmtree(path)
+                os.rename(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    shutil.rmtree(tmp)
+        except Exception as e:
+            self.warning("Failed to write the cache %s: %s", path, e)
+            return
+        self.info("Saved the parsed data to the cache %s", path)
+        self.remove_stale_caches(path)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Fast decoder of CAFFE Datum protobuf messages.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+from multiprocessing import Pool
+
+import numpy
+
+
+# Datum field numbers, see caffe.proto
+CHANNELS, HEIGHT, WIDTH, DATA, LABEL, FLOAT_DATA, ENCODED = range(1, 8)
+# wire types
+VARINT, FIXED64, LENGTH_DELIMITED, FIXED32 = 0, 1, 2, 5
+
+
+class RawDatum(object):
+    """Caffe Datum decoded by :func:`decode_datum`. Has the same attributes
+    as :class:`veles.znicz.loader.caffe.Datum`, but data and float_data are
+    numpy arrays.
+    """
+    __slots__ = ("channels", "height", "width", "data", "label",
+                 "float_data", "encoded")
+
+    def __init__(self):
+        self.channels = self.height = self.width = self.label = 0
+        self.data = numpy.empty(0, dtype=numpy.uint8)
+        self.float_data = numpy.empty(0, dtype=numpy.float32)
+        self.encoded = False
+
+    def __getstate__(self):
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+    def __setstate__(self, state):
+        for attr, value in zip(self.__slots__, state):
+            setattr(self, attr, value)
+
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _int32(value):
+    # negative int32 are encoded as 10 bytes long varints
+    value &= 0xFFFFFFFF
+    return value - (1 << 32) if value >= (1 << 31) else value
+
+
+def decode_datum(raw):
+    """Decodes the serialized Caffe Datum without protobuf. data is the
+    zero-copy view of raw.
+
+    :param raw: bytes-like object, e.g. the value from LMDB.
+    :return: :class:`RawDatum`.
+    """
+    buf = memoryview(raw)
+    if buf.format != "B":
+        buf = buf.cast("B")
+    size = len(buf)
+    datum = RawDatum()
+    floats = []
+    pos = 0
+    while pos < size:
+        tag, pos = _read_varint(buf, pos)
+        field, wire_type = tag >> 3, tag & 7
+        if wire_type == VARINT:
+            value, pos = _read_varint(buf, pos)
+            if field == CHANNELS:
+                datum.channels = _int32(value)
+            elif field == HEIGHT:
+                datum.height = _int32(value)
+            elif field == WIDTH:
+                datum.width = _int32(value)
+            elif field == LABEL:
+                datum.label = _int32(value)
+            elif field == ENCODED:
+                datum.encoded = bool(value)
+        elif wire_type == LENGTH_DELIMITED:
+            length, pos = _read_varint(buf, pos)
+            end = pos + length
+            if end > size:
+                raise ValueError("Truncated Datum: field %d needs %d bytes, "
+                                 "%d are left" % (field, length, size - pos))
+            if field == DATA:
+                datum.data = numpy.frombuffer(
+                    raw, dtype=numpy.uint8, count=length, offset=pos)
+            elif field == FLOAT_DATA:
+                floats.append(numpy.frombuffer(
+                    raw, dtype="<f4", count=length // 4, offset=pos))
+            pos = end
+        elif wire_type == FIXED32:
+            if field == FLOAT_DATA:
+                floats.append(numpy.frombuffer(
+                    raw, dtype="<f4", count=1, offset=pos))
+            pos += 4
+        elif wire_type == FIXED64:
+            pos += 8
+        else:
+            raise ValueError("Unsupported wire type %d of field %d" %
+                             (wire_type, field))
+    if floats:
+        datum.float_data = (floats[0] if len(floats) == 1
+                            else numpy.concatenate(floats))
+    return datum
+
+
+class DatumDecodePool(object):
+    """Decodes the whole minibatch of serialized Datum-s in several
+    processes. The decoded arrays are copied back to the parent process,
+    so the pool pays off for the large minibatches only.
+    """
+    def __init__(self, processes=None, chunksize=16):
+        self.chunksize = chunksize
+        self._pool = Pool(processes)
+
+    def decode(self, raws):
+        return self._pool.map(decode_datum, [bytes(r) for r in raws],
+                              self.chunksize)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
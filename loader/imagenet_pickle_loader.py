@@ -36,8 +36,8 @@ under the License.
 import json
 import pickle
 import os
+import threading
 
-import cv2
 import numpy
 from zope.interface import implementer
 
@@ -47,11 +47,29 @@ from veles.memory import Array
 import veles.opencl_types as opencl_types
 import veles.loader as loader
 import veles.prng.random_generator as prng
+from veles.znicz.loader.prefetch import MinibatchPrefetcher, \
+    upcoming_minibatches
 
 
 @implementer(loader.ILoader)
 class ImagenetLoader(loader.Loader):
-    """loads imagenet from samples.dat, labels.pickle"""
+    """loads imagenet from samples.dat, labels.pickle
+
+    If mmap_samples is True, samples.dat is memory mapped as
+    (N, sy, sx, channels) uint8 array and each minibatch is gathered,
+    cropped, mirrored and mean subtracted with batched numpy operations
+    instead of reading the samples one by one. The page cache is then
+    shared by all the workers on the same node.
+
+    The crops and mirroring of a minibatch are generated with one call to
+    the random generator seeded by augmentation_seed, the epoch number and
+    the minibatch offset, so they do not depend on the order the
+    minibatches are filled in; if apply_rdisp is True, the mean subtracted
+    samples are also multiplied by rdisp.
+
+    If prefetch_depth is positive, up to that many upcoming minibatches are
+    filled in advance by prefetch_workers background threads.
+    """
     MAPPING = "imagenet_pickle_loader"
 
     def __init__(self, workflow, **kwargs):
@@ -71,18 +89,26 @@ class ImagenetLoader(loader.Loader):
         self.matrixes_filename = kwargs.get("matrixes_filename", None)
         self.samples_filename = kwargs.get("samples_filename", None)
         self.has_mean_file = False
-        self.do_mirror = False
         self.mirror = kwargs.get("mirror", False)
         self.channels = kwargs.get("channels", 3)
+        self.mmap_samples = kwargs.get("mmap_samples", False)
+        self.apply_rdisp = kwargs.get("apply_rdisp", False)
+        self.prefetch_depth = kwargs.get("prefetch_depth", 0)
+        self.prefetch_workers = kwargs.get("prefetch_workers", 1)
+        self.augmentation_seed = None
 
     def init_unpickled(self):
         super(ImagenetLoader, self).init_unpickled()
         self.original_labels = None
+        self.samples = None
+        self._prefetcher_ = None
+        self._file_lock_ = threading.Lock()
 
     def __getstate__(self):
         state = super(ImagenetLoader, self).__getstate__()
         state["original_labels"] = None
         state["file_samples"] = None
+        state["samples"] = None
         return state
 
     def initialize(self, **kwargs):
@@ -90,6 +116,16 @@ class ImagenetLoader(loader.Loader):
         super(ImagenetLoader, self).initialize(**kwargs)
         self.minibatch_labels.reset(numpy.zeros(
             self.max_minibatch_size, dtype=numpy.int32))
+        if self.augmentation_seed is None:
+            self.augmentation_seed = int(prng.get().rand() * 0x7FFFFFFF)
+        if self._prefetcher_ is not None:
+            self._prefetcher_.stop()
+            self._prefetcher_ = None
+        if self.prefetch_depth > 0 and not self.is_master:
+            self._prefetcher_ = MinibatchPrefetcher(
+                self.fill_samples, self.minibatch_data.mem,
+                self.minibatch_labels.mem, depth=self.prefetch_depth,
+                workers=self.prefetch_workers).start()
 
     def shuffle(self):
         if self.shuffle_limit <= 0:
@@ -143,9 +179,9 @@ class ImagenetLoader(loader.Loader):
         with open(self.matrixes_filename, "rb") as fin:
             matrixes = pickle.load(fin)
 
-        self.mean.mem = matrixes[0]
-        self.rdisp.mem = matrixes[1].astype(
-            opencl_types.dtypes[root.common.engine.precision_type])
+        dtype = opencl_types.dtypes[root.common.engine.precision_type]
+        self.mean.mem = matrixes[0].astype(dtype)
+        self.rdisp.mem = matrixes[1].astype(dtype)
         if numpy.count_nonzero(numpy.isnan(self.rdisp.mem)):
             raise ValueError("rdisp matrix has NaNs")
         if numpy.count_nonzero(numpy.isinf(self.rdisp.mem)):
@@ -155,6 +191,16 @@ class ImagenetLoader(loader.Loader):
         if self.mean.shape[0] != self.sy or self.mean.shape[1] != self.sx:
             raise ValueError("mean.shape != (%d, %d)" % (self.sy, self.sx))
 
+        if self.mmap_samples:
+            if (os.path.getsize(self.samples_filename)
+                    // (self.sx * self.sy * self.channels) !=
+                    len(self.original_labels)):
+                raise error.Bug("Wrong data file size")
+            self.samples = numpy.memmap(
+                self.samples_filename, dtype=numpy.uint8, mode="r",
+                shape=(len(self.original_labels), self.sy, self.sx,
+                       self.channels))
+            return
         self.file_samples = open(self.samples_filename, "rb")
         if (self.file_samples.seek(0, 2)
                 // (self.sx * self.sy * self.channels) !=
@@ -167,38 +213,20 @@ class ImagenetLoader(loader.Loader):
         dtype = opencl_types.dtypes[root.common.engine.precision_type]
         self.minibatch_data.mem = numpy.zeros(sh, dtype=dtype)
 
-    def transform_sample(self, sample):
-        if self.has_mean_file:
-            sample = self.deduct_mean(sample)
-        if self.crop_size_sx and self.crop_size_sy:
-            sample = self.cut_out(sample)
-        if self.do_mirror:
-            sample = self.mirror_sample(sample)
-        return sample
-
-    def deduct_mean(self, sample):
-        sample = sample.astype(self.rdisp.dtype)
-        sample -= self.mean.mem
-        return sample
+    @property
+    def crop_shape(self):
+        return (self.crop_size_sy or self.sy, self.crop_size_sx or self.sx)
 
-    def mirror_sample(self, sample):
-        mirror_sample = numpy.zeros_like(sample)
-        cv2.flip(sample, 1, mirror_sample)
-        return mirror_sample
+    @property
+    def center_crop_offsets(self):
+        crop_sy, crop_sx = self.crop_shape
+        return (self.sy - crop_sy) // 2, (self.sx - crop_sx) // 2
 
     def cut_out(self, sample):
-        if self.minibatch_class == 2:
-            rand = prng.get()
-            h_off = rand.randint(
-                sample.shape[0] - self.crop_size_sy + 1)
-            w_off = rand.randint(
-                sample.shape[1] - self.crop_size_sx + 1)
-        else:
-            h_off = (sample.shape[0] - self.crop_size_sy) / 2
-            w_off = (sample.shape[1] - self.crop_size_sx) / 2
+        h_off, w_off = self.center_crop_offsets
+        crop_sy, crop_sx = self.crop_shape
         sample = sample[
-            h_off:h_off + self.crop_size_sy,
-            w_off:w_off + self.crop_size_sx, :self.channels]
+            h_off:h_off + crop_sy, w_off:w_off + crop_sx, :self.channels]
         return sample
 
     def fill_indices(self, start_offset, count):
@@ -216,28 +244,123 @@ class ImagenetLoader(loader.Loader):
         self.minibatch_data.map_invalidate()
         self.minibatch_labels.map_invalidate()
 
-        sample = numpy.zeros(
-            [self.sy, self.sx, self.channels], dtype=numpy.uint8)
-        sample_bytes = sample.nbytes
-
-        for index, index_sample in enumerate(idxs[:count]):
-            self.file_samples.seek(int(index_sample) * sample_bytes)
-            self.file_samples.readinto(sample)
-            rand = prng.get()
-            self.do_mirror = self.mirror and bool(rand.randint((2)))
-            image = self.transform_sample(sample)
-            self.minibatch_data.mem[index] = image
-            self.minibatch_labels.mem[
-                index] = self.original_labels[int(index_sample)]
+        data = self.minibatch_data.mem
+        labels = self.minibatch_labels.mem
+        seed = self.minibatch_seed(start_offset, self.epoch_number)
+        prefetcher = self._prefetcher_
+        if prefetcher is None or not prefetcher.fetch(
+                idxs[:count], self.minibatch_class, data, labels, (seed,)):
+            self.fill_samples(idxs[:count], self.minibatch_class, data,
+                              labels, seed)
+        if prefetcher is not None:
+            self.schedule_prefetch(start_offset + count)
 
         if count < len(idxs):
             idxs[count:] = self.class_lengths[1]  # no data sample is there
-            self.croped_mean = self.cut_out(self.mean)
+            self.croped_mean = self.cut_out(self.mean.mem)
             self.minibatch_data.mem[count:] = self.croped_mean
             self.minibatch_labels.mem[count:] = 0  # 0 is no data
 
         return True
 
+    def schedule_prefetch(self, offset):
+        """Schedules the minibatches which are expected to be served
+        after the one ending at offset.
+        """
+        for offset, minibatch_class, count, epochs in upcoming_minibatches(
+                self.class_lengths, offset, self.max_minibatch_size,
+                self.prefetch_depth):
+            self._prefetcher_.schedule(
+                offset, self.shuffled_indices.mem[offset:offset + count],
+                minibatch_class,
+                (self.minibatch_seed(offset, self.epoch_number + epochs),))
+
+    def minibatch_seed(self, offset, epoch):
+        """Returns the seed of the augmentation of the minibatch which
+        starts at offset.
+        """
+        return self.augmentation_seed, epoch, offset
+
+    def fill_samples(self, indices, minibatch_class, data, labels, seed):
+        """Writes the augmented samples and their labels into data and
+        labels. May be called from the prefetching threads.
+        """
+        if self.mmap_samples:
+            self.fill_mapped(indices, minibatch_class, data, labels, seed)
+        else:
+            self.fill_sequential(indices, minibatch_class, data, labels,
+                                 seed)
+
+    def draw_augmentation(self, count, minibatch_class, seed):
+        """Generates the mirror flags and the crop offsets of the whole
+        minibatch with a single call to the random generator seeded by
+        seed. Crops are random in the train set and central otherwise.
+
+        :return: (count, 1) mirror flags and (count, 2) crop offsets.
+        """
+        offsets = numpy.empty((count, 2), dtype=numpy.int32)
+        offsets[:] = self.center_crop_offsets
+        if not self.mirror and minibatch_class != 2:
+            return numpy.zeros((count, 1), dtype=bool), offsets
+        uniform = numpy.random.RandomState(seed).rand(count, 3)
+        mirror = numpy.logical_and(uniform[:, :1] < 0.5, self.mirror)
+        if minibatch_class == 2:
+            crop_sy, crop_sx = self.crop_shape
+            numpy.multiply(
+                uniform[:, 1:], (self.sy - crop_sy + 1, self.sx - crop_sx + 1),
+                offsets, casting="unsafe")
+        return mirror, offsets
+
+    def augment(self, source, indices, minibatch_class, data, seed):
+        """Writes source[indices] cropped, mirrored, mean subtracted and
+        (if apply_rdisp) scaled into data using batched gathers.
+
+        :param source: (N, sy, sx, channels) uint8 array.
+        """
+        count = len(indices)
+        crop_sy, crop_sx = self.crop_shape
+        if not self.mirror and minibatch_class != 2:
+            # the same window for all samples
+            h_off, w_off = self.center_crop_offsets
+            rows = slice(h_off, h_off + crop_sy)
+            cols = slice(w_off, w_off + crop_sx)
+        else:
+            mirror, offsets = self.draw_augmentation(
+                count, minibatch_class, seed)
+            rows = offsets[:, :1] + numpy.arange(crop_sy)
+            cols = numpy.arange(crop_sx)
+            cols = offsets[:, 1:] + numpy.where(mirror, cols[::-1], cols)
+            rows = rows[:, :, numpy.newaxis]
+            cols = cols[:, numpy.newaxis, :]
+            indices = indices[:, numpy.newaxis, numpy.newaxis]
+        data = data[:count]
+        data[:] = source[indices, rows, cols, :self.channels]
+        if not self.has_mean_file:
+            return
+        data -= self.mean.mem[rows, cols, :self.channels]
+        if self.apply_rdisp:
+            data *= self.rdisp.mem[rows, cols, :self.channels]
+
+    def fill_sequential(self, indices, minibatch_class, data, labels,
+                        seed):
+        count = len(indices)
+        samples = numpy.empty((count, self.sy, self.sx, self.channels),
+                              dtype=numpy.uint8)
+        sample_bytes = samples[0].nbytes
+        with self._file_lock_:
+            # read in the file order
+            for index in numpy.argsort(indices):
+                self.file_samples.seek(int(indices[index]) * sample_bytes)
+                self.file_samples.readinto(samples[index])
+        self.augment(samples, numpy.arange(count), minibatch_class, data,
+                     seed)
+        labels[:count] = [self.original_labels[int(i)] for i in indices]
+
+    def fill_mapped(self, indices, minibatch_class, data, labels, seed):
+        self.augment(self.samples, indices, minibatch_class, data, seed)
+        labels[:len(indices)] = [
+            self.original_labels[int(i)] for i in indices]
+
     def fill_minibatch(self):
         # minibatch was filled in fill_indices, so fill_minibatch not need
         raise error.Bug("Control should not go here")
@@ -7,16 +7,31 @@ A loader for LMDB base (CAFFE intermediate format).
 Copyright (c) 2014, Samsung Electronics, Co., Ltd.
 """
 
+from collections import OrderedDict
+
 import numpy
 from zope.interface import implementer
 
 import lmdb
 from veles.loader import IImageLoader, ImageLoader, CLASS_NAME
 from veles.znicz.loader.caffe import Datum
+from veles.znicz.loader.datum import decode_datum, DatumDecodePool
 
 
 @implementer(IImageLoader)
 class LMDBLoader(ImageLoader):
+    """Loads images from LMDB databases of CAFFE Datum-s.
+
+    If use_cache is True, the parsed Datum-s are kept in the LRU cache
+    which is limited by cache_size bytes of the image data. The keys of
+    each minibatch are fetched in advance with get_data() in the order of
+    the database.
+
+    If fast_decode is True, Datum-s are decoded by
+    :func:`veles.znicz.loader.datum.decode_datum` instead of protobuf and
+    the image data is not copied. decode_processes > 0 enables decoding of
+    the minibatch keys in the process pool.
+    """
     MAPPING = "lmdb"
 
     def __init__(self, workflow, **kwargs):
@@ -30,6 +45,9 @@ class LMDBLoader(ImageLoader):
         self.db_color_space = kwargs.get("db_colorspace", "RGB")
         self.db_splitted_channels = kwargs.get("db_splitted_channels", True)
         self.use_cache = kwargs.get("use_cache", True)
+        self.cache_size = kwargs.get("cache_size", 128 * 1024 * 1024)
+        self.fast_decode = kwargs.get("fast_decode", True)
+        self.decode_processes = kwargs.get("decode_processes", 0)
         self._cache_hits = 0
         self._cache_misses = 0
 
@@ -37,7 +55,10 @@ class LMDBLoader(ImageLoader):
         super(LMDBLoader, self).init_unpickled()
         # LMDB base cursors, used as KV-iterators
         self._cursors_ = [None] * 3
-        self._cache_ = None, None
+        # key -> (Datum, size), the least recently used first
+        self._cache_ = OrderedDict()
+        self._cache_bytes_ = 0
+        self._decode_pool_ = None
 
     @property
     def cache_hits(self):
@@ -47,6 +68,10 @@ class LMDBLoader(ImageLoader):
     def cache_misses(self):
         return self._cache_misses
 
+    @property
+    def cache_bytes(self):
+        return self._cache_bytes_
+
     @property
     def files(self):
         return self._files
@@ -90,7 +115,7 @@ class LMDBLoader(ImageLoader):
         """Return the image data associated with the specified key.
         """
         datum = self.get_cached_data(key)
-        img = numpy.fromstring(datum.data, dtype=numpy.uint8)
+        img = numpy.frombuffer(datum.data, dtype=numpy.uint8)
         osh = self.original_shape
         if not self.db_splitted_channels:
             img = img.reshape(osh)
@@ -100,24 +125,65 @@ class LMDBLoader(ImageLoader):
         return img
 
     def get_cached_data(self, key):
-        if self.use_cache:
-            if key != self._cache_[0]:
-                datum = self.get_datum(key)
-                self._cache_misses += 1
-            else:
-                datum = self._cache_[1]
-                self._cache_hits += 1
-        else:
+        if not self.use_cache:
+            return self.get_datum(key)
+        cached = self._cache_.pop(key, None)
+        if cached is None:
+            self._cache_misses += 1
             datum = self.get_datum(key)
-        return datum
+            self._cache_datum(key, datum)
+            return datum
+        self._cache_hits += 1
+        self._cache_[key] = cached
+        return cached[0]
+
+    def get_data(self, keys):
+        """
+        Return the list of Datum-s for the specified keys. The keys which
+        are not cached are read in the sorted order, so that the database
+        pages are accessed sequentially.
+        """
+        if not self.use_cache:
+            return [self.get_datum(key) for key in keys]
+        missing = sorted(set(keys) - set(self._cache_))
+        for key, datum in zip(missing, self.decode_data(missing)):
+            self._cache_datum(key, datum)
+        self._cache_misses += len(missing)
+        self._cache_hits += len(keys) - len(missing)
+        result = []
+        for key in keys:
+            cached = self._cache_.pop(key, None)
+            if cached is None:
+                # evicted by the next keys, cache_size is too small
+                result.append(self.get_datum(key))
+                continue
+            self._cache_[key] = cached
+            result.append(cached[0])
+        return result
 
     def get_datum(self, key):
         index, dkey = key
+        return self.decode(self._cursors_[index].get(dkey))
+
+    def decode(self, raw):
+        if self.fast_decode:
+            return decode_datum(raw)
         datum = Datum()
-        datum.ParseFromString(self._cursors_[index].get(dkey))
-        self._cache_ = key, datum
+        datum.ParseFromString(raw)
         return datum
 
+    def decode_data(self, keys):
+        """
+        Return the list of Datum-s for the specified keys, decoded in
+        the process pool if decode_processes is positive.
+        """
+        if self.decode_processes <= 0 or not self.fast_decode:
+            return [self.get_datum(key) for key in keys]
+        if self._decode_pool_ is None:
+            self._decode_pool_ = DatumDecodePool(self.decode_processes)
+        return self._decode_pool_.decode(
+            [self._cursors_[index].get(dkey) for index, dkey in keys])
+
     def get_keys(self, index):
         """
         Return a list of image keys for the specified class index.
@@ -126,13 +192,33 @@ class LMDBLoader(ImageLoader):
         cursor = self._cursors_[index]
         if cursor is None:
             return []
-        keys = [(index, cursor.key())]
-        while cursor.next():
-            keys.append((index, cursor.key()))
+        cursor.first()
+        keys = [(index, key)
+                for key in cursor.iternext(keys=True, values=False)]
         cursor.first()
 
         return keys
 
+    def fill_minibatch(self):
+        if self.use_cache:
+            self.minibatch_indices.map_read()
+            keys = []
+            for index in self.minibatch_indices.mem[:self.minibatch_size]:
+                class_index, remainder = self.class_index_by_sample_index(
+                    int(index))
+                # the remainder is counted from the end of the class
+                keys.append(self.class_keys[class_index][-remainder])
+            self.get_data(keys)
+        super(LMDBLoader, self).fill_minibatch()
+
+    def _cache_datum(self, key, datum):
+        size = len(datum.data)
+        self._cache_[key] = datum, size
+        self._cache_bytes_ += size
+        while self._cache_bytes_ > self.cache_size and self._cache_:
+            _, (_, size) = self._cache_.popitem(last=False)
+            self._cache_bytes_ -= size
+
     def load_data(self):
         for index, _ in enumerate(CLASS_NAME):
             self._initialize_cursor(index)
@@ -140,9 +226,12 @@ class LMDBLoader(ImageLoader):
 
     def stop(self):
         super(LMDBLoader, self).stop()
+        if self._decode_pool_ is not None:
+            self._decode_pool_.close()
+            self._decode_pool_ = None
         self.info("Cache hits/misses: %d/%d (%d%%)", self.cache_hits,
-                  self.cache_misses, self.cache_hits * 100 // (
-                      self.cache_hits + self.cache_misses))
+                  self.cache_misses, self.cache_hits * 100 // max(
+                      self.cache_hits + self.cache_misses, 1))
 
     def _initialize_cursor(self, index):
         if self._files == (None, None, None):
@@ -56,12 +56,57 @@ train_image_dir = os.path.join(mnist_dir, "train-images.idx3-ubyte")
 train_label_dir = os.path.join(mnist_dir, "train-labels.idx1-ubyte")
 
 
+# IDX type codes, see http://yann.lecun.com/exdb/mnist
+IDX_TYPES = {0x08: numpy.uint8, 0x09: numpy.int8, 0x0B: ">i2", 0x0C: ">i4",
+             0x0D: ">f4", 0x0E: ">f8"}
+
+
+def read_idx(file_name, shape=None):
+    """Memory-maps the IDX file after validating its header.
+
+    :param shape: the expected shape of the data.
+    :return: read-only numpy.memmap.
+    """
+    with open(file_name, "rb") as fin:
+        header = fin.read(4)
+        if len(header) != 4 or header[:2] != b"\0\0":
+            raise error.BadFormatError("Wrong header in %s" % file_name)
+        code, ndim = struct.unpack(">2B", header[2:])
+        if code not in IDX_TYPES:
+            raise error.BadFormatError(
+                "Unknown data type 0x%02X in %s" % (code, file_name))
+        dims = fin.read(4 * ndim)
+        if len(dims) != 4 * ndim:
+            raise error.BadFormatError("Truncated header in %s" % file_name)
+    actual_shape = struct.unpack(">%di" % ndim, dims)
+    if shape is not None and actual_shape != tuple(shape):
+        raise error.BadFormatError(
+            "Wrong shape of %s: %s (expected %s)" % (
+                file_name, actual_shape, tuple(shape)))
+    dtype = numpy.dtype(IDX_TYPES[code])
+    offset = 4 + 4 * ndim
+    size = int(numpy.prod(actual_shape)) * dtype.itemsize
+    if os.path.getsize(file_name) < offset + size:
+        raise error.BadFormatError("EOF reached while reading %s" %
+                                   file_name)
+    return numpy.memmap(file_name, dtype=dtype, mode="r", offset=offset,
+                        shape=actual_shape)
+
+
 @implementer(IFullBatchLoader)
 class MnistLoader(FullBatchLoader):
     """Loads MNIST dataset.
+
+    Attributes:
+        test_only: in testing mode, load only the 10000 test samples
+            instead of all the 70000.
     """
     MAPPING = "mnist_loader"
 
+    def __init__(self, workflow, **kwargs):
+        super(MnistLoader, self).__init__(workflow, **kwargs)
+        self.test_only = kwargs.get("test_only", False)
+
     def load_original(self, offs, labels_count, labels_fnme, images_fnme):
         """Loads data from original MNIST files.
         """
@@ -89,54 +134,17 @@ class MnistLoader(FullBatchLoader):
                         fout.write(fin.read())
                     os.remove(gz_file)
 
-        # Reading labels:
-        with open(labels_fnme, "rb") as fin:
-            header, = struct.unpack(">i", fin.read(4))
-            if header != 2049:
-                raise error.BadFormatError("Wrong header in train-labels")
-
-            n_labels, = struct.unpack(">i", fin.read(4))
-            if n_labels != labels_count:
-                raise error.BadFormatError("Wrong number of labels in "
-                                           "train-labels")
-
-            arr = numpy.zeros(n_labels, dtype=numpy.byte)
-            n = fin.readinto(arr)
-            if n != n_labels:
-                raise error.BadFormatError("EOF reached while reading labels "
-                                           "from train-labels")
-            self.original_labels[offs:offs + labels_count] = arr[:]
-            if (numpy.min(self.original_labels) != 0 or
-                    numpy.max(self.original_labels) != 9):
-                raise error.BadFormatError(
-                    "Wrong labels range in train-labels.")
-
-        # Reading images:
-        with open(images_fnme, "rb") as fin:
-            header, = struct.unpack(">i", fin.read(4))
-            if header != 2051:
-                raise error.BadFormatError("Wrong header in train-images")
-
-            n_images, = struct.unpack(">i", fin.read(4))
-            if n_images != n_labels:
-                raise error.BadFormatError("Wrong number of images in "
-                                           "train-images")
-
-            n_rows, n_cols = struct.unpack(">2i", fin.read(8))
-            if n_rows != 28 or n_cols != 28:
-                raise error.BadFormatError("Wrong images size in train-images,"
-                                           " should be 28*28")
-
-            # 0 - white, 255 - black
-            pixels = numpy.zeros(n_images * n_rows * n_cols, dtype=numpy.ubyte)
-            n = fin.readinto(pixels)
-            if n != n_images * n_rows * n_cols:
-                raise error.BadFormatError("EOF reached while reading images "
-                                           "from train-images")
-
-        # Transforming images into float arrays and normalizing to [-1, 1]:
-        images = pixels.astype(numpy.float32).reshape(n_images, n_rows, n_cols)
-        self.original_data.mem[offs:offs + n_images] = images[:]
+        labels = read_idx(labels_fnme, (labels_count,))
+        if labels.min() != 0 or labels.max() != 9:
+            raise error.BadFormatError(
+                "Wrong labels range in %s" % labels_fnme)
+        self.original_labels[offs:offs + labels_count] = labels.tolist()
+
+        # 0 - white, 255 - black
+        images = read_idx(images_fnme, (labels_count, 28, 28))
+        # the only conversion, straight from the page cache
+        numpy.copyto(self.original_data.mem[offs:offs + labels_count],
+                     images)
 
     def load_data(self):
         """Here we will load MNIST data.
@@ -146,10 +154,11 @@ class MnistLoader(FullBatchLoader):
             self.class_lengths[VALID] = 10000
             self.class_lengths[TRAIN] = 60000
         else:
-            self.class_lengths[TEST] = 70000
+            self.class_lengths[TEST] = 10000 if self.test_only else 70000
             self.class_lengths[VALID] = self.class_lengths[TRAIN] = 0
         self.create_originals((28, 28))
-        self.original_labels[:] = (0 for _ in range(len(self.original_labels)))
         self.info("Loading from original MNIST files...")
         self.load_original(0, 10000, test_label_dir, test_image_dir)
-        self.load_original(10000, 60000, train_label_dir, train_image_dir)
+        if not (self.testing and self.test_only):
+            self.load_original(10000, 60000, train_label_dir,
+                               train_image_dir)
@@ -39,10 +39,11 @@ import numpy
 from zope.interface import implementer
 
 from veles.loader import VALID, TEST, IFullBatchLoader, FullBatchLoader, TRAIN
+from veles.znicz.loader.binary_cache import BinaryCacheMixin
 
 
 @implementer(IFullBatchLoader)
-class WineLoader(FullBatchLoader):
+class WineLoader(BinaryCacheMixin, FullBatchLoader):
     """Loads Wine dataset.
     """
     MAPPING = "wine_loader"
@@ -53,6 +54,9 @@ class WineLoader(FullBatchLoader):
         self.dataset_file = kwargs["dataset_file"]
 
     def load_data(self):
+        if self.load_cache(self.dataset_file, testing=self.testing) \
+                is not None:
+            return
         arr = numpy.loadtxt(self.dataset_file, delimiter=',',
                             dtype=numpy.float32)
         self.original_data.mem = arr[:, 1:]
@@ -64,3 +68,4 @@ class WineLoader(FullBatchLoader):
         else:
             self.class_lengths[TEST] = self.original_data.shape[0]
             self.class_lengths[VALID] = self.class_lengths[TRAIN] = 0
+        self.save_cache(self.dataset_file, testing=self.testing)
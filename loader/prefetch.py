@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Background minibatch prefetching for the file-backed loaders.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+from collections import deque
+import threading
+
+import numpy
+from six.moves import queue
+
+from veles.logger import Logger
+
+
+class PrefetchJob(object):
+    """The minibatch being prefetched.
+    """
+    def __init__(self, key, indices, minibatch_class, buffers, params=()):
+        self.key = key
+        self.indices = numpy.array(indices)
+        self.minibatch_class = minibatch_class
+        self.params = tuple(params)
+        self.data, self.labels = buffers
+        self.done = threading.Event()
+        self.cancelled = False
+        self.exception = None
+
+    def matches(self, indices, minibatch_class, params=()):
+        return (self.minibatch_class == minibatch_class and
+                self.params == tuple(params) and
+                numpy.array_equal(self.indices, indices))
+
+
+class MinibatchPrefetcher(Logger):
+    """Fills the upcoming minibatches in the background threads, so that
+    the loader unit only copies the ready samples.
+
+    The loader schedules the minibatches it expects to serve next and asks
+    for the actual one with fetch(). The prediction is validated by the
+    minibatch indices and class, so reshuffling, the epoch ends and
+    the arbitrary minibatches of a slave are handled by falling back to
+    the synchronous fill.
+
+    The workers run in an arbitrary order and some of the scheduled
+    minibatches are discarded, so fill must not draw from the shared
+    random generator. Everything random (e.g. the seed of the
+    augmentation) is drawn by the loader and passed in params, which are
+    also validated by fetch().
+
+    Attributes:
+        fill: callable(indices, minibatch_class, data, labels, *params)
+            which writes the samples and the labels into data and labels
+            numpy arrays. It is called from several threads simultaneously.
+        depth: the maximal number of the minibatches filled in advance.
+        workers: the number of the worker threads.
+        hits: the number of minibatches served from the prefetched ones.
+        misses: the number of minibatches which were not prefetched.
+    """
+    def __init__(self, fill, data, labels, **kwargs):
+        super(MinibatchPrefetcher, self).__init__()
+        self.fill = fill
+        self.depth = kwargs.get("depth", 2)
+        self.workers = kwargs.get("workers", 1)
+        if self.depth < 1:
+            raise ValueError("depth must be positive (got %s)" % self.depth)
+        self._free = deque(
+            (numpy.empty_like(data), numpy.empty_like(labels))
+            for _ in range(self.depth))
+        self._pending = deque()
+        self._tasks = queue.Queue()
+        self._threads = []
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def pending_keys(self):
+        return [job.key for job in self._pending]
+
+    def start(self):
+        for _ in range(self.workers - len(self._threads)):
+            thread = threading.Thread(
+                target=self._work, name="%s-%d" % (
+                    self.__class__.__name__, len(self._threads)))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for job in self._pending:
+            job.cancelled = True
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        del self._threads[:]
+        while self._pending:
+            self._release(self._pending.popleft())
+
+    def schedule(self, key, indices, minibatch_class, params=()):
+        """Enqueues the minibatch for filling in the background.
+
+        :param key: the identifier of the minibatch, e.g. the offset.
+        :param params: the extra arguments of fill.
+        :return: True if scheduled; False if the queue is full or the key
+            is already pending.
+        """
+        if not self._free or key in self.pending_keys:
+            return False
+        job = PrefetchJob(key, indices, minibatch_class,
+                          self._free.popleft(), params)
+        self._pending.append(job)
+        self._tasks.put(job)
+        return True
+
+    def fetch(self, indices, minibatch_class, data, labels, params=()):
+        """Copies the prefetched minibatch into data and labels. The pending
+        minibatches scheduled before it are discarded. The minibatch must
+        have been scheduled with the same params.
+
+        :return: True if the minibatch was prefetched; otherwise, False and
+            data and labels are left intact.
+        """
+        count = len(indices)
+        while self._pending:
+            job = self._pending.popleft()
+            if not job.matches(indices, minibatch_class, params):
+                job.cancelled = True
+                self._release(job)
+                continue
+            job.done.wait()
+            try:
+                if job.exception is not None:
+                    raise job.exception
+                numpy.copyto(data[:count], job.data[:count])
+                numpy.copyto(labels[:count], job.labels[:count])
+            finally:
+                self._release(job)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def _release(self, job):
+        # the worker may still be writing into the buffers
+        job.done.wait()
+        self._free.append((job.data, job.labels))
+
+    def _work(self):
+        while True:
+            job = self._tasks.get()
+            if job is None:
+                return
+            try:
+                if not job.cancelled:
+                    self.fill(job.indices, job.minibatch_class, job.data,
+                              job.labels, *job.params)
+            except Exception as e:
+                self.exception("Failed to prefetch the minibatch %s",
+                               job.key)
+                job.exception = e
+            finally:
+                job.done.set()
+
+
+def upcoming_minibatches(class_lengths, offset, max_minibatch_size, count):
+    """Predicts the minibatches which the loader serves after the one
+    ending at offset, assuming that the classes are served in order.
+
+    :return: the list of (offset, minibatch class, size, epochs ahead).
+    """
+    ends = numpy.cumsum(class_lengths)
+    epochs = 0
+    result = []
+    for _ in range(count):
+        if offset >= ends[-1]:
+            offset = 0
+            epochs += 1
+        minibatch_class = int(numpy.searchsorted(ends, offset, "right"))
+        size = min(max_minibatch_size, int(ends[minibatch_class]) - offset)
+        result.append((offset, minibatch_class, size, epochs))
+        offset += size
+    return result
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Streaming statistics of the datasets for the normalization.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import numpy
+
+
+class RunningStatistics(object):
+    """Elementwise count, mean, variance, min and max of the samples which
+    are fed by minibatches.
+
+    The minibatch statistics are merged into the accumulated ones with
+    the pairwise formula of Chan et al., which is also used to merge
+    the accumulators of different workers, so the result does not depend
+    on how the samples were split. Everything is accumulated in float64;
+    the results are converted to the requested (float32 by default) type.
+
+    Every element has its own count, so that a minibatch may update only
+    a region of the accumulators, e.g. a bounding box of an image.
+    """
+    def __init__(self, shape, dtype=numpy.float64):
+        self.count = numpy.zeros(shape, dtype=dtype)
+        self._mean = numpy.zeros(shape, dtype=dtype)
+        self._m2 = numpy.zeros(shape, dtype=dtype)
+        self.min = numpy.full(shape, numpy.inf, dtype=dtype)
+        self.max = numpy.full(shape, -numpy.inf, dtype=dtype)
+
+    @property
+    def shape(self):
+        return self.count.shape
+
+    def update(self, samples, region=Ellipsis):
+        """Accumulates the minibatch.
+
+        :param samples: array of shape (batch size,) + region shape.
+        :param region: basic index (slices) of the updated elements.
+        """
+        samples = numpy.asarray(samples)
+        if not len(samples):
+            return self
+        batch = samples.astype(self._mean.dtype)
+        mean = batch.mean(axis=0)
+        batch -= mean
+        self._merge(region, len(samples), mean,
+                    numpy.einsum("i...,i...->...", batch, batch),
+                    samples.min(axis=0), samples.max(axis=0))
+        return self
+
+    def update_batches(self, samples, minibatch_size=1024):
+        """Accumulates all the samples in one pass, e.g. over numpy.memmap.
+        """
+        for start in range(0, len(samples), minibatch_size):
+            self.update(samples[start:start + minibatch_size])
+        return self
+
+    def merge(self, other):
+        """Adds the statistics accumulated by the other instance.
+        """
+        if other.shape != self.shape:
+            raise ValueError("Shapes differ: %s and %s" %
+                             (self.shape, other.shape))
+        self._merge(Ellipsis, other.count, other._mean, other._m2,
+                    other.min, other.max)
+        return self
+
+    def _merge(self, region, count, mean, m2, min_, max_):
+        total = self.count[region] + count
+        ratio = count / numpy.maximum(total, 1)
+        delta = mean - self._mean[region]
+        self._m2[region] += m2 + delta * delta * self.count[region] * ratio
+        self._mean[region] += delta * ratio
+        self.count[region] = total
+        numpy.minimum(self.min[region], min_, self.min[region])
+        numpy.maximum(self.max[region], max_, self.max[region])
+
+    def mean(self, dtype=numpy.float32):
+        return self._mean.astype(dtype)
+
+    def variance(self, dtype=numpy.float32, ddof=0):
+        return (self._m2 / numpy.maximum(self.count - ddof, 1)).astype(dtype)
+
+    def std(self, dtype=numpy.float32, ddof=0):
+        return numpy.sqrt(self.variance(numpy.float64, ddof)).astype(dtype)
+
+    def range(self, dtype=numpy.float32):
+        """max - min; zero where there were no samples.
+        """
+        return numpy.where(self.count > 0, self.max - self.min, 0).astype(
+            dtype)
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self._mean, "m2": self._m2,
+                "min": self.min, "max": self.max}
+
+    @staticmethod
+    def from_dict(state):
+        stats = RunningStatistics(state["count"].shape,
+                                  state["count"].dtype)
+        stats.count[:] = state["count"]
+        stats._mean[:] = state["mean"]
+        stats._m2[:] = state["m2"]
+        stats.min[:] = state["min"]
+        stats.max[:] = state["max"]
+        return stats
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Micro-batching request server for the compiled forward propagation.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+from collections import deque
+from concurrent.futures import Future
+import threading
+import time
+
+import numpy
+from six.moves import queue
+
+from veles.logger import Logger
+
+
+class MicroBatchingServer(Logger):
+    """In-process asynchronous front end which coalesces single samples
+    into minibatches, runs the predictor once per minibatch and scatters
+    the results back to the callers' futures.
+
+    A worker thread blocks until the first sample arrives, then collects
+    more samples until either max_batch_size is reached or max_wait
+    seconds have passed since the first one.
+
+    Example:
+        server = MicroBatchingServer(
+            lambda: workflow.compile_inference(max_batch_size=64),
+            max_batch_size=64, max_wait=0.002)
+        with server:
+            label = server.submit(sample).result().argmax()
+
+    Attributes:
+        predictor_factory: callable() which returns the predictor, e.g.
+            :class:`veles.znicz.inference_engine.InferenceEngine`. It is
+            called once per worker, so the predictors are never shared.
+        max_batch_size: the maximal number of samples in a minibatch.
+        max_wait: the maximal time in seconds the first sample of
+            a minibatch waits for the others.
+        concurrency: the number of worker threads.
+        latency_window: the number of the most recent request latencies
+            kept for the statistics.
+    """
+    def __init__(self, predictor_factory, **kwargs):
+        super(MicroBatchingServer, self).__init__()
+        self.predictor_factory = predictor_factory
+        self.max_batch_size = kwargs.get("max_batch_size", 32)
+        self.max_wait = kwargs.get("max_wait", 0.005)
+        self.concurrency = kwargs.get("concurrency", 1)
+        self.latency_window = kwargs.get("latency_window", 10000)
+        if self.max_batch_size < 1:
+            raise ValueError(
+                "max_batch_size must be positive (got %s)" %
+                self.max_batch_size)
+        if self.concurrency < 1:
+            raise ValueError(
+                "concurrency must be positive (got %s)" % self.concurrency)
+        self._queue = queue.Queue()
+        self._workers = []
+        # guards _stopping against the concurrent submit()
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def is_running(self):
+        return bool(self._workers)
+
+    def start(self):
+        if self.is_running:
+            return self
+        for index in range(self.concurrency):
+            worker = threading.Thread(
+                target=self._serve, args=(self.predictor_factory(),),
+                name="%s-%d" % (self.__class__.__name__, index))
+            worker.daemon = True
+            self._workers.append(worker)
+        self._started = time.time()
+        for worker in self._workers:
+            worker.start()
+        self.info("Started %d worker(s), max batch %d, max wait %.1f ms",
+                  self.concurrency, self.max_batch_size,
+                  self.max_wait * 1000)
+        return self
+
+    def stop(self):
+        """Processes the already submitted samples and joins the workers.
+        submit() raises ValueError from now on.
+        """
+        with self._lock:
+            if not self.is_running or self._stopping:
+                return
+            self._stopping = True
+            for _ in self._workers:
+                self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        # fail whatever the workers have not taken, so that nobody hangs
+        leftovers = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(ValueError("%s was stopped" % self))
+                leftovers += 1
+        if leftovers:
+            self.warning("Cancelled %d unprocessed samples", leftovers)
+        del self._workers[:]
+        self._stopping = False
+        self.info("Stopped: %s", self.stats)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def submit(self, sample):
+        """Enqueues a single sample.
+
+        :param sample: numpy array of the input sample shape.
+        :return: :class:`concurrent.futures.Future` with the output sample.
+        """
+        future = Future()
+        with self._lock:
+            if not self.is_running or self._stopping:
+                raise ValueError("%s is not running" % self)
+            self._queue.put((numpy.asarray(sample), future, time.time()))
+        return future
+
+    def predict(self, sample, timeout=None):
+        """Synchronous version of submit().
+        """
+        return self.submit(sample).result(timeout)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._started = time.time()
+            self._requests = 0
+            self._batches = 0
+            self._errors = 0
+            self._latencies = deque(maxlen=self.latency_window)
+
+    @property
+    def stats(self):
+        """Latency (in seconds) and throughput counters.
+        """
+        with self._stats_lock:
+            latencies = numpy.array(self._latencies)
+            elapsed = time.time() - self._started
+            stats = {
+                "requests": self._requests,
+                "batches": self._batches,
+                "errors": self._errors,
+                "mean_batch_size": self._requests / max(self._batches, 1),
+                "throughput": self._requests / elapsed if elapsed else 0.0,
+            }
+        if len(latencies):
+            stats.update(zip(
+                ("latency_p50", "latency_p90", "latency_p99"),
+                numpy.percentile(latencies, (50, 90, 99))))
+            stats["latency_mean"] = latencies.mean()
+            stats["latency_max"] = latencies.max()
+        return stats
+
+    def _collect(self):
+        """Blocks until a minibatch is assembled. Returns None on stop.
+        The samples which the callers have cancelled are dropped, the rest
+        can not be cancelled from now on.
+        """
+        batch = []
+        while not batch:
+            item = self._queue.get()
+            if item is None:
+                return None
+            if item[1].set_running_or_notify_cancel():
+                batch.append(item)
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.time()
+            try:
+                item = (self._queue.get(timeout=timeout) if timeout > 0
+                        else self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if item is None:
+                # let the next _collect() terminate this worker
+                self._queue.put(None)
+                break
+            if item[1].set_running_or_notify_cancel():
+                batch.append(item)
+        return batch
+
+    def _serve(self, predictor):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            futures = [future for _, future, _ in batch]
+            try:
+                results = predictor(numpy.stack(
+                    [sample for sample, _, _ in batch]))
+            except Exception as e:
+                self.exception("Failed to process a batch of %d samples",
+                               len(batch))
+                for future in futures:
+                    future.set_exception(e)
+                with self._stats_lock:
+                    self._errors += len(batch)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
+            now = time.time()
+            with self._stats_lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._latencies.extend(now - t for _, _, t in batch)
@@ -40,13 +40,62 @@ from veles.units import IUnit, Unit
 from veles.distributable import IDistributable
 
 
+class RingBuffer(object):
+    """Keeps the latest values of a tensor in the preallocated array,
+    so that storing them does not allocate memory.
+
+    The items are indexed from the oldest to the latest, negative indices
+    count from the latest.
+    """
+    def __init__(self, limit):
+        if limit < 1:
+            raise ValueError("limit must be positive (got %s)" % limit)
+        self.limit = limit
+        self.buffer = None
+        self.count = 0
+        self.next = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not -self.count <= index < self.count:
+            raise IndexError("%d is out of range [0, %d)" % (
+                index, self.count))
+        if index < 0:
+            index += self.count
+        return self.buffer[(self.next - self.count + index) % self.limit]
+
+    def append(self, value):
+        if self.buffer is None or self.buffer.shape[1:] != value.shape or \
+                self.buffer.dtype != value.dtype:
+            self.buffer = numpy.empty((self.limit,) + value.shape,
+                                      dtype=value.dtype)
+            self.count = 0
+            self.next = 0
+        numpy.copyto(self.buffer[self.next], value)
+        self.next = (self.next + 1) % self.limit
+        self.count = min(self.count + 1, self.limit)
+
+    def truncate(self, length):
+        """Forgets all but the oldest length items.
+        """
+        length = min(length, self.count)
+        self.next = (self.next - self.count + length) % self.limit
+        self.count = length
+
+
 @implementer(IUnit, IDistributable)
 class NNRollback(Unit):
     """
     Unit, whick returns workflow to the save state, if Model starts to diverge.
+
+    Attributes:
+        history_limit: the number of the stored states.
+        store_gradients: also store and restore the gradients; otherwise,
+            only weights and bias are stored, which halves the memory.
     """
-    weights_names = (
-        "weights", "bias", "gradient_weights", "gradient_bias")
+    gradients_names = ("gradient_weights", "gradient_bias")
 
     def __init__(self, workflow, **kwargs):
         super(NNRollback, self).__init__(workflow, **kwargs)
@@ -59,7 +108,8 @@ class NNRollback(Unit):
         self.improved = None
         self.demand("improved")
         self._gds = {}
-        self.history_limit = 2
+        self.history_limit = kwargs.get("history_limit", 2)
+        self.store_gradients = kwargs.get("store_gradients", True)
 
         # Workaround for difference in minibatch class serve order
         # in clear run and after the resuming from the snapshot.
@@ -73,7 +123,9 @@ class NNRollback(Unit):
         self.info("lr_plus=%.2f lr_minus=%.2f", self.lr_plus, self.lr_minus)
 
     def generate_data_for_slave(self, slave):
-        self.slaves[slave.id] = 1
+        # the slaves which prefetch the jobs have several of them
+        # outstanding
+        self.slaves[slave.id] = self.slaves.get(slave.id, 0) + 1
 
     def generate_data_for_master(self):
         return True
@@ -82,6 +134,9 @@ class NNRollback(Unit):
         pass
 
     def apply_data_from_slave(self, data, slave):
+        if self.slaves.get(slave.id, 0) > 1:
+            self.slaves[slave.id] -= 1
+            return
         self._slave_ended(slave)
 
     def _slave_ended(self, slave):
@@ -94,13 +149,20 @@ class NNRollback(Unit):
     def drop_slave(self, slave):
         self._slave_ended(slave)
 
+    @property
+    def weights_names(self):
+        names = ("weights", "bias")
+        if self.store_gradients:
+            names += self.gradients_names
+        return names
+
     def get_weights(self, gd, name, value):
         weights = getattr(gd, name)
         weights.map_read()
-        ww = value.get(name, [])
-        ww.append(weights.mem.copy())
-        while len(ww) > self.history_limit:
-            ww.pop(0)
+        ww = value.get(name)
+        if ww is None or ww.limit != self.history_limit:
+            ww = RingBuffer(self.history_limit)
+        ww.append(weights.mem)
         return ww
 
     def calculate_nans(self, gd, name):
@@ -112,19 +174,25 @@ class NNRollback(Unit):
             return 0
 
     def rollback_weights(self, gd, name, value, rollback_to):
+        """Restores the stored state into gd's array in place and forgets
+        the states after it.
+        """
         weights = getattr(gd, name)
         ww = value.get(name)
-        if ww is None:
+        if not ww:
             self.warning("No rollback for %s" % name)
-        else:
-            self.info("Rolling back to stored weights")
-            weights.map_invalidate()
-            weights_to_return = ww[rollback_to]
-            if rollback_to >= 0:
-                del ww[rollback_to + 1:]
-            return weights_to_return
+            return False
+        self.info("Rolling back %s of %s", name, gd)
+        weights.map_invalidate()
+        numpy.copyto(weights.mem, ww[rollback_to])
+        if rollback_to >= 0:
+            ww.truncate(rollback_to + 1)
+        return True
 
     def run(self):
+        if self.is_slave:
+            # the master keeps the states
+            return
         if self.improved:
             self._plus_steps += 1
             if self._plus_steps < self.plus_steps:
@@ -172,11 +240,14 @@ class NNRollback(Unit):
                 _gd.learning_rate_bias *= k
                 self.info("Decreased lr of %s by %.2f, new_lr %.2e",
                           repr(_gd), k, _gd.learning_rate)
+                restored = False
                 for weights_name in self.weights_names:
                     if getattr(_gd, weights_name, None):
-                        setattr(_gd, "%s.mem[:]" % weights_name,
-                                self.rollback_weights(
-                                    _gd, weights_name, kv, rollback_to))
+                        restored |= self.rollback_weights(
+                            _gd, weights_name, kv, rollback_to)
+                if restored and hasattr(_gd, "sync_master_vectors"):
+                    # refresh the full precision copies
+                    _gd.sync_master_vectors()
 
         self._first_run = False
 
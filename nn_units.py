@@ -36,22 +36,28 @@ under the License.
 
 
 from __future__ import division
-from collections import defaultdict
+from collections import defaultdict, deque
 import gc
+import json
 import numpy
 import logging
+import os
 import time
+from six.moves import queue
 import six
 import tarfile
+import threading
 from zope.interface import implementer
 from veles.avatar import Avatar
 
+from veles.backends import NumpyDevice
 from veles.external.prettytable import PrettyTable
 from veles.distributable import IDistributable
 from veles.loader import Loader
 from veles.memory import reshape_transposed, roundup, Array
 from veles.mutable import Bool
 from veles.accelerated_units import AcceleratedUnit, AcceleratedWorkflow
+import veles.error as error
 import veles.prng as prng
 from veles.units import UnitCommandLineArgumentsRegistry
 from veles.workflow import Repeater
@@ -60,6 +66,47 @@ from veles.snapshotter import SnapshotterBase, SnapshotterToFile, \
 from veles.timeit2 import timeit
 from veles.znicz.decision import DecisionBase
 from veles.znicz.evaluator import EvaluatorBase
+from veles.znicz.gradient_compression import create_compressor, \
+    decompress, decompress_add
+from veles.znicz.shared_memory import share, unshare
+
+
+#: Storage dtype of the mixed precision mode.
+HALF_DTYPE = numpy.float16
+#: Compute dtype of the mixed precision mode.
+HALF_COMPUTE_DTYPE = numpy.float32
+#: Offsets of the arrays in NNWorkflow.export_mapped() blob are multiples of
+#: this value.
+MAPPED_EXPORT_ALIGNMENT = 64
+#: The unit attributes NNWorkflow.export_mapped() writes.
+MAPPED_EXPORT_ATTRS = ("weights", "bias")
+
+
+def upcast_half(mem):
+    """Returns the float32 copy of mem if it is stored in half precision,
+    otherwise, mem itself.
+    """
+    if mem.dtype == HALF_DTYPE:
+        return mem.astype(HALF_COMPUTE_DTYPE)
+    return mem
+
+
+def half_dot(a, b, out):
+    """numpy.dot() which computes half precision operands in float32 and
+    stores the result into out, whatever its dtype is.
+    """
+    a, b = upcast_half(a), upcast_half(b)
+    if out.dtype == numpy.result_type(a, b):
+        return numpy.dot(a, b, out)
+    out[:] = numpy.dot(a, b)
+    return out
+
+
+def runs_on_numpy(unit):
+    """Returns True if the specified accelerated unit executes numpy_run().
+    """
+    return (getattr(unit, "force_numpy", False) or unit.device is None or
+            isinstance(unit.device, NumpyDevice))
 
 
 class Match(list):
@@ -128,6 +175,25 @@ class Forward(ForwardBase):
         weights_stddev: magnitude of the random distribution for weights.
         bias_stddev: magnitude of the random distribution for bias.
         rand: prng.Rand() object for initial weights generation.
+        half_precision: store weights, bias and output in float16 while
+            computing in float32 (numpy backend only). Defaults to the
+            workflow's half_precision.
+        snapshot_half_precision: pickle weights and bias in float16.
+        weights_version: incremented by the master each time it notices
+            that weights or bias have changed.
+        weights_history: the number of the latest versions of weights and
+            bias the master keeps to send the deltas against them to
+            the slaves. 0 means always sending the full tensors.
+        weights_delta_ratio: the delta is sent instead of the full tensor
+            if its size is less than this fraction of the tensor's size.
+        shared_memory: pass weights and bias to the slaves through
+            the shared memory, see :mod:`veles.znicz.shared_memory`.
+            Defaults to the workflow's shared_memory.
+        local_steps: if greater than 1, the slaves train locally and
+            the gradient descent units synchronize weights and bias
+            instead, see GradientDescentBase.local_steps. Defaults to
+            the workflow's local_steps; the gradient descent unit which
+            updates the same weights overwrites it in initialize().
     """
     hide_from_registry = True
     MAPPING = set()
@@ -135,6 +201,18 @@ class Forward(ForwardBase):
     def __init__(self, workflow, **kwargs):
         kwargs["view_group"] = kwargs.get("view_group", "WORKER")
         super(Forward, self).__init__(workflow, **kwargs)
+        self.weights_version = 0
+        self.weights_history = kwargs.get("weights_history", 4)
+        self.weights_delta_ratio = kwargs.get("weights_delta_ratio", 0.5)
+        self.local_steps = kwargs.get(
+            "local_steps", getattr(workflow, "local_steps", 1))
+        self.shared_memory = kwargs.get(
+            "shared_memory", getattr(workflow, "shared_memory", False))
+        self.half_precision = kwargs.get(
+            "half_precision", getattr(workflow, "half_precision", False))
+        self.snapshot_half_precision = kwargs.get(
+            "snapshot_half_precision",
+            getattr(workflow, "snapshot_half_precision", False))
         self.weights_stddev = kwargs.get("weights_stddev")
         self.bias_stddev = kwargs.get("bias_stddev", self.weights_stddev)
         self.weights_filling = kwargs.get("weights_filling", "uniform")
@@ -150,6 +228,13 @@ class Forward(ForwardBase):
         self.exports = ["weights", "bias", "include_bias",
                         "weights_transposed"]
 
+    def init_unpickled(self):
+        super(Forward, self).init_unpickled()
+        # (version, [weights copy, bias copy]) of the latest versions
+        self._weights_snapshots_ = deque()
+        # slave id -> the version it holds
+        self._slave_versions_ = {}
+
     @property
     def forward_mode(self):
         return self._forward_mode
@@ -161,27 +246,147 @@ class Forward(ForwardBase):
                 "forward_mode must be boolean (got %s)" % type(value))
         self._forward_mode = value
 
+    def __getstate__(self):
+        state = super(Forward, self).__getstate__()
+        if self.snapshot_half_precision:
+            for name in "weights", "bias":
+                vec = state.get(name)
+                if vec and vec.dtype != HALF_DTYPE:
+                    vec.map_read()
+                    state[name] = Array(vec.mem.astype(HALF_DTYPE))
+        return state
+
+    @property
+    def storage_dtype(self):
+        return HALF_DTYPE if self.half_precision else self.input.dtype
+
     def initialize(self, device, **kwargs):
         self.forward_mode = kwargs.get("forward_mode", False)
         super(Forward, self).initialize(device=device, **kwargs)
+        if self.half_precision and not runs_on_numpy(self):
+            raise ValueError(
+                "%s: half_precision is supported only on numpy backend" %
+                self)
+
+    def cast_to_storage(self):
+        """Converts weights, bias and output to :attr:`storage_dtype`.
+        Descendants call it after they have created those arrays; it also
+        restores full precision of the weights loaded from a half precision
+        snapshot.
+        """
+        dtype = self.storage_dtype
+        for vec in self.weights, self.bias, self.output:
+            if vec and vec.dtype != dtype:
+                vec.map_read()
+                vec.reset(vec.mem.astype(dtype))
+
+    def snapshot_weights(self):
+        """Increments weights_version if weights or bias differ from
+        the latest snapshot.
+
+        :return: [weights, bias] numpy arrays (None if empty).
+        """
+        current = []
+        for vec in self.weights, self.bias:
+            if vec:
+                vec.map_read()
+                current.append(vec.mem)
+            else:
+                current.append(None)
+        snapshots = self._weights_snapshots_
+        if snapshots and all(
+                (old is None) == (new is None) and
+                (new is None or numpy.array_equal(old, new))
+                for old, new in zip(snapshots[-1][1], current)):
+            return current
+        self.weights_version += 1
+        snapshots.append((self.weights_version,
+                          [None if v is None else v.copy() for v in current]))
+        while len(snapshots) > self.weights_history:
+            snapshots.popleft()
+        return current
+
+    def encode_delta(self, current, old):
+        """Returns None if current equals old, (flat int32 indices, new
+        values) of the changed elements if there are few of them or
+        the full tensor otherwise.
+        """
+        if current is None:
+            return None
+        if old is None or old.shape != current.shape:
+            return current
+        changed = numpy.flatnonzero(current != old)
+        if not len(changed):
+            return None
+        if (len(changed) * (4 + current.itemsize) >=
+                current.nbytes * self.weights_delta_ratio):
+            return current
+        return (changed.astype(numpy.int32),
+                current.reshape(-1)[changed])
+
+    @staticmethod
+    def apply_delta(vec, delta):
+        """Applies :meth:`encode_delta` result to the Array in place.
+        """
+        if delta is None:
+            return
+        if isinstance(delta, numpy.ndarray):
+            if vec:
+                vec.map_invalidate()
+                numpy.copyto(vec.mem, delta)
+            else:
+                vec.reset(delta)
+            return
+        indices, values = delta
+        vec.map_write()
+        vec.mem.reshape(-1)[indices] = values
 
     def generate_data_for_slave(self, slave):
         if self.forward_mode:
             return None
-        data = [None, None]
-        if self.weights:
-            self.weights.map_read()
-            data[0] = self.weights.mem
-        if self.bias:
-            self.bias.map_read()
-            data[1] = self.bias.mem
-        return data
+        if self.local_steps > 1 and slave is not None:
+            # the gradient descent units synchronize the weights
+            return None
+        if not self.weights_history or slave is None:
+            data = [None, None]
+            if self.weights:
+                self.weights.map_read()
+                data[0] = self.weights.mem
+            if self.bias:
+                self.bias.map_read()
+                data[1] = self.bias.mem
+            if slave is None:
+                # the local copy, e.g. extract_forward_workflow()
+                return data
+            return share(data) if self.shared_memory else data
+        current = self.snapshot_weights()
+        base = self._slave_versions_.get(slave.id)
+        old = dict(self._weights_snapshots_).get(base)
+        if old is None:
+            base = None
+            old = [None, None]
+        self._slave_versions_[slave.id] = self.weights_version
+        data = {"version": self.weights_version, "base": base,
+                "weights": self.encode_delta(current[0], old[0]),
+                "bias": self.encode_delta(current[1], old[1])}
+        return share(data) if self.shared_memory else data
 
     def generate_data_for_master(self):
         return None
 
     def apply_data_from_master(self, data):
-        if self.forward_mode:
+        if self.forward_mode or data is None:
+            return
+        data = unshare(data)
+        if isinstance(data, dict):
+            if data["base"] is not None and \
+                    data["base"] != self.weights_version:
+                raise ValueError(
+                    "%s: got the delta against weights version %d, but "
+                    "have %d" % (self, data["base"], self.weights_version))
+            self.apply_delta(self.weights, data["weights"])
+            self.apply_delta(self.bias, data["bias"])
+            self.weights_version = data["version"]
             return
         if self.weights:
             self.weights.map_invalidate()
@@ -198,7 +403,8 @@ class Forward(ForwardBase):
         pass
 
     def drop_slave(self, slave):
-        pass
+        # the reconnected slave will get the full tensors
+        self._slave_versions_.pop(slave.id, None)
 
 
 class NNLayerBase(Forward):
@@ -292,6 +498,50 @@ class GradientDescentBase(AcceleratedUnit):
         gradient_bias_with_moment
         batch_size: effective batch size (if None, get it from y).
         weights_transposed: assume weights matrix as a transposed one.
+        master_weights: float32 copy of half precision weights which
+            gradient is applied to.
+        master_bias
+        loss_scale: the multiplier of err_output applied by the evaluator,
+            the gradient is divided by it.
+        gradient_compression: the configuration of the compressor of
+            the gradients sent from slave to master, see
+            :func:`veles.znicz.gradient_compression.create_compressor`.
+        gradient_compressor: the compressor itself.
+        aggregate_updates: if greater than 1, the master sums this many
+            slave updates in the staging buffer and applies them to
+            the weights at once, with the moment applied once.
+        aggregate_timeout: the staged updates are applied if the oldest
+            of them has been waiting for this number of seconds, even if
+            there are less than aggregate_updates of them.
+        backup_workers: if not None, the master runs synchronous steps:
+            it applies the sum of the updates once all but this number of
+            the slaves which got the jobs of the current step have
+            reported and does not give out new jobs after the first
+            report until then. The reports of the stragglers which arrive
+            after the step are late; the stragglers join the next step.
+        late_update_weight: the late update is multiplied by this value
+            raised to the power of its staleness in steps, 0 discards the
+            late updates.
+        slave_latencies: the histograms of the job round trip times of
+            each slave over LATENCY_BINS seconds.
+        aggregation_step: the number of the synchronous steps made.
+        local_steps: local SGD mode if greater than 1: the slaves apply
+            the gradients to their own weights for this number of jobs
+            with their own moment and then send the delta of weights and
+            bias since the last synchronization instead of the gradients.
+            The master adds each delta divided by the number of the
+            slaves, which averages the slaves' models, and sends its
+            weights and bias with the next job. Defaults to the workflow's
+            local_steps. The forward unit with the same weights follows
+            this value.
+        adaptive_local_steps: the master chooses local_steps for each
+            slave so that the synchronization takes local_comm_ratio of
+            the local computation time, but at most max_local_steps.
+        max_local_steps
+        local_comm_ratio
+        shared_memory: pass the gradients to the master through the shared
+            memory, see :mod:`veles.znicz.shared_memory`. Defaults to
+            the workflow's shared_memory.
         apply_gradient: will apply gradient.
         gradient_changed: when True, slave will send gradients to master
             (assigned to True just before the run call, so it can be set to
@@ -309,6 +559,9 @@ class GradientDescentBase(AcceleratedUnit):
     OP_ADD = 2
     OP_FLUSH = 3
 
+    #: The bins edges of the slave latency histograms, in seconds.
+    LATENCY_BINS = numpy.logspace(-3, 2, 16)
+
     def __init__(self, workflow, **kwargs):
         kwargs["view_group"] = kwargs.get("view_group", "TRAINER")
         super(GradientDescentBase, self).__init__(workflow, **kwargs)
@@ -331,8 +584,29 @@ class GradientDescentBase(AcceleratedUnit):
         self.need_err_input = kwargs.get("need_err_input", True)
         self.include_bias = kwargs.get("include_bias", True)
         self.factor_ortho = kwargs.get("factor_ortho", 0)
+        self.loss_scale = kwargs.get("loss_scale", 1.0)
+        self.gradient_compression = kwargs.get("gradient_compression")
+        self.gradient_compressor = create_compressor(
+            self.gradient_compression)
+        self.aggregate_updates = kwargs.get("aggregate_updates", 1)
+        self.aggregate_timeout = kwargs.get("aggregate_timeout")
+        self.backup_workers = kwargs.get("backup_workers")
+        self.late_update_weight = kwargs.get("late_update_weight", 0.0)
+        self.slave_latencies = {}
+        self.aggregation_step = 0
+        self.local_steps = kwargs.get(
+            "local_steps", getattr(workflow, "local_steps", 1))
+        self.adaptive_local_steps = kwargs.get("adaptive_local_steps", False)
+        self.max_local_steps = kwargs.get("max_local_steps", 64)
+        self.local_comm_ratio = kwargs.get("local_comm_ratio", 0.1)
+        self.shared_memory = kwargs.get(
+            "shared_memory", getattr(workflow, "shared_memory", False))
         self.col_sums = Array()  # for orthogonalization
 
+        # Full precision copies of half precision weights and bias
+        self.master_weights = Array(shallow_pickle=True)
+        self.master_bias = Array(shallow_pickle=True)
+
         # Current gradient as it is without applying learning_rate etc.
         self.gradient_weights = Array()
         self.gradient_bias = Array()
@@ -350,8 +624,8 @@ class GradientDescentBase(AcceleratedUnit):
         self.gradient_changed = False
 
         # Gradient will be applied to weights immediately just after computing
-        self.apply_gradient = kwargs.get("apply_gradient",
-                                         not workflow.is_slave)
+        self.apply_gradient = kwargs.get(
+            "apply_gradient", not workflow.is_slave or self.local_sgd)
 
         # Accumulates gradient from the previous run:
         # OP_NONE: do not allocate array at all
@@ -361,6 +635,30 @@ class GradientDescentBase(AcceleratedUnit):
         self.accumulate_gradient = kwargs.get("accumulate_gradient",
                                               self.OP_NONE)
 
+    def init_unpickled(self):
+        super(GradientDescentBase, self).init_unpickled()
+        self._aggregation_lock_ = threading.Lock()
+        self._aggregation_queue_ = None
+        self._aggregation_thread_ = None
+        # summed weights and bias gradients
+        self._staged_ = [None, None]
+        self._staged_count_ = 0
+        self._staged_since_ = None
+        self._pending_updates_ = 0
+        # slave id -> deque of (step, time) of the outstanding jobs
+        self._slave_jobs_ = {}
+        # the ids of the slaves which got the jobs of the current step
+        self._step_slaves_ = set()
+        # master: slave id -> [jobs left, local steps]
+        self._slave_local_ = {}
+        # slave: weights and bias after the synchronization
+        self._local_origin_ = None
+        self._local_steps_done_ = 0
+        self._local_steps_left_ = 0
+        # slave: job start time, computation time, synchronization time
+        self._local_timing_ = [None, 0.0, None]
+        self._comm_ratio_ = None
+
     @property
     def current_batch_size(self):
         batch_size = getattr(self, "batch_size", None)
@@ -368,8 +666,81 @@ class GradientDescentBase(AcceleratedUnit):
             return self.err_output.mem.shape[0]
         return int(batch_size)
 
+    @property
+    def local_sgd(self):
+        return self.local_steps > 1
+
+    def link_local_steps(self):
+        """Sets local_steps of the forward units which own weights, so
+        that they stop sending weights to the slaves exactly when this
+        unit starts synchronizing them.
+        """
+        if not self.weights:
+            return
+        for unit in self.workflow.start_point.dependent_units():
+            if not isinstance(unit, Forward) or \
+                    unit.weights is not self.weights:
+                continue
+            if unit.local_steps != self.local_steps:
+                self.debug("%s: local_steps %d -> %d", unit,
+                           unit.local_steps, self.local_steps)
+                unit.local_steps = self.local_steps
+
+    @property
+    def half_precision(self):
+        """True if the linked weights are stored in half precision.
+        """
+        return bool(self.weights) and self.weights.dtype == HALF_DTYPE
+
+    def master_vector(self, name):
+        """Returns the full precision Array of "weights" or "bias" to which
+        the gradient must be applied.
+        """
+        if self.half_precision:
+            return getattr(self, "master_" + name)
+        return getattr(self, name)
+
+    def sync_master_vectors(self):
+        """Refreshes master_weights and master_bias from the half
+        precision storage.
+        """
+        if not self.half_precision:
+            return
+        for name in "weights", "bias":
+            vec = getattr(self, name)
+            if not vec:
+                continue
+            master = getattr(self, "master_" + name)
+            vec.map_read()
+            if not master or master.shape != vec.shape:
+                master.reset(vec.mem.astype(HALF_COMPUTE_DTYPE))
+            else:
+                master.map_invalidate()
+                numpy.copyto(master.mem, vec.mem)
+
+    def store_master_vector(self, name):
+        """Rounds the master copy of "weights" or "bias" back to the half
+        precision storage.
+        """
+        if not self.half_precision:
+            return
+        master = getattr(self, "master_" + name)
+        vec = getattr(self, name)
+        master.map_read()
+        vec.map_invalidate()
+        numpy.copyto(vec.mem, master.mem, casting="unsafe")
+
     def initialize(self, device, **kwargs):
         super(GradientDescentBase, self).initialize(device, **kwargs)
+        if (self.half_precision or self.loss_scale != 1.0) and \
+                not runs_on_numpy(self):
+            raise ValueError(
+                "%s: half precision weights and loss scaling are supported "
+                "only on numpy backend" % self)
+        self.link_local_steps()
+        self.sync_master_vectors()
+        weights = self.master_vector("weights")
+        bias = self.master_vector("bias")
 
         if self.weights:
             assert len(self.weights.shape) == 2
@@ -392,14 +763,14 @@ class GradientDescentBase(AcceleratedUnit):
 
         if self.weights:
             if not self.gradient_weights:
-                self.gradient_weights.reset(numpy.zeros_like(self.weights.mem))
+                self.gradient_weights.reset(numpy.zeros_like(weights.mem))
             else:
                 assert self.gradient_weights.size == self.weights.size
 
         if self.weights and self.accumulate_gradient != self.OP_NONE:
             if not self.accumulated_gradient_weights:
                 self.accumulated_gradient_weights.reset(
-                    numpy.zeros_like(self.weights.mem))
+                    numpy.zeros_like(weights.mem))
             else:
                 assert (self.accumulated_gradient_weights.size ==
                         self.weights.size)
@@ -407,7 +778,7 @@ class GradientDescentBase(AcceleratedUnit):
         if self.weights and (self.gradient_moment or not self.is_standalone):
             if not self.gradient_weights_with_moment:
                 self.gradient_weights_with_moment.reset(
-                    numpy.zeros_like(self.weights.mem))
+                    numpy.zeros_like(weights.mem))
             else:
                 assert self.gradient_weights_with_moment.size == \
                     self.weights.size
@@ -415,20 +786,20 @@ class GradientDescentBase(AcceleratedUnit):
         if (self.include_bias and self.bias and
             (not self.gradient_bias or
              self.gradient_bias.size != self.bias.size)):
-            self.gradient_bias.reset(numpy.zeros_like(self.bias.mem))
+            self.gradient_bias.reset(numpy.zeros_like(bias.mem))
 
         if (self.include_bias and self.bias and
             self.accumulate_gradient != self.OP_NONE and
             (not self.accumulated_gradient_bias or
              self.accumulated_gradient_bias.size != self.bias.size)):
             self.accumulated_gradient_bias.reset(numpy.zeros_like(
-                self.bias.mem))
+                bias.mem))
 
         if (self.include_bias and self.bias and
                 (self.gradient_moment_bias or not self.is_standalone)):
             if not self.gradient_bias_with_moment:
                 self.gradient_bias_with_moment.reset(
-                    numpy.zeros_like(self.bias.mem))
+                    numpy.zeros_like(bias.mem))
             else:
                 assert self.gradient_bias_with_moment.size == self.bias.size
 
@@ -455,7 +826,7 @@ class GradientDescentBase(AcceleratedUnit):
             if vec:
                 vec.initialize(self.device)
         self.init_vectors(
-            self.err_output,
+            self.err_output, self.master_weights, self.master_bias,
             self.gradient_weights, self.gradient_bias,
             self.accumulated_gradient_weights, self.accumulated_gradient_bias,
             self.gradient_weights_with_moment, self.gradient_bias_with_moment)
@@ -626,9 +997,37 @@ class GradientDescentBase(AcceleratedUnit):
         self.debug("\n" + weight_table.get_string())
 
     def generate_data_for_slave(self, slave):
-        return (self.learning_rate, self.weights_decay, self.gradient_moment,
+        if self.aggregation_due:
+            self.flush_gradients()
+        if slave is not None:
+            self._slave_jobs_.setdefault(slave.id, deque()).append(
+                (self.aggregation_step, time.time()))
+            self._step_slaves_.add(slave.id)
+        data = (self.learning_rate, self.weights_decay, self.gradient_moment,
                 self.learning_rate_bias, self.weights_decay_bias,
                 self.gradient_moment_bias)
+        if not self.local_sgd or slave is None:
+            return data
+        return data + (self.generate_local_sync(slave),)
+
+    def generate_local_sync(self, slave):
+        """Returns weights, bias and the number of the local steps if
+        the slave must synchronize with this job, otherwise None.
+        """
+        # [jobs left till the synchronization, local steps]
+        state = self._slave_local_.setdefault(
+            slave.id, [0, self.local_steps])
+        if state[0] > 0:
+            state[0] -= 1
+            return None
+        state[0] = state[1] - 1
+        sync = {"local_steps": state[1]}
+        for name in "weights", "bias":
+            vec = getattr(self, name)
+            if vec:
+                vec.map_read()
+                sync[name] = vec.mem
+        return share(sync) if self.shared_memory else sync
 
     @staticmethod
     def fill_zeros(vector):
@@ -644,38 +1043,293 @@ class GradientDescentBase(AcceleratedUnit):
         self.learning_rate_bias = data[3]
         self.weights_decay_bias = data[4]
         self.gradient_moment_bias = data[5]
-        self.fill_zeros(self.gradient_weights_with_moment)
-        self.fill_zeros(self.gradient_bias_with_moment)
+        if len(data) > 6:
+            self.apply_local_sync(data[6])
+        self.sync_master_vectors()
+        if not self.local_sgd:
+            self.fill_zeros(self.gradient_weights_with_moment)
+            self.fill_zeros(self.gradient_bias_with_moment)
         self.fill_zeros(self.gradient_weights)
         self.fill_zeros(self.gradient_bias)
         self.fill_zeros(self.accumulated_gradient_weights)
         self.fill_zeros(self.accumulated_gradient_bias)
 
+    def apply_local_sync(self, sync):
+        """Starts the local steps on the slave from the master's weights.
+        """
+        now = time.time()
+        timing = self._local_timing_
+        if sync is not None:
+            sync = unshare(sync)
+            if timing[2] is not None and timing[1]:
+                # the synchronization round trip vs the local step
+                self._comm_ratio_ = (now - timing[2]) / (
+                    timing[1] / self._local_steps_done_)
+            origin = []
+            for name in "weights", "bias":
+                vec = getattr(self, name)
+                if vec and name in sync:
+                    vec.map_invalidate()
+                    numpy.copyto(vec.mem, sync[name])
+                    origin.append(vec.mem.copy())
+                else:
+                    origin.append(None)
+            self._local_origin_ = origin
+            self._local_steps_left_ = self._local_steps_done_ = \
+                sync["local_steps"]
+            timing[1] = 0.0
+        timing[0] = now
+
+    def generate_local_delta(self):
+        """Returns the delta of weights and bias since the synchronization
+        when the local steps are done, otherwise None.
+        """
+        timing = self._local_timing_
+        if timing[0] is not None:
+            timing[1] += time.time() - timing[0]
+        if self._local_origin_ is None:
+            return None
+        self._local_steps_left_ -= 1
+        if self._local_steps_left_ > 0:
+            return None
+        delta = {"comm_ratio": self._comm_ratio_}
+        for name, origin in zip(("weights", "bias"), self._local_origin_):
+            if origin is None:
+                continue
+            vec = getattr(self, name)
+            vec.map_read()
+            delta[name] = vec.mem - origin
+        timing[2] = time.time()
+        return share(delta) if self.shared_memory else delta
+
+    def apply_local_delta(self, delta, slave):
+        """Adds the slave's delta averaged over the slaves to weights and
+        bias and adjusts the slave's local steps.
+
+        The averaging is asynchronous: there are no rounds, each delta is
+        applied as soon as it arrives and is divided by the number of
+        the connected slaves which have synchronized at least once. This
+        equals the model averaging if all the slaves synchronize at the
+        same pace; the slaves which sync more often contribute more.
+        """
+        scale = 1.0 / max(len(self._slave_local_), 1)
+        for name in "weights", "bias":
+            if name not in delta or not getattr(self, name):
+                continue
+            vec = self.master_vector(name)
+            vec.map_write()
+            vec.mem += delta[name] * scale
+            self.store_master_vector(name)
+        state = self._slave_local_.get(getattr(slave, "id", None))
+        ratio = delta.get("comm_ratio")
+        if not self.adaptive_local_steps or state is None or ratio is None:
+            return
+        steps = int(numpy.ceil(ratio / self.local_comm_ratio))
+        # at most double or halve at once
+        steps = min(max(steps, state[1] // 2, 1), state[1] * 2,
+                    self.max_local_steps)
+        if steps != state[1]:
+            self.debug("%s: %d local steps instead of %d, the "
+                       "communication to computation ratio is %.2f",
+                       slave.id, steps, state[1], ratio)
+            state[1] = steps
+
     def generate_data_for_master(self):
+        if self.local_sgd:
+            return self.generate_local_delta()
         if not self.gradient_changed:
             return None
         self.gradient_changed = False
         self.gradient_weights_with_moment.map_read()
         self.gradient_bias_with_moment.map_read()
-        return (self.gradient_weights_with_moment.mem,
-                self.gradient_bias_with_moment.mem)
+        compress = self.gradient_compressor.compress
+        data = (compress("weights", self.gradient_weights_with_moment.mem),
+                compress("bias", self.gradient_bias_with_moment.mem))
+        return share(data) if self.shared_memory else data
 
     def apply_data_from_slave(self, data, slave):
+        data = unshare(data)
+        staleness = self.register_report(slave)
+        if data is None:
+            return
+        if isinstance(data, dict):
+            self.apply_local_delta(data, slave)
+            return
+        if staleness:
+            if not self.late_update_weight:
+                self.debug("Discarded the update of %s which is %d steps "
+                           "late", slave.id, staleness)
+                return
+            weight = self.late_update_weight ** staleness
+            data = tuple(decompress(p) * weight if p is not None else None
+                         for p in data)
+        if self.aggregates:
+            self.stage_gradients(data, counts=not staleness)
+            if self.aggregation_due:
+                self.flush_gradients()
+            elif self.synchronous and not staleness:
+                # wait for the rest of the slaves
+                self.has_data_for_slave = False
+            return
+        self.apply_gradients(data[0], data[1])
+
+    def register_report(self, slave):
+        """Updates the latency histogram of the slave.
+
+        :return: the number of the synchronous steps made since the job was
+            given out.
+        """
+        if slave is None or not self._slave_jobs_.get(slave.id):
+            return 0
+        step, timestamp = self._slave_jobs_[slave.id].popleft()
+        histogram = self.slave_latencies.get(slave.id)
+        if histogram is None:
+            histogram = numpy.zeros(len(self.LATENCY_BINS) + 1,
+                                    dtype=numpy.int64)
+            self.slave_latencies[slave.id] = histogram
+        histogram[numpy.digitize(time.time() - timestamp,
+                                 self.LATENCY_BINS)] += 1
+        return self.aggregation_step - step
+
+    def latency_quantile(self, q, slave_id=None):
+        """Returns the upper estimate of the q-th quantile of the job round
+        trip time in seconds of the slave or all the slaves.
+        """
+        if slave_id is None:
+            histogram = sum(self.slave_latencies.values())
+        else:
+            histogram = self.slave_latencies.get(slave_id)
+        if histogram is None or not numpy.sum(histogram):
+            return None
+        index = numpy.searchsorted(numpy.cumsum(histogram),
+                                   q * numpy.sum(histogram))
+        if index >= len(self.LATENCY_BINS):
+            return float("inf")
+        return float(self.LATENCY_BINS[index])
+
+    def apply_gradients(self, gradient_weights, gradient_bias):
+        """Applies the moment and the (compressed) gradients to weights and
+        bias on the master.
+        """
         if self.weights:
-            self.weights.map_write()
+            weights = self.master_vector("weights")
+            weights.map_write()
             self.gradient_weights_with_moment.map_write()
             self.gradient_weights_with_moment.mem *= self.gradient_moment
-            self.gradient_weights_with_moment.mem += data[0]
-            self.weights.mem += self.gradient_weights_with_moment.mem
+            decompress_add(self.gradient_weights_with_moment.mem,
+                           gradient_weights)
+            weights.mem += self.gradient_weights_with_moment.mem
+            self.store_master_vector("weights")
         if self.bias:
-            self.bias.map_write()
+            bias = self.master_vector("bias")
+            bias.map_write()
             self.gradient_bias_with_moment.map_write()
             self.gradient_bias_with_moment.mem *= self.gradient_moment_bias
-            self.gradient_bias_with_moment.mem += data[1]
-            self.bias.mem += self.gradient_bias_with_moment.mem
+            decompress_add(self.gradient_bias_with_moment.mem, gradient_bias)
+            bias.mem += self.gradient_bias_with_moment.mem
+            self.store_master_vector("bias")
+
+    @property
+    def aggregates(self):
+        return self.aggregate_updates > 1 or self.synchronous or \
+            self.aggregate_timeout is not None
+
+    @property
+    def synchronous(self):
+        return self.backup_workers is not None
+
+    @property
+    def quorum(self):
+        """The number of the updates which make the synchronous step. Only
+        the slaves which got the jobs of the current step are counted, so
+        the idle ones which are refused while the step is completing do
+        not stall it.
+        """
+        if not self.synchronous:
+            return self.aggregate_updates
+        return max(len(self._step_slaves_) - self.backup_workers, 1)
+
+    @property
+    def aggregation_due(self):
+        if not self._pending_updates_:
+            return False
+        if self._pending_updates_ >= self.quorum:
+            return True
+        return (self.aggregate_timeout is not None and
+                time.time() - self._staged_since_ >= self.aggregate_timeout)
+
+    def stage_gradients(self, data, counts=True):
+        """Enqueues the slave's gradients for summation in the background
+        thread.
+
+        :param counts: whether the update counts towards aggregate_updates
+            (the quorum).
+        """
+        if self._aggregation_queue_ is None:
+            self._aggregation_queue_ = queue.Queue()
+            self._aggregation_thread_ = threading.Thread(
+                target=self._aggregate, name="%s aggregation" % self.name)
+            self._aggregation_thread_.daemon = True
+            self._aggregation_thread_.start()
+        if not counts:
+            self._aggregation_queue_.put(data)
+            return
+        if not self._pending_updates_:
+            self._staged_since_ = time.time()
+        self._pending_updates_ += 1
+        self._aggregation_queue_.put(data)
+
+    def flush_gradients(self):
+        """Waits for the staged gradients to be summed and applies them.
+        """
+        if self._aggregation_queue_ is None:
+            return
+        self._aggregation_queue_.join()
+        if self.synchronous and self._pending_updates_:
+            self.aggregation_step += 1
+            self._step_slaves_.clear()
+            self.has_data_for_slave = True
+        self._pending_updates_ = 0
+        with self._aggregation_lock_:
+            if not self._staged_count_:
+                return
+            self.debug("Applying %d aggregated updates", self._staged_count_)
+            self.apply_gradients(*self._staged_)
+            for staged in self._staged_:
+                if staged is not None:
+                    staged[:] = 0
+            self._staged_count_ = 0
+
+    def _aggregate(self):
+        vectors = (self.gradient_weights_with_moment,
+                   self.gradient_bias_with_moment)
+        while True:
+            data = self._aggregation_queue_.get()
+            try:
+                with self._aggregation_lock_:
+                    for index, payload in enumerate(data):
+                        if payload is None:
+                            continue
+                        if self._staged_[index] is None:
+                            self._staged_[index] = numpy.zeros_like(
+                                vectors[index].mem)
+                        decompress_add(self._staged_[index], payload)
+                    self._staged_count_ += 1
+            except Exception:
+                self.exception("Failed to aggregate the slave's update")
+            finally:
+                self._aggregation_queue_.task_done()
 
     def drop_slave(self, slave):
-        pass
+        self._slave_local_.pop(slave.id, None)
+        self._step_slaves_.discard(slave.id)
+        jobs = self._slave_jobs_.pop(slave.id, None)
+        if jobs:
+            self.info("Dropped %s with %d outstanding jobs", slave.id,
+                      len(jobs))
+        # the step may be waiting for this slave
+        if self.synchronous and self.aggregation_due:
+            self.flush_gradients()
 
     @staticmethod
     def numpy_gradient_step(weight, gradient, lr, factor_l12, l1_vs_l2,
@@ -707,6 +1361,14 @@ class NNWorkflow(AcceleratedWorkflow):
         evaluator: evaluator.* unit.
         decision: decision.Decision unit.
         gds: list of the gradient descent units.
+        half_precision: default of Forward.half_precision for the units
+            of this workflow.
+        snapshot_half_precision: default of Forward.snapshot_half_precision.
+        shared_memory: default of the units' shared_memory: the master and
+            the slaves exchange the large arrays through the shared memory.
+        local_steps: default of the units' local_steps: the slaves train
+            locally and synchronize with the master after this number of
+            jobs.
     """
     def __init__(self, workflow, **kwargs):
         super(NNWorkflow, self).__init__(workflow, **kwargs)
@@ -716,6 +1378,12 @@ class NNWorkflow(AcceleratedWorkflow):
         self._evaluator = None
         self._decision = None
         self._gds = []
+        # Mixed precision mode: see Forward.half_precision
+        self.half_precision = kwargs.get("half_precision", False)
+        self.snapshot_half_precision = kwargs.get(
+            "snapshot_half_precision", False)
+        self.shared_memory = kwargs.get("shared_memory", False)
+        self.local_steps = kwargs.get("local_steps", 1)
 
     @property
     def repeater(self):
@@ -797,8 +1465,6 @@ class NNWorkflow(AcceleratedWorkflow):
         # TODO(v.markovtsev): check the resulting graph's connectivity
         # TODO(v.markovtsev): check for single entry and exit points
 
-        import json
-
         arrays = []
 
         def array_file_name(arr, index):
@@ -831,6 +1497,102 @@ class NNWorkflow(AcceleratedWorkflow):
         except:
             self.exception("Failed to export to %s", file_name)
 
+    def export_mapped(self, file_name):
+        """Exports the parameters of the forward units into the JSON manifest
+        file_name and the uncompressed blob file_name + ".blob". Each array
+        starts at the MAPPED_EXPORT_ALIGNMENT-aligned offset, so
+        load_mapped() binds them without decompression or copying.
+        """
+        manifest = {"workflow": self.name,
+                    "checksum": self.checksum,
+                    "alignment": MAPPED_EXPORT_ALIGNMENT,
+                    "blob": os.path.basename(file_name) + ".blob",
+                    "units": []}
+        arrays = []
+        offset = 0
+        for unit in self.forwards:
+            params = {}
+            for attr in MAPPED_EXPORT_ATTRS:
+                arr = getattr(unit, attr, None)
+                if not isinstance(arr, Array) or not arr:
+                    continue
+                arr.map_read()
+                params[attr] = {"offset": offset,
+                                "shape": list(arr.shape),
+                                "dtype": arr.dtype.str}
+                arrays.append((offset, arr.mem))
+                offset = roundup(offset + arr.mem.nbytes,
+                                 MAPPED_EXPORT_ALIGNMENT)
+            manifest["units"].append({"name": unit.name,
+                                      "class": unit.__class__.__name__,
+                                      "arrays": params})
+        if not arrays:
+            raise ValueError("None of the forward units has parameters")
+        manifest["size"] = offset
+        with open(file_name + ".blob", "wb") as fout:
+            for offset, mem in arrays:
+                fout.seek(offset)
+                numpy.ascontiguousarray(mem).tofile(fout)
+            fout.truncate(manifest["size"])
+        with open(file_name, "w") as fout:
+            json.dump(manifest, fout, indent=4, sort_keys=True)
+        self.info("Exported %d arrays (%d bytes) to %s", len(arrays),
+                  manifest["size"], file_name)
+
+    def load_mapped(self, file_name, mode="r"):
+        """Binds the parameters of the forward units to the memory mapped
+        views of the data written by export_mapped(). The units are matched
+        by their order and class names.
+
+        :param mode: numpy.memmap mode; "r" makes the parameters read-only
+            and shared between processes, "c" is copy-on-write.
+        :return: The manifest.
+        """
+        manifest, views = map_exported(file_name, mode)
+        if len(manifest["units"]) != len(self.forwards):
+            raise error.BadFormatError(
+                "%s contains %d forward units, the workflow has %d" %
+                (file_name, len(manifest["units"]), len(self.forwards)))
+        for unit, desc, params in zip(self.forwards, manifest["units"],
+                                      views):
+            if desc["class"] != unit.__class__.__name__:
+                raise error.BadFormatError(
+                    "%s: expected %s, got %s in %s" % (
+                        unit, unit.__class__.__name__, desc["class"],
+                        file_name))
+            for attr, view in params.items():
+                arr = getattr(unit, attr)
+                if arr and arr.shape != view.shape:
+                    raise error.BadFormatError(
+                        "%s: %s shape mismatch: %s vs %s in %s" % (
+                            unit, attr, arr.shape, view.shape, file_name))
+                arr.reset(view)
+        self.info("Mapped %s (%d bytes)", file_name, manifest["size"])
+        return manifest
+
+
+def map_exported(file_name, mode="r"):
+    """Memory maps the model exported by :meth:`NNWorkflow.export_mapped`.
+
+    :return: The manifest and the list of {attribute: numpy view} per unit.
+    """
+    with open(file_name, "r") as fin:
+        manifest = json.load(fin)
+    blob = numpy.memmap(
+        os.path.join(os.path.dirname(file_name), manifest["blob"]),
+        dtype=numpy.uint8, mode=mode, shape=(manifest["size"],))
+    views = []
+    for desc in manifest["units"]:
+        params = {}
+        for attr, arr in desc["arrays"].items():
+            dtype = numpy.dtype(arr["dtype"])
+            shape = tuple(arr["shape"])
+            size = int(numpy.prod(shape)) * dtype.itemsize
+            params[attr] = blob[arr["offset"]:arr["offset"] + size] \
+                .view(dtype).reshape(shape)
+        views.append(params)
+    return manifest, views
+
 
 class NNSnapshotterBase(SnapshotterBase):
     def __init__(self, workflow, **kwargs):
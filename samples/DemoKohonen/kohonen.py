@@ -45,15 +45,18 @@ import veles.znicz.nn_plotting_units as nn_plotting_units
 import veles.znicz.nn_units as nn_units
 import veles.znicz.kohonen as kohonen
 import veles.loader as loader
+from veles.znicz.loader.binary_cache import BinaryCacheMixin
 
 
 @implementer(loader.IFullBatchLoader)
-class KohonenLoader(loader.FullBatchLoader):
+class KohonenLoader(BinaryCacheMixin, loader.FullBatchLoader):
     """Loads the sample dataset.
     """
 
     def load_data(self):
         file_name = root.kohonen.loader.dataset_file
+        if self.load_cache(file_name, dtype=str(self.dtype)) is not None:
+            return
         try:
             data = numpy.loadtxt(file_name)
         except:
@@ -70,6 +73,7 @@ class KohonenLoader(loader.FullBatchLoader):
         self.class_lengths[0] = 0
         self.class_lengths[1] = 0
         self.class_lengths[2] = 1000
+        self.save_cache(file_name, dtype=str(self.dtype))
 
 
 class KohonenWorkflow(nn_units.NNWorkflow):
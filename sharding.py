@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Sharding of the parameters across several masters.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+from __future__ import division
+from collections import namedtuple
+
+import numpy
+
+from veles.logger import Logger
+from veles.znicz.gradient_compression import decompress_add
+from veles.znicz.shared_memory import unshare
+
+
+#: The rows [start, stop) of the weights (and the bias) of the unit-th
+#: parameter unit which belong to the shard.
+ParameterSlice = namedtuple("ParameterSlice", ("unit", "start", "stop",
+                                               "shard"))
+
+
+class ShardPlan(Logger):
+    """Assigns the weights of the parameter units to the master shards.
+
+    The units are split into the slices along the first dimension of their
+    weights (the neurons of All2All and the kernels of Conv) if they have
+    more than max_slice_size elements, then the slices are assigned to
+    the least loaded shards starting from the largest one. The assignment
+    depends only on the shapes, so every master and every slave derive
+    the same plan from the same layers.
+
+    Attributes:
+        shapes: the list of (weights shape, bias shape) of each parameter
+            unit in the layers order; bias shape is None if there is no
+            bias.
+        shards: the number of the master shards.
+        max_slice_size: the maximal number of the weights elements in
+            a slice, None disables the slicing.
+        slices: the list of :class:`ParameterSlice`.
+        loads: the number of the elements assigned to each shard.
+    """
+    def __init__(self, shapes, shards, **kwargs):
+        super(ShardPlan, self).__init__()
+        if shards < 1:
+            raise ValueError("shards must be positive (got %s)" % shards)
+        self.shapes = [(tuple(w), tuple(b) if b is not None else None)
+                       for w, b in shapes]
+        self.shards = shards
+        self.max_slice_size = kwargs.get("max_slice_size")
+        if self.max_slice_size is not None and self.max_slice_size < 1:
+            raise ValueError("max_slice_size must be positive (got %s)" %
+                             self.max_slice_size)
+        self.slices = []
+        self.loads = [0] * shards
+        self._assign()
+
+    @staticmethod
+    def from_workflow(workflow, shards, **kwargs):
+        """Derives the plan from the initialized units of
+        :class:`veles.znicz.standard_workflow.StandardWorkflow`, the units
+        without weights are skipped.
+        """
+        return ShardPlan([(f.weights.shape, f.bias.shape if f.bias else None)
+                          for f in parameter_units(workflow)],
+                         shards, **kwargs)
+
+    def _assign(self):
+        pieces = []
+        for unit, (wshape, _) in enumerate(self.shapes):
+            rows = wshape[0]
+            size = int(numpy.prod(wshape))
+            count = 1
+            if self.max_slice_size is not None and \
+                    size > self.max_slice_size:
+                per_slice = max(self.max_slice_size // (size // rows), 1)
+                count = -(-rows // per_slice)
+            bounds = [rows * i // count for i in range(count + 1)]
+            for start, stop in zip(bounds, bounds[1:]):
+                pieces.append((size * (stop - start) // rows, unit, start,
+                               stop))
+        # the largest first, the ties are broken by the position
+        pieces.sort(key=lambda p: (-p[0], p[1], p[2]))
+        for size, unit, start, stop in pieces:
+            shard = self.loads.index(min(self.loads))
+            self.loads[shard] += size
+            self.slices.append(ParameterSlice(unit, start, stop, shard))
+        self.slices.sort(key=lambda s: (s.unit, s.start))
+        self.debug("Assigned %d slices of %d units to %d shards, loads: %s",
+                   len(self.slices), len(self.shapes), self.shards,
+                   self.loads)
+
+    def __eq__(self, other):
+        return isinstance(other, ShardPlan) and self.slices == other.slices
+
+    def __ne__(self, other):
+        return not self == other
+
+    def slices_of(self, shard):
+        return [s for s in self.slices if s.shard == shard]
+
+    def shards_of(self, unit):
+        """Returns the sorted shards which own the unit's slices.
+        """
+        return sorted({s.shard for s in self.slices if s.unit == unit})
+
+    def is_sliced(self, unit):
+        return sum(1 for s in self.slices if s.unit == unit) > 1
+
+    def cut(self, piece, array, bias=False):
+        """Returns the part of the unit's weights (or bias) array which
+        belongs to the slice.
+        """
+        if array is None:
+            return None
+        if not self.is_sliced(piece.unit):
+            return array
+        if bias:
+            rows = self.shapes[piece.unit][0][0]
+            if array.shape[0] != rows:
+                # the bias is not per neuron, it goes with the first slice
+                return array if piece.start == 0 else None
+        return array[piece.start:piece.stop]
+
+    def split(self, payloads):
+        """Splits the updates of the parameter units by the shards.
+
+        :param payloads: the list of (gradient weights, gradient bias)
+            returned by generate_data_for_master() of each parameter unit,
+            None if there is no update.
+        :return: the list of {(unit, start): (weights part, bias part)}
+            for each shard.
+        """
+        if len(payloads) != len(self.shapes):
+            raise ValueError("Expected %d payloads, got %d" %
+                             (len(self.shapes), len(payloads)))
+        result = [{} for _ in range(self.shards)]
+        payloads = [unshare(p) for p in payloads]
+        for piece in self.slices:
+            payload = payloads[piece.unit]
+            if payload is None:
+                continue
+            if self.is_sliced(piece.unit) and not all(
+                    p is None or isinstance(p, numpy.ndarray)
+                    for p in payload):
+                raise ValueError(
+                    "The updates of the sliced unit %d must not be "
+                    "compressed" % piece.unit)
+            result[piece.shard][(piece.unit, piece.start)] = (
+                self.cut(piece, payload[0]),
+                self.cut(piece, payload[1], bias=True))
+        return result
+
+    def merge(self, replies):
+        """Assembles the weights sent by the shards.
+
+        :param replies: the {(unit, start): (weights part, bias part)}
+            from every shard.
+        :return: the list of [weights, bias] of each parameter unit,
+            which Forward.apply_data_from_master() accepts.
+        """
+        parts = {}
+        for reply in replies:
+            parts.update(unshare(reply))
+        result = []
+        for unit, (wshape, bshape) in enumerate(self.shapes):
+            pieces = [s for s in self.slices if s.unit == unit]
+            missing = [s for s in pieces if (unit, s.start) not in parts]
+            if missing:
+                raise ValueError("No weights of %s" % (missing,))
+            if len(pieces) == 1:
+                result.append(list(parts[(unit, 0)]))
+                continue
+            weights = numpy.concatenate(
+                [parts[(unit, s.start)][0] for s in pieces])
+            biases = [parts[(unit, s.start)][1] for s in pieces]
+            biases = [b for b in biases if b is not None]
+            if bshape is None:
+                bias = None
+            elif len(biases) == 1:
+                bias = biases[0]
+            else:
+                bias = numpy.concatenate(biases)
+            result.append([weights, bias])
+        return result
+
+
+class ParameterShard(Logger):
+    """The parameters state of one master shard: keeps the owned slices,
+    applies the updates of the slaves to them the way
+    GradientDescentBase.apply_gradients() does and serves the current
+    values.
+
+    Attributes:
+        plan: :class:`ShardPlan`.
+        index: the number of this shard.
+        params: {(unit, start): [weights, bias]} of the owned slices.
+        version: the number of the applied updates.
+    """
+    def __init__(self, plan, index, params, **kwargs):
+        """
+        :param params: the list of (weights, bias) numpy arrays of each
+            parameter unit, only the owned parts are copied.
+        """
+        super(ParameterShard, self).__init__()
+        if not 0 <= index < plan.shards:
+            raise ValueError("Shard %d does not exist, there are %d" % (
+                index, plan.shards))
+        self.plan = plan
+        self.index = index
+        self.gradient_moment = kwargs.get("gradient_moment", 0)
+        self.gradient_moment_bias = kwargs.get(
+            "gradient_moment_bias", self.gradient_moment)
+        self.params = {}
+        self._moments = {}
+        for piece in plan.slices_of(index):
+            weights, bias = params[piece.unit]
+            part = [plan.cut(piece, weights), plan.cut(piece, bias, True)]
+            part = [p.copy() if p is not None else None for p in part]
+            key = (piece.unit, piece.start)
+            self.params[key] = part
+            self._moments[key] = [numpy.zeros_like(p) if p is not None
+                                  else None for p in part]
+        self.version = 0
+
+    @property
+    def size(self):
+        return sum(p.size for part in self.params.values()
+                   for p in part if p is not None)
+
+    def generate_data_for_slave(self):
+        return {key: tuple(part) for key, part in self.params.items()}
+
+    def apply_data_from_slave(self, data):
+        """Applies the part of :meth:`ShardPlan.split` which belongs to
+        this shard.
+        """
+        for key, update in unshare(data).items():
+            if key not in self.params:
+                raise ValueError("Shard %d does not own the slice %s" % (
+                    self.index, key))
+            for i, moment in enumerate((self.gradient_moment,
+                                        self.gradient_moment_bias)):
+                if update[i] is None or self.params[key][i] is None:
+                    continue
+                velocity = self._moments[key][i]
+                velocity *= moment
+                decompress_add(velocity, update[i])
+                self.params[key][i] += velocity
+        self.version += 1
+
+
+def parameter_units(workflow):
+    """Returns the forward units with weights of the workflow in the layers
+    order.
+    """
+    return [f for f in workflow.forwards if getattr(f, "weights", None)]
+
+
+def gradient_units(workflow):
+    """Returns the gradient descent units which update the weights of
+    :func:`parameter_units` in the same order, None where there is no such
+    unit.
+    """
+    owners = {id(gd.weights): gd for gd in workflow.gds
+              if getattr(gd, "weights", None)}
+    return [owners.get(id(f.weights)) for f in parameter_units(workflow)]
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Same host transport of the IDistributable payloads through the shared memory.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import atexit
+from glob import glob
+import itertools
+import os
+import socket
+import tempfile
+import uuid
+
+import numpy
+
+from veles.logger import Logger
+
+
+#: The directory of the POSIX shared memory segments.
+SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") \
+    else tempfile.gettempdir()
+#: The smaller arrays are pickled as usual.
+MIN_SHARED_SIZE = 1 << 16
+
+_host_id = None
+_transport = None
+
+
+def host_id():
+    """Identifies the host and its boot, so that the stale descriptors are
+    detected.
+    """
+    global _host_id
+    if _host_id is None:
+        try:
+            with open("/proc/sys/kernel/random/boot_id", "r") as fin:
+                boot = fin.read().strip()
+        except (IOError, OSError):
+            boot = ""
+        _host_id = "%s/%s" % (socket.gethostname(), boot)
+    return _host_id
+
+
+class SharedArray(object):
+    """Descriptor of the numpy array placed in the shared memory segment,
+    it is what is pickled instead of the array's contents.
+    """
+    __slots__ = ("path", "dtype", "shape", "host")
+
+    def __init__(self, path, dtype, shape):
+        self.path = path
+        self.dtype = dtype.str
+        self.shape = shape
+        self.host = host_id()
+
+    def __getstate__(self):
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+    def __setstate__(self, state):
+        for attr, value in zip(self.__slots__, state):
+            setattr(self, attr, value)
+
+    def __repr__(self):
+        return "SharedArray(%s, %s, %s)" % (self.path, self.dtype,
+                                            self.shape)
+
+    def open(self):
+        """Maps the segment copy-on-write and removes its name, so that
+        the memory is released as soon as the array is garbage collected.
+        The segment can be opened only once.
+        """
+        if self.host != host_id():
+            raise ValueError("%s was created on %s, this is %s" % (
+                self, self.host, host_id()))
+        try:
+            return numpy.memmap(self.path, dtype=numpy.dtype(self.dtype),
+                                mode="c", shape=self.shape)
+        finally:
+            os.unlink(self.path)
+
+
+class SharedMemoryTransport(Logger):
+    """Moves the large numpy arrays of the IDistributable payloads to
+    the shared memory, so that only the small :class:`SharedArray`
+    descriptors are pickled and sent when the master and the slave run
+    on the same host. The receiver maps the segments instead of
+    unpickling the arrays.
+
+    pack() and unpack() walk the nested lists, tuples and dicts.
+
+    Attributes:
+        min_size: the minimal size in bytes of the shared arrays.
+        directory: where the segments are created.
+        prefix: the file names prefix of the segments created by this
+            process; the segments which were not opened by the receivers
+            are removed on exit.
+    """
+    def __init__(self, **kwargs):
+        super(SharedMemoryTransport, self).__init__()
+        self.min_size = kwargs.get("min_size", MIN_SHARED_SIZE)
+        self.directory = kwargs.get("directory", SHM_DIR)
+        self.pid = os.getpid()
+        self.prefix = "veles_%d_%s_" % (self.pid, uuid.uuid4().hex[:8])
+        self._counter = itertools.count()
+        self.shared_bytes = 0
+
+    def share(self, arr):
+        path = os.path.join(self.directory, "%s%d" % (
+            self.prefix, next(self._counter)))
+        mem = numpy.memmap(path, dtype=arr.dtype, mode="w+",
+                           shape=arr.shape)
+        numpy.copyto(mem, arr)
+        del mem
+        self.shared_bytes += arr.nbytes
+        return SharedArray(path, arr.dtype, arr.shape)
+
+    def pack(self, payload):
+        if isinstance(payload, numpy.ndarray):
+            if payload.nbytes < self.min_size or payload.dtype.hasobject:
+                return payload
+            return self.share(payload)
+        if isinstance(payload, dict):
+            return {key: self.pack(value) for key, value in payload.items()}
+        if isinstance(payload, (list, tuple)):
+            return type(payload)(self.pack(value) for value in payload)
+        return payload
+
+    @staticmethod
+    def unpack(payload):
+        if isinstance(payload, SharedArray):
+            return payload.open()
+        if isinstance(payload, dict):
+            return {key: SharedMemoryTransport.unpack(value)
+                    for key, value in payload.items()}
+        if isinstance(payload, (list, tuple)):
+            return type(payload)(SharedMemoryTransport.unpack(value)
+                                 for value in payload)
+        return payload
+
+    def cleanup(self):
+        """Removes the segments which no receiver has opened.
+        """
+        paths = glob(os.path.join(self.directory, self.prefix + "*"))
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        if paths:
+            self.debug("Removed %d unused shared memory segments",
+                       len(paths))
+
+
+def transport():
+    """Returns the transport of this process.
+    """
+    global _transport
+    if _transport is None or _transport.pid != os.getpid():
+        # a forked process must not reuse the parent's prefix
+        _transport = SharedMemoryTransport()
+        atexit.register(_transport.cleanup)
+    return _transport
+
+
+def share(payload):
+    """Moves the large arrays of the payload to the shared memory.
+    """
+    return transport().pack(payload)
+
+
+def unshare(payload):
+    """Maps the shared arrays of the payload. Payloads without
+    :class:`SharedArray` are returned as is.
+    """
+    return SharedMemoryTransport.unpack(payload)
@@ -71,6 +71,7 @@ from veles.znicz import activation
 from veles.znicz.decision import DecisionsRegistry
 import veles.znicz.diversity as diversity
 from veles.znicz.evaluator import EvaluatorsRegistry
+from veles.znicz.inference_engine import InferenceEngine
 import veles.znicz.image_saver as image_saver
 from veles.loader.base import UserLoaderRegistry, LoaderMSEMixin, CLASS_NAME
 from veles.loader.image import ImageLoader
@@ -818,6 +819,21 @@ class StandardWorkflow(StandardWorkflowBase):
                 fwd_exp.generate_data_for_slave(None))
         return wf
 
+    def compile_inference(self, max_batch_size=None, dtype=None):
+        """
+        Compiles the trained forward propagation units into a single fused
+        callable which does not require the workflow to run.
+        :param max_batch_size: The initial buffers capacity in samples; \
+            defaults to the current minibatch size. Larger batches are \
+            accepted anyway.
+        :param dtype: The compute numpy dtype; defaults to the input dtype.
+        :return: :class:`veles.znicz.inference_engine.InferenceEngine` \
+            instance.
+        """
+        engine = InferenceEngine(self.forwards, max_batch_size, dtype)
+        self.debug("Compiled %s", engine)
+        return engine
+
     @StandardWorkflowBase.check_forward_units
     def link_gds(self, *parents):
         """
@@ -894,6 +910,8 @@ class StandardWorkflow(StandardWorkflowBase):
                 if hasattr(self.forwards[i], attr):
                     attrs.append(attr)
             unit.link_attrs(self.forwards[i], *attrs)
+            if hasattr(self.evaluator, "loss_scale"):
+                unit.link_attrs(self.evaluator, "loss_scale")
 
             unit.gate_skip = self.decision.gd_skip
 
@@ -1008,6 +1026,10 @@ class StandardWorkflow(StandardWorkflowBase):
                 self.evaluator,
                 ("minibatch_confusion_matrix", "confusion_matrix"),
                 ("minibatch_max_err_y_sum", "max_err_output_sum"))
+            if hasattr(self.evaluator, "confusion_coo"):
+                self.decision.link_attrs(
+                    self.evaluator, ("minibatch_confusion_coo",
+                                     "confusion_coo"))
         elif self.decision_name == "decision_mse":
             self.decision.link_attrs(
                 self.evaluator,
@@ -34,7 +34,11 @@ under the License.
 """
 
 
+import os
+
 from veles.tests import timeout, multi_device
+from veles.znicz.labels_printer import LabelsPrinter
+import veles.znicz.loader.loader_wine  # pylint: disable=W0611
 from veles.znicz.standard_workflow import StandardWorkflow
 from veles.znicz.tests.functional import StandardTest
 
@@ -188,5 +192,41 @@ class TestStandardWorkflow(StandardTest):
                     real_layers, real_loader_params, kwargs)
         self.info("All Ok")
 
+    def extract_and_compare(self, workflow, dataset_file):
+        fwd_wf = workflow.extract_forward_workflow(
+            loader_name="wine_loader",
+            loader_config={"dataset_file": dataset_file},
+            result_unit_factory=LabelsPrinter, cyclic=False)
+        self.assertEqual(len(fwd_wf.forwards), len(workflow.forwards))
+        for fwd, imported in zip(workflow.forwards, fwd_wf.forwards):
+            for attr in "weights", "bias":
+                vec = getattr(fwd, attr)
+                vec.map_read()
+                self.assertTrue((getattr(imported, attr).mem ==
+                                 vec.mem).all())
+
+    @timeout(100)
+    @multi_device()
+    def test_extract_forward_workflow(self):
+        self.info("Will test extracting the forward workflow")
+        dataset_file = os.path.abspath(os.path.join(
+            os.path.dirname(__file__), "../../samples/Wine/wine.txt.gz"))
+        workflow = StandardWorkflow(
+            self.parent,
+            loader_name="wine_loader",
+            loader_config={"minibatch_size": 10,
+                           "dataset_file": dataset_file},
+            loss_function="softmax",
+            layers=[{"type": "all2all_tanh",
+                     "->": {"output_sample_shape": 8}},
+                    {"type": "softmax",
+                     "->": {"output_sample_shape": 3}}])
+        workflow.initialize(device=self.device, snapshot=False)
+        self.extract_and_compare(workflow, dataset_file)
+        # local SGD does not affect the export
+        for fwd in workflow.forwards:
+            fwd.local_steps = 4
+        self.extract_and_compare(workflow, dataset_file)
+
 if __name__ == "__main__":
     StandardTest.main()
@@ -40,6 +40,7 @@ under the License.
 import json
 import pickle
 import os
+import threading
 
 import numpy
 from zope.interface import implementer
@@ -64,6 +65,8 @@ import veles.znicz.activation as activation
 import veles.znicz.gd_pooling as gd_pooling
 import veles.znicz.gd_conv as gd_conv
 import veles.znicz.gd as gd
+from veles.znicz.loader.prefetch import MinibatchPrefetcher, \
+    upcoming_minibatches
 from veles.znicz.standard_workflow import StandardWorkflow
 from veles.units import IUnit, Unit
 from veles.distributable import IDistributable
@@ -104,7 +107,11 @@ class Destroyer(Unit):
 @implementer(loader.ILoader)
 class ImagenetAELoader(loader.Loader):
     MAPPING = "imagenet_ae_loader"
-    """loads imagenet from samples.dat, labels.pickle"""
+    """loads imagenet from samples.dat, labels.pickle
+
+    If prefetch_depth is positive, up to that many upcoming minibatches are
+    read in advance by prefetch_workers background threads.
+    """
     def __init__(self, workflow, **kwargs):
         super(ImagenetAELoader, self).__init__(workflow, **kwargs)
         self.mean = Array()
@@ -118,16 +125,28 @@ class ImagenetAELoader(loader.Loader):
         self.matrixes_filename = kwargs.get("matrixes_filename", None)
         self.samples_filename = kwargs.get("samples_filename", None)
         self.target_normalizer = NoneNormalizer
+        self.prefetch_depth = kwargs.get("prefetch_depth", 0)
+        self.prefetch_workers = kwargs.get("prefetch_workers", 1)
 
     def init_unpickled(self):
         super(ImagenetAELoader, self).init_unpickled()
         self.original_labels = None
+        self._prefetcher_ = None
+        self._file_lock_ = threading.Lock()
 
     def initialize(self, **kwargs):
         self.normalizer.reset()
         super(ImagenetAELoader, self).initialize(**kwargs)
         self.minibatch_labels.reset(numpy.zeros(
             self.max_minibatch_size, dtype=numpy.int32))
+        if self._prefetcher_ is not None:
+            self._prefetcher_.stop()
+            self._prefetcher_ = None
+        if self.prefetch_depth > 0 and not self.is_master:
+            self._prefetcher_ = MinibatchPrefetcher(
+                self.fill_samples, self.minibatch_data.mem,
+                self.minibatch_labels.mem, depth=self.prefetch_depth,
+                workers=self.prefetch_workers).start()
 
     def __getstate__(self):
         state = super(ImagenetAELoader, self).__getstate__()
@@ -223,13 +242,20 @@ class ImagenetAELoader(loader.Loader):
         self.minibatch_data.map_invalidate()
         self.minibatch_labels.map_invalidate()
 
-        sample_bytes = self.mean.mem.nbytes
-
-        for index, index_sample in enumerate(idxs[:count]):
-            self.file_samples.seek(int(index_sample) * sample_bytes)
-            self.file_samples.readinto(self.minibatch_data.mem[index])
-            self.minibatch_labels.mem[index] = self.original_labels[
-                int(index_sample)]
+        data = self.minibatch_data.mem
+        labels = self.minibatch_labels.mem
+        prefetcher = self._prefetcher_
+        if prefetcher is None or not prefetcher.fetch(
+                idxs[:count], self.minibatch_class, data, labels):
+            self.fill_samples(idxs[:count], self.minibatch_class, data,
+                              labels)
+        if prefetcher is not None:
+            for offset, minibatch_class, size, _ in upcoming_minibatches(
+                    self.class_lengths, start_offset + count,
+                    self.max_minibatch_size, self.prefetch_depth):
+                prefetcher.schedule(
+                    offset, self.shuffled_indices.mem[offset:offset + size],
+                    minibatch_class)
 
         if count < len(idxs):
             idxs[count:] = self.class_lengths[1]  # no data sample is there
@@ -238,6 +264,18 @@ class ImagenetAELoader(loader.Loader):
 
         return True
 
+    def fill_samples(self, indices, minibatch_class, data, labels):
+        """Reads the samples and their labels into data and labels. May be
+        called from the prefetching threads.
+        """
+        sample_bytes = self.mean.mem.nbytes
+        with self._file_lock_:
+            for index, index_sample in enumerate(indices):
+                self.file_samples.seek(int(index_sample) * sample_bytes)
+                self.file_samples.readinto(data[index])
+        labels[:len(indices)] = [
+            self.original_labels[int(i)] for i in indices]
+
     def fill_minibatch(self):
         raise error.Bug("Control should not go here")
 
@@ -63,7 +63,7 @@ class MnistAELoader(MnistLoader):
 
     def load_data(self):
         super(MnistAELoader, self).load_data()
-        self.original_data.mem.shape = [70000, 28, 28, 1]
+        self.original_data.mem.shape = [len(self.original_labels), 28, 28, 1]
 
 
 class MnistAEWorkflow(nn_units.NNWorkflow):
@@ -43,21 +43,31 @@ import six
 from zope.interface import implementer
 
 from veles.config import root
-from veles.external.progressbar import ProgressBar
 from veles.interaction import Shell
 import veles.units as units
 from veles.downloader import Downloader
 import veles.znicz.nn_plotting_units as nn_plotting_units
 import veles.znicz.nn_units as nn_units
 import veles.znicz.kohonen as kohonen
+from veles.znicz.csr import CSRMatrix, read_csr
+from veles.znicz.loader.binary_cache import BinaryCacheMixin
 from veles.loader import IFullBatchLoader
 from veles import plotting_units, loader
 
 
 @implementer(IFullBatchLoader)
-class SpamKohonenLoader(loader.FullBatchLoader):
+class SpamKohonenLoader(BinaryCacheMixin, loader.FullBatchLoader):
+    """Loads "[id] [label] lemma:weight ..." lines.
+
+    If sparse is True, the samples are kept in CSR format and each
+    minibatch is served as minibatch_sparse, while minibatch_data stays
+    zero and only defines the shape. The pointwise normalization is
+    skipped then as it would destroy the sparsity.
+    """
     def __init__(self, workflow, **kwargs):
-        kwargs["normalization_type"] = "pointwise"
+        self.sparse = kwargs.get("sparse", False)
+        kwargs["normalization_type"] = \
+            "none" if self.sparse else "pointwise"
         super(SpamKohonenLoader, self).__init__(workflow, **kwargs)
         self.has_ids = kwargs.get("ids", False)
         self.has_classes = kwargs.get("classes", True)
@@ -65,95 +75,116 @@ class SpamKohonenLoader(loader.FullBatchLoader):
         self.kohonen_labels_mapping = []
         self.samples_by_label = []
         self.ids = []
+        self.original_sparse = None
+        self.minibatch_sparse = None
 
     def load_data(self):
         """Here we will load spam data.
         """
         file_name = root.spam_kohonen.loader.file
+        self.validation_ratio = root.spam_kohonen.loader.validation_ratio
+        config = {"ids": self.has_ids, "classes": self.has_classes,
+                  "sparse": self.sparse,
+                  "validation_ratio": self.validation_ratio}
+        extra = self.load_cache(file_name, **config)
+        if extra is None:
+            extra = self.parse_data(file_name)
+            self.save_cache(file_name, extra, **config)
+        self.lemmas_map = list(extra["lemmas"])
+        del self.ids[:]
+        self.ids.extend(extra["ids"])
+        del self.kohonen_labels_mapping[:]
+        self.kohonen_labels_mapping.extend(extra["labels_mapping"])
+        if self.sparse:
+            self.original_sparse = CSRMatrix(
+                extra["indptr"], extra["indices"], extra["values"],
+                self.original_data.shape)
+        del self.samples_by_label[:]
+        self.samples_by_label.extend(
+            [set() for _ in self.kohonen_labels_mapping])
+        for index, label in enumerate(self.original_labels):
+            self.samples_by_label[label].add(index)
+        self.info("Samples: %d, labels: %d, lemmas: %d, "
+                  "average feature vector length: %d",
+                  self.original_data.shape[0],
+                  len(self.kohonen_labels_mapping), len(self.lemmas_map),
+                  extra["avglength"])
+
+    def parse_data(self, file_name):
+        """Parses the text file into original_data, original_labels and
+        class_lengths.
+
+        :return: the rest of the parsed data to be cached.
+        """
         if os.path.splitext(file_name)[1] == '.xz':
-            self.info("Unpacking %s...", root.spam_kohonen.loader.file)
+            self.info("Unpacking and parsing %s...", file_name)
             if six.PY3:
-                with lzma.open(root.spam_kohonen.loader.file, "r") as fin:
-                    lines = fin.readlines()
+                with lzma.open(file_name, "r") as fin:
+                    parsed = read_csr(fin, self.has_ids, self.has_classes)
             else:
-                fin = lzma.LZMAFile(root.spam_kohonen.loader.file, "r")
-                lines = fin.readlines()
+                fin = lzma.LZMAFile(file_name, "r")
+                parsed = read_csr(fin, self.has_ids, self.has_classes)
                 fin.close()
         else:
-            self.info("Reading %s...", root.spam_kohonen.loader.file)
-            with open(root.spam_kohonen.loader.file, "rb") as fin:
-                lines = fin.readlines()
-
-        self.info("Parsing the data...")
-        lemmas = set()
-        data = []
-        del self.ids[:]
-        labels = []
-        avglength = 0
-        for line in ProgressBar(term_width=17)(lines):
-            fields = line.split(b' ')
-            offset = 0
-            if self.has_ids:
-                self.ids.append(fields[offset].decode('charmap'))
-                offset += 1
-            if self.has_classes:
-                label = int(fields[offset])
-                labels.append(label)
-                offset += 1
-            data.append([])
-            for field in fields[offset:-1]:
-                lemma, weight = field.split(b':')
-                lemma = int(lemma)
-                weight = float(weight)
-                lemmas.add(lemma)
-                data[-1].append((lemma, weight))
-            avglength += len(data[-1])
+            self.info("Parsing %s...", file_name)
+            with open(file_name, "rb") as fin:
+                parsed = read_csr(fin, self.has_ids, self.has_classes)
+        data, lemmas, labels, ids = parsed
 
         self.info("Initializing...")
-        avglength //= len(lines)
+        length = data.shape[0]
         if self.has_classes:
-            distinct_labels = set(labels)
+            labels_mapping = sorted(set(labels))
+            reverse_label_mapping = {l: i for i, l
+                                     in enumerate(labels_mapping)}
+            self.original_labels[:] = [reverse_label_mapping[l]
+                                       for l in labels]
         else:
-            distinct_labels = {0}
-        del self.kohonen_labels_mapping[:]
-        self.kohonen_labels_mapping.extend(sorted(distinct_labels))
-        reverse_label_mapping = {l: i for i, l
-                                 in enumerate(self.kohonen_labels_mapping)}
-        self.lemmas_map = sorted(lemmas)
-        lemma_indices = {v: i for i, v in enumerate(self.lemmas_map)}
-        del self.samples_by_label[:]
-        self.samples_by_label.extend([set() for _ in distinct_labels])
-        self.original_data.mem = numpy.zeros([len(lines), len(lemmas)],
-                                             dtype=numpy.float32)
-        for index, sample in enumerate(ProgressBar(term_width=17)(data)):
-            if self.has_classes:
-                label = reverse_label_mapping[labels[index]]
-            else:
-                label = 0
-            self.original_labels.append(label)
-            self.samples_by_label[label].add(index)
-            for lemma in sample:
-                self.original_data.mem[index,
-                                       lemma_indices[lemma[0]]] = lemma[1]
+            labels_mapping = [0]
+            self.original_labels[:] = [0] * length
+        extra = {"lemmas": lemmas.tolist(), "ids": ids,
+                 "labels_mapping": labels_mapping,
+                 "avglength": data.nnz // length}
+        if self.sparse:
+            extra.update(indptr=data.indptr, indices=data.indices,
+                         values=data.values)
+            # keeps the shape without allocating the dense matrix
+            self.original_data.mem = numpy.broadcast_to(
+                numpy.zeros(1, dtype=numpy.float32), data.shape)
+        else:
+            self.original_data.mem = data.todense()
 
-        self.validation_ratio = root.spam_kohonen.loader.validation_ratio
         self.class_lengths[loader.TEST] = 0
         self.class_lengths[loader.VALID] = int(self.validation_ratio *
-                                               len(lines))
-        self.class_lengths[loader.TRAIN] = len(lines) - self.class_lengths[1]
-        self.info("Samples: %d, labels: %d, lemmas: %d, "
-                  "average feature vector length: %d", len(lines),
-                  len(distinct_labels), len(lemmas), avglength)
+                                               length)
+        self.class_lengths[loader.TRAIN] = length - self.class_lengths[1]
+        return extra
+
+    def fill_minibatch(self):
+        if not self.sparse:
+            return super(SpamKohonenLoader, self).fill_minibatch()
+        indices = self.minibatch_indices.mem[:self.minibatch_size]
+        self.minibatch_sparse = self.original_sparse[indices]
 
     def initialize(self, device, **kwargs):
         super(SpamKohonenLoader, self).initialize(device=device, **kwargs)
-        if self.class_lengths[loader.VALID] > 0:
-            v = self.original_data.mem[:self.class_lengths[loader.VALID]]
+        if self.sparse:
+            valid = self.original_sparse[numpy.arange(
+                self.class_lengths[loader.VALID])].values
+            train = self.original_sparse[numpy.arange(
+                self.class_lengths[loader.VALID],
+                self.original_sparse.shape[0])].values
+        else:
+            valid = self.original_data.mem[
+                :self.class_lengths[loader.VALID]]
+            train = self.original_data.mem[
+                self.class_lengths[loader.VALID]:]
+        if self.class_lengths[loader.VALID] > 0 and valid.size:
             self.info("Range after normalization: validation: [%.6f, %.6f]",
-                      v.min(), v.max())
-        v = self.original_data.mem[self.class_lengths[loader.VALID]:]
-        self.info("Range after normalization: train: [%.6f, %.6f]",
-                  v.min(), v.max())
+                      valid.min(), valid.max())
+        if train.size:
+            self.info("Range after normalization: train: [%.6f, %.6f]",
+                      train.min(), train.max())
 
 
 @implementer(units.IUnit)
@@ -208,7 +239,8 @@ class SpamKohonenWorkflow(nn_units.NNWorkflow):
             minibatch_size=root.spam_kohonen.loader.minibatch_size,
             force_numpy=root.spam_kohonen.loader.force_numpy,
             ids=root.spam_kohonen.loader.ids,
-            classes=root.spam_kohonen.loader.classes)
+            classes=root.spam_kohonen.loader.classes,
+            sparse=root.spam_kohonen.loader.sparse)
         self.loader.link_from(self.repeater)
 
         # Kohonen training layer
@@ -221,6 +253,9 @@ class SpamKohonenWorkflow(nn_units.NNWorkflow):
             radius_decay=root.spam_kohonen.train.radius_decay)
         self.trainer.link_from(self.loader)
         self.trainer.link_attrs(self.loader, ("input", "minibatch_data"))
+        if self.loader.sparse:
+            self.trainer.link_attrs(self.loader,
+                                    ("sparse_input", "minibatch_sparse"))
 
         self.forward = kohonen.KohonenForward(self, total=True)
         self.forward.link_from(self.trainer)
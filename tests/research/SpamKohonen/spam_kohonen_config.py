@@ -54,6 +54,7 @@ root.spam_kohonen.update({
                "force_numpy": True,
                "ids": True,
                "classes": False,
+               "sparse": False,
                "file":
                os.path.join(root.common.dirs.datasets, "spam/spam.txt.xz")},
     "train": {"gradient_decay": lambda t: 0.002 / (1.0 + t * 0.00002),
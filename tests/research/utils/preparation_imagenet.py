@@ -20,7 +20,9 @@ that parameter "rect" is correct. It is (216, 216) for "DET" challenge
 in standard configuration. It is (256, 256) for "img" challenge in standard
 configuration. Then, run "init_dataset" command to save in json all
 information about dataset. Second, run "save_dataset_to_file" command, which
-generates pickles and .dat files for Imagenet Pickle Loader.
+generates pickles and .dat files for Imagenet Pickle Loader. The images are
+transformed by "processes" worker processes in shards of "shard_size" images;
+if the command is interrupted, rerunning it resumes from the last shard.
 If you want tro check the result, run "test_load_data" command.
 
 ███████████████████████████████████████████████████████████████████████████████
@@ -50,6 +52,7 @@ import cv2
 import json
 import logging
 import matplotlib.pyplot as plt
+from multiprocessing import Pool
 import numpy
 import pickle
 from PIL import Image
@@ -62,6 +65,7 @@ from veles.config import root
 import veles.opencl_types as opencl_types
 import veles.prng as rnd
 from veles.znicz.external import xmltodict
+from veles.znicz.loader.running_stats import RunningStatistics
 from veles.znicz.tests.research.ImagenetAE.processor import Processor
 
 
@@ -114,8 +118,13 @@ root.prep_imagenet.update({
     "get_label": "all_ways",
     # "from_image_name" "from_image_path" "from_xml" "all_ways"
     "get_label_from_txt_label": True,
+    "processes": None,
+    "shard_size": 64,
+    "dispersion": "range",
+    # "range" "std"
     "command_to_run": "test_load_data"
     # "save_dataset_to_file" "init_dataset" "test_load_data"
+    # "calculate_matrixes"
 })
 
 root.prep_imagenet.classes_count = (
@@ -144,7 +153,9 @@ that parameter "rect" is correct. It is (216, 216) for "DET" challenge
 in standard configuration. It is (256, 256) for "img" challenge in standard
 configuration. Then, run "init_dataset" command to save in json all
 information about dataset. Second, run "save_dataset_to_file" command, which
-generates pickles and .dat files for Imagenet Pickle Loader.
+generates pickles and .dat files for Imagenet Pickle Loader. The images are
+transformed by "processes" worker processes in shards of "shard_size" images;
+if the command is interrupted, rerunning it resumes from the last shard.
 If you want tro check the result, run "test_load_data" command.
     """
     def __init__(self, **kwargs):
@@ -154,13 +165,11 @@ If you want tro check the result, run "test_load_data" command.
         self.series = root.prep_imagenet.series
         self.root_path = root.prep_imagenet.root_path
         self.images = {TEST: {}, TRAIN: {}, VALIDATION: {}}
-        self.s_sum = numpy.zeros(
-            self.rect + (root.prep_imagenet.channels,), dtype=numpy.float64)
-        self.s_mean = numpy.zeros_like(self.s_sum)
-        self.s_count = numpy.ones_like(self.s_mean)
-        self.s_min = numpy.empty_like(self.s_mean)
-        self.s_min[:] = 255
-        self.s_max = numpy.zeros_like(self.s_mean)
+        self.stats = RunningStatistics(
+            self.rect + (root.prep_imagenet.channels,))
+        self.s_mean = None
+        self.dispersion = kwargs.get("dispersion",
+                                     root.prep_imagenet.dispersion)
         self.k = 0
         self.label_ind = 0
         self.labels_int_txt = {}
@@ -174,6 +183,12 @@ If you want tro check the result, run "test_load_data" command.
         self.colorspace = kwargs.get("colorspace", "RGB")
         self._include_derivative = kwargs.get("derivative", True)
         self._sobel_kernel_size = kwargs.get("sobel_kernel_size", 5)
+        self.processes = kwargs.get("processes",
+                                    root.prep_imagenet.processes)
+        self.shard_size = kwargs.get("shard_size",
+                                     root.prep_imagenet.shard_size)
+        self._progress = (0, 0)
+        self._progress_key = None
 
     def initialize(self):
         self.map_items = root.prep_imagenet.MAPPING[
@@ -462,14 +477,82 @@ If you want tro check the result, run "test_load_data" command.
                     {"tail_path": path_tail, "labels": labels})
         return images_from_file
 
-    def get_mean(self, set_type, image_name, image):
-        for bbx in self.images[set_type][image_name]["bbxs"]:
-            x = bbx["x"]
-            y = bbx["y"]
-            h_size = bbx["height"]
-            w_size = bbx["width"]
-            if h_size >= 8 and w_size >= 8 and h_size * w_size >= 256:
-                self.sample_rect(image, x, y, h_size, w_size, None)
+    @staticmethod
+    def is_valid_bbox(bbx):
+        return (bbx["height"] >= 8 and bbx["width"] >= 8 and
+                bbx["height"] * bbx["width"] >= 256)
+
+    def load_images_info(self, set_type):
+        images_file_name = os.path.join(
+            self.root_path,
+            IMAGES_JSON % (self.root_name, self.series, set_type))
+        try:
+            self.info("Loading images info from %s" % images_file_name)
+            with open(images_file_name, 'r') as fp:
+                self.images[set_type] = json.load(fp)
+        except Exception as e:
+            self.exception("Failed to load %s", images_file_name)
+            raise from_none(e)
+
+    def plan_dataset(self):
+        """Computes the labels and the offsets of the samples in the output
+        file from the images info, without decoding the images.
+
+        Returns:
+            (mean_jobs, jobs) - lists of (path, offset, count, rects) where
+            rects are (x, y, height, width) of DET bounding boxes or None.
+            mean_jobs are the DET train images to calculate the mean.
+        """
+        del self.original_labels[:]
+        if self.series == "DET":
+            with open(os.path.join(root.prep_imagenet.root_path,
+                                   "classes_200_2014_DET.json"), 'r') as fp:
+                int_labels = {word: i for i, word in json.load(fp)}
+        else:
+            with open(root.prep_imagenet.file_text_to_int_labels, 'r') as fin:
+                int_labels = json.load(fin)
+        mean_jobs = []
+        jobs = []
+        offset = 0
+        for set_type in (TEST, VALIDATION, TRAIN):
+            self.load_images_info(set_type)
+            self.count_samples[set_type] = 0
+            for image_name in sorted(self.images[set_type].keys()):
+                image = self.images[set_type][image_name]
+                if self.series == "DET":
+                    bbxs = [bbx for bbx in image["bbxs"]
+                            if self.is_valid_bbox(bbx)]
+                    if set_type == TRAIN and bbxs:
+                        mean_jobs.append((image["path"], 0, 0, [
+                            (b["x"], b["y"], b["height"], b["width"])
+                            for b in bbxs]))
+                    rects = []
+                    for bbx in bbxs:
+                        if bbx["label"] not in int_labels:
+                            self.warning("Unknown label %s in %s",
+                                         bbx["label"], image["path"])
+                            continue
+                        self.original_labels.append(int_labels[bbx["label"]])
+                        rects.append((bbx["x"], bbx["y"], bbx["height"],
+                                      bbx["width"]))
+                    if not rects:
+                        continue
+                    count = len(rects)
+                else:
+                    rects = None
+                    labels = [int_labels[l] for l in image["label"]]
+                    if len(labels) > 1:
+                        self.error("Too mach labels for image %s",
+                                   image["path"])
+                        labels = []
+                    self.original_labels.extend(labels)
+                    count = len(labels)
+                jobs.append((image["path"], offset, count, rects))
+                offset += count
+                self.count_samples[set_type] += count
+            # the images info is not needed anymore
+            self.images[set_type] = {}
+        return mean_jobs, jobs
 
     def sample_rect(self, img, x_c, y_c, h_size, w_size, mean):
         nn_width = self.rect[0]
@@ -500,43 +583,51 @@ If you want tro check the result, run "test_load_data" command.
             sample = sample.astype(numpy.uint8)
             sample[dst_y_min:dst_y_max, dst_x_min:dst_x_max] = img
             return sample
-        self.s_sum[dst_y_min:dst_y_max, dst_x_min:dst_x_max] += img
-        self.s_count[dst_y_min:dst_y_max, dst_x_min:dst_x_max] += 1.0
-        numpy.minimum(self.s_min[dst_y_min:dst_y_max, dst_x_min:dst_x_max],
-                      img,
-                      self.s_min[dst_y_min:dst_y_max, dst_x_min:dst_x_max])
-        numpy.maximum(self.s_max[dst_y_min:dst_y_max, dst_x_min:dst_x_max],
-                      img,
-                      self.s_max[dst_y_min:dst_y_max, dst_x_min:dst_x_max])
+        self.stats.update(img[numpy.newaxis, :, :, :self.stats.shape[-1]],
+                          (slice(dst_y_min, dst_y_max),
+                           slice(dst_x_min, dst_x_max)))
         return None
 
-    def get_dataset_img(self, set_type, image_name, image, mean):
-        sample = self.transformation_image(image)
-        self.get_original_labels_and_data(
-            self.images[set_type][image_name]["label"],
-            sample, set_type)
-        self.s_sum += sample
-        self.s_count += 1.0
-
-    def get_dataset_DET(self, set_type, image_name, image, mean):
-        for bbx in self.images[set_type][image_name]["bbxs"]:
-            x = bbx["x"]
-            y = bbx["y"]
-            h_size = bbx["height"]
-            w_size = bbx["width"]
-            label = bbx["label"]
-            if h_size >= 8 and w_size >= 8 and h_size * w_size >= 256:
-                path_to_labels_word = os.path.join(
-                    root.prep_imagenet.root_path, "classes_200_2014_DET.json")
-                with open(path_to_labels_word, 'r') as fp:
-                    int_word_labels = json.load(fp)
-                for (int_label, word_label) in int_word_labels:
-                    if label == word_label:
-                        self.original_labels.append(int_label)
-                sample = self.prep_and_save_sample(
-                    image, x, y, h_size, w_size, mean)
-                sample.tofile(self.file_samples)
-                self.count_samples[set_type] += 1
+    def process_shard(self, stage, shard, mean, file_name, shape):
+        """Transforms the images of the shard. On "write" stage, writes
+        the samples to their offsets in file_name.
+
+        Returns:
+            :class:`RunningStatistics` of the shard.
+        """
+        self.stats = RunningStatistics(self.stats.shape)
+        samples = numpy.memmap(file_name, dtype=numpy.uint8, mode="r+",
+                               shape=shape) if stage == "write" else None
+        for path, offset, count, rects in shard:
+            image = self.decode_image(path)
+            if rects is not None:
+                for index, (x, y, h, w) in enumerate(rects):
+                    sample = self.prep_and_save_sample(
+                        image, x, y, h, w, mean)
+                    if samples is not None:
+                        samples[offset + index] = sample
+                continue
+            sample = self.transformation_image(image)
+            if count:
+                samples[offset] = sample
+            self.stats.update(sample[numpy.newaxis])
+        if samples is not None:
+            samples.flush()
+            del samples
+        return self.stats
+
+    @property
+    def sample_shape(self):
+        channels = root.prep_imagenet.channels
+        if self.series == "DET" and self._include_derivative:
+            channels += 1
+        return self.rect + (channels,)
+
+    @property
+    def worker_kwargs(self):
+        return {"rect": self.rect, "colorspace": self.colorspace,
+                "derivative": self._include_derivative,
+                "sobel_kernel_size": self._sobel_kernel_size}
 
     def prep_and_save_sample(self, image, x, y, h, w, mean):
         sample = self.preprocess_sample(image)
@@ -574,59 +665,42 @@ If you want tro check the result, run "test_load_data" command.
         return res
 
     def save_dataset_to_file(self):
+        """Transforms the images in a pool of processes which write into
+        the preallocated memory-mapped samples file. The completed shards
+        are recorded in the progress file, so the interrupted preparation
+        resumes from where it has stopped.
+        """
         original_data_dir = root.prep_imagenet.file_original_data
         original_labels_dir = root.prep_imagenet.file_original_labels
         count_samples_dir = root.prep_imagenet.file_count_samples
-        self.info(
-            "Will remove old files:\n %s\n %s\n %s\n" %
-            (original_data_dir, original_labels_dir, count_samples_dir))
-        if os.path.exists(original_data_dir):
-            os.remove(original_data_dir)
-        if os.path.exists(original_labels_dir):
-            os.remove(original_labels_dir)
-        if os.path.exists(count_samples_dir):
-            os.remove(count_samples_dir)
-        self.file_samples = open(original_data_dir, "wb")
-        if self.series == "DET":
-            set_type = TRAIN
-            images_file_name = os.path.join(
-                self.root_path,
-                IMAGES_JSON % (self.root_name, self.series, set_type))
-            try:
-                self.info(
-                    "Loading images info from %s to calculate mean" %
-                    images_file_name)
-                with open(images_file_name, 'r') as fp:
-                    self.images[set_type] = json.load(fp)
-            except Exception as e:
-                self.exception("Failed to load %s", images_file_name)
-                raise from_none(e)
-            for image_name in sorted(self.images[set_type].keys()):
-                image_fnme = self.images[set_type][image_name]["path"]
-                image = self.decode_image(image_fnme)
-                self.get_mean(set_type, image_name, image)
-            mean, rdisp = self.transform_matrixes(self.s_sum, self.s_count)
-        else:
-            mean = None
-        self.info("Mean image was calculated")
-        for set_type in (TEST, VALIDATION, TRAIN):
-            images_file_name = os.path.join(
-                self.root_path,
-                IMAGES_JSON % (self.root_name, self.series, set_type))
-            try:
-                self.info(
-                    "Loading images info from %s to resize" %
-                    images_file_name)
-                with open(images_file_name, 'r') as fp:
-                    self.images[set_type] = json.load(fp)
-            except Exception as e:
-                self.exception("Failed to load %s", images_file_name)
-                raise from_none(e)
-            for image_name in sorted(self.images[set_type].keys()):
-                image_fnme = self.images[set_type][image_name]["path"]
-                image = self.decode_image(image_fnme)
-                getattr(self, "get_dataset_%s" % self.series)(
-                    set_type, image_name, image, mean)
+        mean_jobs, jobs = self.plan_dataset()
+        shape = (len(self.original_labels),) + self.sample_shape
+        self.info("Planned %d samples from %d images", shape[0], len(jobs))
+        stages = (("mean", mean_jobs), ("write", jobs))
+        self._progress_key = numpy.array(
+            [len(mean_jobs), len(jobs), shape[0], self.shard_size])
+        if not self.load_progress() or \
+                not os.path.exists(original_data_dir) or \
+                os.path.getsize(original_data_dir) != numpy.prod(shape):
+            self.info(
+                "Will remove old files:\n %s\n %s\n %s\n" %
+                (original_data_dir, original_labels_dir, count_samples_dir))
+            for file_name in (original_data_dir, original_labels_dir,
+                              count_samples_dir, self.progress_file):
+                if os.path.exists(file_name):
+                    os.remove(file_name)
+            self._progress = (0, 0)
+            if shape[0] > 0:
+                numpy.memmap(original_data_dir, dtype=numpy.uint8,
+                             mode="w+", shape=shape).flush()
+            else:
+                open(original_data_dir, "wb").close()
+        mean = None
+        for index, (stage, stage_jobs) in enumerate(stages):
+            self.run_stage(index, stage, stage_jobs, mean, shape)
+            if stage == "mean" and self.series == "DET":
+                mean, _ = self.transform_matrixes()
+                self.info("Mean image was calculated")
         with open(original_labels_dir, "wb") as fout:
             self.info("Saving labels of images to %s" %
                       original_labels_dir)
@@ -635,26 +709,94 @@ If you want tro check the result, run "test_load_data" command.
             logging.info("Saving count of test, validation and train to %s"
                          % count_samples_dir)
             json.dump(self.count_samples, fout)
-        mean, rdisp = self.transform_matrixes(self.s_sum, self.s_count)
+        mean, rdisp = self.transform_matrixes()
+        self.save_matrixes(mean, rdisp)
+        os.remove(self.progress_file)
+
+    def calculate_matrixes(self):
+        """Recalculates mean and rdisp matrixes in one pass over the samples
+        file written by save_dataset_to_file.
+        """
+        with open(root.prep_imagenet.file_count_samples, "r") as fin:
+            count = sum(json.load(fin).values())
+        samples = numpy.memmap(
+            root.prep_imagenet.file_original_data, dtype=numpy.uint8,
+            mode="r", shape=(count,) + self.sample_shape)
+        self.info("Calculating the statistics of %d samples...", count)
+        self.stats = RunningStatistics(self.stats.shape)
+        self.stats.update_batches(samples[..., :self.stats.shape[-1]])
+        mean, rdisp = self.transform_matrixes()
         self.save_matrixes(mean, rdisp)
 
-        self.file_samples.close()
-
-    def get_original_labels_and_data(self, txt_labels, sample, set_type):
-        text_to_int_labels_dir = root.prep_imagenet.file_text_to_int_labels
-        with open(text_to_int_labels_dir, "r") as fin:
-            labels_int_txt = json.load(fin)
-        int_labels = [labels_int_txt[txt_label] for txt_label in txt_labels]
-        if self.series != "DET" and len(int_labels) > 1:
-            self.error("Too mach labels for image")
+    def run_stage(self, index, stage, jobs, mean, shape):
+        shards = [jobs[i:i + self.shard_size]
+                  for i in range(0, len(jobs), self.shard_size)]
+        stage_index, done = self._progress
+        if stage_index > index:
+            return
+        if stage_index < index:
+            # the progress belongs to a previous stage
+            done = 0
+        elif done >= len(shards):
+            return
+        self.info("%s: %d shards of %d images, %d are ready", stage,
+                  len(shards), self.shard_size, done)
+        tasks = ((stage, shard, mean, root.prep_imagenet.file_original_data,
+                  shape) for shard in shards[done:])
+        if self.processes == 1:
+            _init_worker(self.worker_kwargs)
+            results = (_process_shard(task) for task in tasks)
+            pool = None
         else:
-            for int_label in int_labels:
-                sample.tofile(self.file_samples)
-                self.original_labels.append(int_label)
-                self.count_samples[set_type] += 1
-
-    def transform_matrixes(self, s_sum, s_count):
-        self.s_mean = s_sum / s_count
+            pool = Pool(self.processes, _init_worker, (self.worker_kwargs,))
+            results = pool.imap(_process_shard, tasks)
+        try:
+            for stats in results:
+                self.stats.merge(stats)
+                done += 1
+                self._progress = (index, done)
+                self.save_progress()
+                if done % 100 == 0 or done == len(shards):
+                    self.info("%s: %d/%d shards", stage, done, len(shards))
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        self._progress = (index + 1, 0)
+        self.save_progress()
+
+    @property
+    def progress_file(self):
+        return root.prep_imagenet.file_original_data + ".progress.npz"
+
+    def save_progress(self):
+        tmp_file = self.progress_file + ".tmp"
+        with open(tmp_file, "wb") as fout:
+            numpy.savez(fout, key=self._progress_key,
+                        progress=numpy.array(self._progress),
+                        **self.stats.to_dict())
+        os.rename(tmp_file, self.progress_file)
+
+    def load_progress(self):
+        """Restores the accumulators and the number of the processed shards.
+
+        Returns:
+            True if the progress matches the current dataset plan.
+        """
+        if not os.path.exists(self.progress_file):
+            return False
+        with numpy.load(self.progress_file) as progress:
+            if not numpy.array_equal(progress["key"], self._progress_key):
+                self.warning("%s belongs to another dataset, starting over",
+                             self.progress_file)
+                return False
+            self._progress = tuple(int(v) for v in progress["progress"])
+            self.stats = RunningStatistics.from_dict(progress)
+        self.info("Resuming from stage %d, shard %d", *self._progress)
+        return True
+
+    def transform_matrixes(self):
+        self.s_mean = self.stats.mean(numpy.float64)
         mean = numpy.round(self.s_mean)
         numpy.clip(mean, 0, 255, mean)
         mean = mean.astype(opencl_types.dtypes[
@@ -664,7 +806,12 @@ If you want tro check the result, run "test_load_data" command.
             mean = self.to_4ch(mean)
             mean[:, :, 3:4] = 0
 
-        disp = self.s_max - self.s_min
+        if self.dispersion == "std":
+            disp = self.stats.std(numpy.float64)
+        elif self.dispersion == "range":
+            disp = self.stats.range(numpy.float64)
+        else:
+            raise ValueError("Unsupported dispersion: %s" % self.dispersion)
         if self._include_derivative:
             disp = self.to_4ch(disp)
 
@@ -674,7 +821,7 @@ If you want tro check the result, run "test_load_data" command.
         rdisp.shape = disp.shape
         if self._include_derivative:
             rdisp[:, :, 3:4] = 1.0 / 128
-        return mean, rdisp
+        return mean, rdisp.astype(mean.dtype)
 
     def to_4ch(self, array):
         assert len(array.shape) == 3
@@ -688,8 +835,7 @@ If you want tro check the result, run "test_load_data" command.
         out_path_mean = os.path.join(
             root.prep_imagenet.root_path, "mean_image.JPEG")
         scipy.misc.imsave(out_path_mean, self.s_mean)
-        self.matrixes.append(mean)
-        self.matrixes.append(rdisp)
+        self.matrixes[:] = [mean, rdisp]
         with open(matrix_file, "wb") as fout:
             self.info(
                 "Saving mean, min and max matrix to %s" % matrix_file)
@@ -785,6 +931,21 @@ If you want tro check the result, run "test_load_data" command.
         getattr(self, root.prep_imagenet.command_to_run)()
         self.info("End of job")
 
+
+_worker = None
+
+
+def _init_worker(kwargs):
+    global _worker
+    # the pool is the source of parallelism
+    cv2.setNumThreads(1)
+    _worker = PreparationImagenet(**kwargs)
+
+
+def _process_shard(args):
+    return _worker.process_shard(*args)
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     sys.exit(PreparationImagenet().run())
@@ -35,6 +35,7 @@ under the License.
 
 
 import numpy
+import pickle
 import time
 from veles.backends import NumpyDevice
 
@@ -195,6 +196,55 @@ class TestAll2All(AcceleratedTest):
         self.assertTrue(a2a.bias)
 
 
+@assign_backend("numpy")
+class NumpyTestAll2AllHalfPrecision(AcceleratedTest):
+    def test_half_precision(self):
+        inp = Array(numpy.empty((20, 30), dtype=numpy.float32))
+        prng.get().fill(inp.mem)
+        units = []
+        for half in False, True:
+            prng.get().seed(1234)
+            c = all2all.All2AllTanh(self.parent, output_sample_shape=[10],
+                                    half_precision=half)
+            c.input = inp
+            c.initialize(device=self.device)
+            units.append(c)
+        full, half = units
+        self.assertEqual(half.weights.dtype, numpy.float16)
+        self.assertEqual(half.bias.dtype, numpy.float16)
+        self.assertEqual(half.output.dtype, numpy.float16)
+        full.weights.mem[:] = half.weights.mem
+        full.bias.mem[:] = half.bias.mem
+        for c in units:
+            c.run()
+        max_diff = numpy.fabs(full.output.mem - half.output.mem).max()
+        self.assertLess(max_diff, 0.01, "Result differs by %.6f" % max_diff)
+
+    def test_snapshot_half_precision(self):
+        inp = Array(numpy.empty((20, 30), dtype=numpy.float32))
+        prng.get().fill(inp.mem)
+        c = all2all.All2AllTanh(self.parent, output_sample_shape=[10],
+                                snapshot_half_precision=True)
+        c.input = inp
+        c.initialize(device=self.device)
+        weights = c.weights.mem.copy()
+        bias = c.bias.mem.copy()
+        state = c.__getstate__()
+        self.assertEqual(state["weights"].dtype, numpy.float16)
+        self.assertEqual(state["bias"].dtype, numpy.float16)
+        # the unit itself keeps the full precision
+        self.assertEqual(c.weights.dtype, numpy.float32)
+
+        loaded = pickle.loads(pickle.dumps(c))
+        loaded.input = inp
+        loaded.initialize(device=self.device)
+        self.assertEqual(loaded.weights.dtype, numpy.float32)
+        self.assertEqual(loaded.bias.dtype, numpy.float32)
+        self.assertTrue((loaded.weights.mem ==
+                         weights.astype(numpy.float16)).all())
+        self.assertTrue((loaded.bias.mem == bias.astype(numpy.float16)).all())
+
+
 @assign_backend("ocl")
 class OpenCLTestAll2All(TestAll2All):
     pass
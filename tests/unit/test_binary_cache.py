@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Tests the binary cache of the parsed text datasets.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from veles.dummy import DummyWorkflow
+import veles.znicz.loader.loader_wine as loader_wine
+
+
+class TestBinaryCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.data_dir = tempfile.mkdtemp()
+        self.dataset_file = os.path.join(self.data_dir, "wine.txt.gz")
+        shutil.copy(os.path.join(os.path.dirname(__file__),
+                                 "../../samples/Wine/wine.txt.gz"),
+                    self.dataset_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.data_dir)
+
+    def _load(self):
+        loader = loader_wine.WineLoader(
+            DummyWorkflow(), dataset_file=self.dataset_file,
+            cache_dir=self.cache_dir)
+        loader.load_data()
+        return loader
+
+    def test_wine(self):
+        parsed = self._load()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        loadtxt = numpy.loadtxt
+        numpy.loadtxt = None
+        try:
+            cached = self._load()
+        finally:
+            numpy.loadtxt = loadtxt
+        self.assertIsInstance(cached.original_data.mem, numpy.memmap)
+        self.assertTrue((parsed.original_data.mem ==
+                         cached.original_data.mem).all())
+        self.assertEqual(parsed.original_labels, cached.original_labels)
+        self.assertEqual(parsed.class_lengths, cached.class_lengths)
+
+    def test_invalidation(self):
+        stale = self._load().cache_path(self.dataset_file, testing=False)
+        mtime = os.path.getmtime(self.dataset_file) + 10
+        os.utime(self.dataset_file, (mtime, mtime))
+        loader = self._load()
+        # the stale cache is replaced
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(
+            loader.cache_path(self.dataset_file, testing=False))])
+        self.assertFalse(os.path.exists(stale))
+        # the caches of the other configurations are kept
+        loader.save_cache(self.dataset_file, testing=True)
+        loader.save_cache(self.dataset_file, testing=False)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
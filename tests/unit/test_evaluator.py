@@ -34,13 +34,16 @@ under the License.
 """
 
 import numpy
+import unittest
 
 from veles.config import root
+from veles.dummy import DummyWorkflow
 from veles.memory import Array
 from veles.normalization import NoneNormalizer
 import veles.opencl_types as opencl_types
 import veles.prng as random_generator
 from veles.tests import AcceleratedTest, assign_backend
+from veles.znicz.decision import DecisionGD
 import veles.znicz.evaluator as evaluator
 
 
@@ -123,6 +126,108 @@ class TestEvaluator(AcceleratedTest):
         self.info("Difference is %.12f", max_diff)
         self.assertLess(max_diff, 1.0e-4)
 
+    def test_softmax_sparse_confusion_matrix(self):
+        batch_size = 30
+        n_classes = 10
+
+        dtype = opencl_types.dtypes[root.common.engine.precision_type]
+        output = numpy.empty([batch_size, n_classes], dtype=dtype)
+        random_generator.get().fill(output)
+        max_idx = output.argmax(axis=1).astype(numpy.int32)
+        labels = random_generator.get().randint(
+            0, n_classes, batch_size).astype(numpy.int32)
+        labels[3] = -1
+
+        matrixes = []
+        for sparse in False, True:
+            ev = evaluator.EvaluatorSoftmax(
+                self.parent, sparse_confusion_matrix=sparse)
+            ev.output = Array(output.copy())
+            ev.labels = Array(labels.copy())
+            ev.max_idx = Array(max_idx.copy())
+            ev.batch_size = batch_size - 5
+            ev.initialize(device=self.device)
+            for _ in range(2):
+                ev.run()
+            if sparse:
+                self.assertFalse(ev.confusion_matrix)
+                matrixes.append(ev.confusion_coo.todense())
+            else:
+                self.assertIsNone(ev.confusion_coo)
+                ev.confusion_matrix.map_read()
+                matrixes.append(ev.confusion_matrix.mem.copy())
+        self.assertEqual(matrixes[0].sum(), 2 * (batch_size - 6))
+        self.assertTrue((matrixes[0] == matrixes[1]).all())
+
+
+class TestSparseConfusionMatrix(unittest.TestCase):
+    def setUp(self):
+        self.predicted = numpy.random.randint(0, 50, 1000)
+        self.true = numpy.random.randint(0, 50, 1000)
+        self.dense = numpy.zeros((50, 50), dtype=numpy.int32)
+        numpy.add.at(self.dense, (self.predicted, self.true), 1)
+
+    def test_coo(self):
+        coo = evaluator.SparseConfusionMatrix(50)
+        for i in range(0, 1000, 100):
+            coo.add(self.predicted[i:i + 100], self.true[i:i + 100])
+        self.assertEqual(len(coo), numpy.count_nonzero(self.dense))
+        self.assertTrue((coo.todense() == self.dense).all())
+        predicted, true, counts = coo.coo()
+        self.assertEqual(predicted.dtype, numpy.int32)
+        self.assertTrue((self.dense[predicted, true] == counts).all())
+
+        merged = evaluator.SparseConfusionMatrix(50)
+        merged.merge(coo.coo())
+        merged.merge(coo.coo())
+        self.assertTrue((merged.todense() == self.dense * 2).all())
+
+        predicted, true, counts = coo.top(5)
+        self.assertTrue((predicted != true).all())
+        self.assertTrue((numpy.diff(counts) <= 0).all())
+        errors = self.dense.copy()
+        numpy.fill_diagonal(errors, 0)
+        self.assertEqual(counts[0], errors.max())
+        coo.reset()
+        self.assertEqual(len(coo), 0)
+        self.assertEqual(len(coo.top(5)[0]), 0)
+
+    def test_decision(self):
+        parent = DummyWorkflow()
+        slave = DecisionGD(parent)
+        slave.minibatch_confusion_coo = evaluator.SparseConfusionMatrix(50)
+        slave.minibatch_confusion_coo.add(self.predicted, self.true)
+        data = {}
+        slave.on_generate_data_for_master(data)
+        self.assertEqual(len(data["minibatch_confusion_coo"][0]),
+                         numpy.count_nonzero(self.dense))
+
+        # the master merges into either sparse or dense matrix
+        master = DecisionGD(parent)
+        master.minibatch_confusion_coo = evaluator.SparseConfusionMatrix(50)
+        master.on_apply_data_from_slave(data, None)
+        master.on_apply_data_from_slave(data, None)
+        self.assertTrue((master.minibatch_confusion_coo.todense() ==
+                         self.dense * 2).all())
+        master = DecisionGD(parent)
+        master.minibatch_confusion_matrix = Array(
+            numpy.zeros_like(self.dense))
+        master.on_apply_data_from_slave(data, None)
+        self.assertTrue(
+            (master.minibatch_confusion_matrix.mem == self.dense).all())
+
+        slave.confusion_top = 3
+        data = {}
+        slave.on_generate_data_for_master(data)
+        self.assertEqual(len(data["minibatch_confusion_coo"][0]), 3)
+        self.assertEqual(data["minibatch_confusion_coo"][2][0],
+                         self.dense.max())
+
+
+@assign_backend("numpy")
+class NumpyTestEvaluator(TestEvaluator):
+    pass
+
 
 @assign_backend("ocl")
 class OpenCLTestEvaluator(TestEvaluator):
@@ -200,6 +200,63 @@ class TestGD(AcceleratedTest, GDNumDiff):
         self._do_test_gpu_cpu(all2all.All2AllSigmoid, PatchedGDSigmoid)
 
 
+@assign_backend("numpy")
+class NumpyTestGDHalfPrecision(AcceleratedTest):
+    LOSS_SCALE = 1024.0
+    STEPS = 50
+
+    def test_master_weights(self):
+        prng.get().seed(123)
+        inp = numpy.zeros([2, 25], dtype=numpy.float32)
+        prng.get().fill(inp)
+        forward = all2all.All2All(self.parent, output_sample_shape=[7],
+                                  half_precision=True)
+        forward.input = Array(inp)
+        forward.initialize(device=self.device)
+        forward.run()
+        forward.output.map_read()
+        err_output = numpy.zeros(forward.output.shape, dtype=numpy.float32)
+        prng.get().fill(err_output)
+        err_output *= 1e-3
+
+        c = GradientDescent(self.parent,
+                            gradient_moment=0, gradient_moment_bias=0,
+                            learning_rate=1e-3, weights_decay=0,
+                            learning_rate_bias=1e-3, weights_decay_bias=0,
+                            loss_scale=self.LOSS_SCALE)
+        # the evaluator scales err_output so that it does not underflow
+        c.err_output = Array(
+            (err_output * self.LOSS_SCALE).astype(numpy.float16))
+        c.input = forward.input
+        c.weights = forward.weights
+        c.bias = forward.bias
+        c.output = forward.output
+        c.initialize(device=self.device)
+        self.assertEqual(c.master_weights.dtype, numpy.float32)
+        self.assertEqual(c.weights.dtype, numpy.float16)
+        c.weights.map_read()
+        initial = c.weights.mem.astype(numpy.float32)
+        c.run()
+        c.master_weights.map_read()
+        step = c.master_weights.mem - initial
+        for _ in range(self.STEPS - 1):
+            c.run()
+        c.master_weights.map_read()
+        c.weights.map_read()
+        # the float16 storage is the rounded master copy
+        self.assertTrue((c.weights.mem ==
+                         c.master_weights.mem.astype(numpy.float16)).all())
+        # the steps smaller than the float16 resolution are not lost
+        tiny = (numpy.fabs(step) <
+                numpy.spacing(initial.astype(numpy.float16)) / 2) & \
+            (step != 0)
+        self.assertTrue(tiny.any())
+        accumulated = c.master_weights.mem - initial
+        self.assertTrue(numpy.allclose(accumulated[tiny],
+                                       step[tiny] * self.STEPS,
+                                       rtol=1e-2, atol=0))
+
+
 @assign_backend("ocl")
 class OpenCLTestGD(TestGD):
     pass
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Tests of the gradient compression.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import logging
+import os
+import pickle
+import time
+import unittest
+
+import numpy
+
+from veles.dummy import DummyWorkflow
+from veles.memory import Array
+from veles.znicz.gd import GradientDescent
+from veles.znicz.gradient_compression import create_compressor, \
+    decompress, decompress_add, payload_nbytes, Float16Compressor, \
+    GradientCompressor, SignCompressor, TopKCompressor
+from veles.znicz.loader.loader_mnist import read_idx, test_image_dir, \
+    test_label_dir, train_image_dir, train_label_dir
+
+
+class TestCompressors(unittest.TestCase):
+    def setUp(self):
+        self.gradient = numpy.random.uniform(
+            -1e-4, 1e-4, (100, 784)).astype(numpy.float32)
+
+    def test_create(self):
+        self.assertIsInstance(create_compressor(None), GradientCompressor)
+        self.assertIsInstance(create_compressor("float16"),
+                              Float16Compressor)
+        topk = create_compressor({"type": "topk", "ratio": 0.1})
+        self.assertIsInstance(topk, TopKCompressor)
+        self.assertEqual(topk.ratio, 0.1)
+        self.assertIs(create_compressor(topk), topk)
+        self.assertRaises(ValueError, create_compressor, "zip")
+        self.assertRaises(ValueError, create_compressor,
+                          {"type": "topk", "ratio": 0})
+
+    def test_none(self):
+        compressor = GradientCompressor()
+        payload = compressor.compress("weights", self.gradient)
+        self.assertIs(payload, self.gradient)
+        self.assertIsNone(compressor.compress("bias", None))
+        self.assertEqual(compressor.compression_ratio, 1)
+
+    def test_float16(self):
+        compressor = Float16Compressor()
+        payload = pickle.loads(pickle.dumps(
+            compressor.compress("weights", self.gradient)))
+        self.assertEqual(payload_nbytes(payload), self.gradient.nbytes // 2)
+        restored = decompress(payload)
+        self.assertEqual(restored.shape, self.gradient.shape)
+        # the scaling protects the small values from underflow
+        self.assertLess(numpy.fabs(restored - self.gradient).max(), 1e-7)
+        self.assertFalse(compressor.residuals)
+
+    def test_topk(self):
+        compressor = TopKCompressor(ratio=0.01)
+        payload = compressor.compress("weights", self.gradient)
+        k = self.gradient.size // 100
+        self.assertEqual(len(payload[2]), k)
+        restored = decompress(payload)
+        self.assertEqual(numpy.count_nonzero(restored), k)
+        threshold = numpy.sort(numpy.fabs(self.gradient).ravel())[-k]
+        self.assertGreaterEqual(numpy.fabs(restored).max(), threshold)
+        self.assertTrue((numpy.fabs(restored[restored != 0]) >=
+                         threshold).all())
+        # nothing is lost: the rest is kept in the residual
+        residual = compressor.residuals["weights"]
+        self.assertLess(numpy.fabs(restored + residual -
+                                   self.gradient).max(), 1e-10)
+        self.assertGreater(compressor.compression_ratio, 45)
+
+    def test_sign(self):
+        compressor = SignCompressor(error_feedback=False)
+        payload = compressor.compress("weights", self.gradient)
+        self.assertEqual(len(payload[3]), self.gradient.size // 8)
+        restored = decompress(payload)
+        self.assertTrue((numpy.sign(restored) ==
+                         numpy.sign(self.gradient)).all())
+        self.assertLess(numpy.fabs(
+            numpy.fabs(restored).mean(axis=1) -
+            numpy.fabs(self.gradient).mean(axis=1)).max(), 1e-10)
+        self.assertGreater(compressor.compression_ratio, 25)
+        bias = numpy.array([1, -2, 3], dtype=numpy.float32)
+        self.assertTrue((decompress(compressor.compress("bias", bias)) ==
+                         [2, -2, 2]).all())
+
+    def test_min_size(self):
+        compressor = SignCompressor(min_size=1000)
+        bias = self.gradient[0]
+        self.assertIs(compressor.compress("bias", bias), bias)
+
+    def test_error_feedback(self):
+        for compressor in TopKCompressor(ratio=0.05), SignCompressor():
+            transmitted = numpy.zeros_like(self.gradient)
+            total = numpy.zeros_like(self.gradient)
+            for _ in range(50):
+                gradient = numpy.random.uniform(
+                    -1e-4, 1e-4, self.gradient.shape).astype(numpy.float32)
+                total += gradient
+                decompress_add(transmitted,
+                               compressor.compress("weights", gradient))
+            self.assertLess(numpy.fabs(
+                transmitted + compressor.residuals["weights"] - total).max(),
+                1e-8, compressor)
+
+
+class TestGradientDescent(unittest.TestCase):
+    def setUp(self):
+        self.parent = DummyWorkflow()
+
+    def tearDown(self):
+        del self.parent
+
+    def test_master_slave(self):
+        gradient = numpy.random.uniform(
+            -1, 1, (10, 20)).astype(numpy.float32)
+        gradient_bias = numpy.random.uniform(-1, 1, 10).astype(numpy.float32)
+        slave = GradientDescent(
+            self.parent, gradient_compression={"type": "topk", "k": 20})
+        slave.gradient_weights_with_moment = Array(gradient.copy())
+        slave.gradient_bias_with_moment = Array(gradient_bias.copy())
+        slave.gradient_changed = True
+        data = pickle.loads(pickle.dumps(slave.generate_data_for_master()))
+        self.assertEqual(len(data[0][2]), 20)
+        self.assertEqual(len(data[1][2]), 10)
+
+        master = GradientDescent(self.parent, gradient_moment=0,
+                                 gradient_moment_bias=0)
+        master.weights = Array(numpy.zeros_like(gradient))
+        master.bias = Array(numpy.zeros_like(gradient_bias))
+        master.gradient_weights_with_moment = Array(
+            numpy.zeros_like(gradient))
+        master.gradient_bias_with_moment = Array(
+            numpy.zeros_like(gradient_bias))
+        master.apply_data_from_slave(data, None)
+        self.assertTrue((master.bias.mem == gradient_bias).all())
+        self.assertEqual(numpy.count_nonzero(master.weights.mem), 20)
+        self.assertTrue((master.weights.mem + slave.gradient_compressor.
+                         residuals["weights"] == gradient).all())
+
+
+class TestMnistBenchmark(unittest.TestCase):
+    """Trains softmax regression on MNIST with several simulated slaves,
+    which send the compressed gradients to the master the same way
+    GradientDescentBase does, and reports the bytes per step and the test
+    error of each compression.
+    """
+    SLAVES = 4
+    BATCH = 100
+    LEARNING_RATE = 0.1
+
+    @classmethod
+    def setUpClass(cls):
+        files = (train_image_dir, train_label_dir, test_image_dir,
+                 test_label_dir)
+        if not all(os.path.exists(f) for f in files):
+            raise unittest.SkipTest("MNIST is not downloaded")
+        cls.train = read_idx(train_image_dir).reshape(60000, 784) / 255.0
+        cls.train_labels = numpy.array(read_idx(train_label_dir))
+        cls.test = read_idx(test_image_dir).reshape(10000, 784) / 255.0
+        cls.test_labels = numpy.array(read_idx(test_label_dir))
+
+    def _train(self, config, epochs=1):
+        prng = numpy.random.RandomState(1234)
+        weights = numpy.zeros((10, 784), dtype=numpy.float32)
+        bias = numpy.zeros(10, dtype=numpy.float32)
+        compressors = [create_compressor(config) for _ in range(self.SLAVES)]
+        steps = 0
+        t0 = time.time()
+        for _ in range(epochs):
+            order = prng.permutation(len(self.train))
+            for start in range(0, len(order), self.BATCH):
+                indices = order[start:start + self.BATCH]
+                x = self.train[indices]
+                y = x.dot(weights.T) + bias
+                y = numpy.exp(y - y.max(axis=1)[:, numpy.newaxis])
+                y /= y.sum(axis=1)[:, numpy.newaxis]
+                y[numpy.arange(len(indices)), self.train_labels[indices]] -= 1
+                y *= -self.LEARNING_RATE / len(indices)
+                compressor = compressors[steps % self.SLAVES]
+                decompress_add(weights, compressor.compress(
+                    "weights", y.T.dot(x).astype(numpy.float32)))
+                decompress_add(bias, compressor.compress(
+                    "bias", y.sum(axis=0).astype(numpy.float32)))
+                steps += 1
+        dt = time.time() - t0
+        predicted = (self.test.dot(weights.T) + bias).argmax(axis=1)
+        error = numpy.mean(predicted != self.test_labels)
+        sent = sum(c.compressed_bytes for c in compressors)
+        raw = sum(c.raw_bytes for c in compressors)
+        logging.info("%-8s: %7d bytes/step (%5.1fx), %.2f%% test errors, "
+                     "%.1f ms/step", create_compressor(config).TYPE,
+                     sent // steps, raw / sent, error * 100,
+                     dt * 1000 / steps)
+        return error
+
+    def test_benchmark_mnist(self):
+        baseline = self._train(None)
+        self.assertLess(baseline, 0.1)
+        for config in ("float16", {"type": "topk", "ratio": 0.01}, "sign"):
+            self.assertLess(self._train(config), baseline + 0.02)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Unit test for the fused inference engine.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+import numpy
+import time
+
+from veles.memory import Array
+import veles.prng as prng
+from veles.tests import AcceleratedTest, assign_backend
+from veles.znicz import all2all, conv, dropout, pooling
+from veles.znicz.inference_engine import InferenceEngine
+
+
+@assign_backend("numpy")
+class TestInferenceEngine(AcceleratedTest):
+    def setUp(self):
+        super(TestInferenceEngine, self).setUp()
+        prng.get().seed(1234)
+
+    def _link(self, input_shape, units):
+        inp = Array(numpy.zeros(input_shape, dtype=numpy.float32))
+        prng.get().fill(inp.mem)
+        prev = None
+        for unit in units:
+            unit.input = inp if prev is None else prev.output
+            unit.initialize(device=self.device)
+            prev = unit
+        return inp
+
+    def _run_units(self, units):
+        for unit in units:
+            unit.run()
+        units[-1].output.map_read()
+        return units[-1].output.mem
+
+    def test_conv_pooling_all2all(self):
+        self.info("Will test the fused engine against the units")
+        units = [
+            conv.ConvStrictRELU(self.parent, n_kernels=4, kx=3, ky=3,
+                                padding=(1, 1, 1, 1)),
+            pooling.MaxPooling(self.parent, kx=2, ky=2),
+            dropout.DropoutForward(self.parent, dropout_ratio=0.5),
+            all2all.All2AllTanh(self.parent, output_sample_shape=[12]),
+            all2all.All2AllSoftmax(self.parent, output_sample_shape=[5])]
+        inp = self._link((6, 7, 7, 3), units)
+        units[2].forward_mode = True
+        expected = self._run_units(units)
+        engine = InferenceEngine(units)
+        self.assertEqual(len(engine.operations), 4)
+        self.assertEqual(engine.output_shape, (5,))
+        got = engine.predict(inp.mem)
+        max_diff = numpy.fabs(got - expected).max()
+        self.assertLess(max_diff, 1e-5, "Result differs by %.6f" % max_diff)
+        got = engine(inp.mem[:2])
+        self.assertEqual(got.shape, (2, 5))
+        max_diff = numpy.fabs(got - expected[:2]).max()
+        self.assertLess(max_diff, 1e-5, "Result differs by %.6f" % max_diff)
+
+    def test_variable_batch_size(self):
+        units = [
+            conv.ConvTanh(self.parent, n_kernels=3, kx=3, ky=3),
+            pooling.AvgPooling(self.parent, kx=2, ky=2),
+            all2all.All2AllRELU(self.parent, output_sample_shape=[4])]
+        inp = self._link((3, 6, 6, 2), units)
+        expected = self._run_units(units).copy()
+        engine = InferenceEngine(units, max_batch_size=1)
+        self.assertEqual(engine.max_batch_size, 1)
+        for size in 1, 2, 3:
+            got = engine.predict(inp.mem[:size])
+            max_diff = numpy.fabs(got - expected[:size]).max()
+            self.assertLess(max_diff, 1e-5,
+                            "Result differs by %.6f" % max_diff)
+        self.assertEqual(engine.max_batch_size, 4)
+        batch = numpy.concatenate([inp.mem] * 4)
+        got = engine.predict(batch)
+        self.assertEqual(engine.max_batch_size, 12)
+        max_diff = numpy.fabs(got - numpy.concatenate([expected] * 4)).max()
+        self.assertLess(max_diff, 1e-5, "Result differs by %.6f" % max_diff)
+        got = engine.predict(inp.mem[:1])
+        max_diff = numpy.fabs(got - expected[:1]).max()
+        self.assertLess(max_diff, 1e-5, "Result differs by %.6f" % max_diff)
+
+    def _benchmark(self, name, input_shape, units, iterations=20):
+        inp = self._link(input_shape, units)
+        expected = self._run_units(units)
+        engine = InferenceEngine(units)
+        got = engine.predict(inp.mem)
+        max_diff = numpy.fabs(got - expected).max()
+        self.assertLess(max_diff, 1e-4, "Result differs by %.6f" % max_diff)
+        t0 = time.time()
+        for _ in range(iterations):
+            self._run_units(units)
+        dt_units = (time.time() - t0) / iterations
+        t0 = time.time()
+        for _ in range(iterations):
+            engine.predict(inp.mem)
+        dt_engine = (time.time() - t0) / iterations
+        self.info("%s: units %.2f ms, engine %.2f ms (%.1fx)", name,
+                  dt_units * 1000, dt_engine * 1000,
+                  dt_units / max(dt_engine, 1e-9))
+
+    def test_benchmark_mnist(self):
+        self._benchmark("MNIST-like MLP", (100, 784), [
+            all2all.All2AllTanh(self.parent, output_sample_shape=[100]),
+            all2all.All2AllSoftmax(self.parent, output_sample_shape=[10])])
+
+    def test_benchmark_cifar(self):
+        self._benchmark("CIFAR-like convnet", (50, 32, 32, 3), [
+            conv.ConvStrictRELU(self.parent, n_kernels=32, kx=5, ky=5,
+                                padding=(2, 2, 2, 2)),
+            pooling.MaxPooling(self.parent, kx=3, ky=3, sliding=(2, 2)),
+            conv.ConvStrictRELU(self.parent, n_kernels=32, kx=5, ky=5,
+                                padding=(2, 2, 2, 2)),
+            pooling.AvgPooling(self.parent, kx=3, ky=3, sliding=(2, 2)),
+            all2all.All2AllSoftmax(self.parent, output_sample_shape=[10])],
+            iterations=5)
+
+
+if __name__ == "__main__":
+    AcceleratedTest.main()
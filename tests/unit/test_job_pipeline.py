@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Tests of the slave jobs pipelining.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import logging
+from multiprocessing import Pipe, Process
+import pickle
+import threading
+import time
+import unittest
+
+import numpy
+
+from veles.dummy import DummyWorkflow
+from veles.memory import Array
+from veles.znicz.gd import GradientDescent
+from veles.znicz.job_pipeline import JobPipeline
+from veles.znicz.nn_rollback import NNRollback
+from veles.znicz.tests.unit.test_nn_units import TrivialForward
+
+
+LATENCY = 0.02
+COMPUTE = 0.02
+JOBS = 25
+
+
+def _master(jobs_conn, updates_conn):
+    """Plays the master: serves the current weights with the simulated
+    network latency and applies the updates in the order they arrive.
+    """
+    weights = numpy.zeros(1000, dtype=numpy.float32)
+    state = {"version": 0, "staleness": 0, "applied": 0}
+    lock = threading.Lock()
+
+    def apply_updates():
+        for _ in range(JOBS):
+            base, gradient = updates_conn.recv()
+            with lock:
+                weights[:] += gradient
+                state["staleness"] = max(state["staleness"],
+                                         state["version"] - base)
+                state["version"] += 1
+                state["applied"] += 1
+
+    applier = threading.Thread(target=apply_updates)
+    applier.start()
+    for index in range(JOBS + 1):
+        jobs_conn.recv()
+        time.sleep(LATENCY)
+        if index == JOBS:
+            jobs_conn.send(None)
+            break
+        with lock:
+            jobs_conn.send((state["version"], weights.copy()))
+    applier.join()
+    state["sum"] = float(weights.sum())
+    updates_conn.send(state)
+
+
+class TestJobPipeline(unittest.TestCase):
+    def _run(self, depth):
+        jobs_conn, master_jobs_conn = Pipe()
+        updates_conn, master_updates_conn = Pipe()
+        master = Process(target=_master,
+                         args=(master_jobs_conn, master_updates_conn))
+        master.start()
+        order = []
+
+        def fetch():
+            jobs_conn.send("job")
+            return jobs_conn.recv()
+
+        def process(job):
+            version, weights = job
+            order.append(version)
+            time.sleep(COMPUTE)
+            return version, numpy.ones_like(weights)
+
+        try:
+            pipeline = JobPipeline(fetch, process, updates_conn.send,
+                                   depth=depth)
+            self.assertEqual(pipeline.run(), JOBS)
+            state = updates_conn.recv()
+        finally:
+            master.join()
+        self.assertEqual(state["applied"], JOBS)
+        self.assertEqual(state["sum"], JOBS * 1000)
+        self.assertEqual(order, sorted(order))
+        # the job is at most depth updates old
+        self.assertLessEqual(state["staleness"], depth)
+        logging.info("depth %d: %.1f jobs/sec, waited for the jobs %.2f sec",
+                     depth, pipeline.throughput, pipeline.fetch_wait)
+
+    def test_throughput(self):
+        # ideally 2x faster with the pipelining, the latency equals
+        # the computation time
+        self._run(0)
+        self._run(1)
+
+    def test_error(self):
+        def fetch():
+            raise ValueError("connection lost")
+
+        pipeline = JobPipeline(fetch, lambda job: job, lambda update: None)
+        self.assertRaises(ValueError, pipeline.run)
+        self.assertRaises(ValueError, JobPipeline, fetch, None, None,
+                          depth=-1)
+
+    def test_unprocessed(self):
+        counter = [0]
+        fetching = threading.Event()
+
+        def fetch():
+            counter[0] += 1
+            if counter[0] == 2:
+                fetching.set()
+                time.sleep(0.05)
+            return counter[0]
+
+        def process(job):
+            # the next job is being received
+            fetching.wait()
+            pipeline.stop()
+            return job
+
+        pipeline = JobPipeline(fetch, process, lambda update: None, depth=1)
+        self.assertEqual(pipeline.run(), 1)
+        self.assertTrue(pipeline.join(1))
+        self.assertEqual(pipeline.unprocessed, [2])
+        self.assertEqual(counter[0], 2)
+
+
+class TestPipelinedUnits(unittest.TestCase):
+    """Drives the real Forward and GradientDescent units of a master and
+    a slave with two jobs outstanding.
+    """
+    JOBS = 12
+
+    def setUp(self):
+        self.parent = DummyWorkflow()
+        self.master_fwd = TrivialForward(self.parent, weights_history=4)
+        self.master_fwd.weights.reset(numpy.zeros((3, 4), numpy.float32))
+        self.master_fwd.bias.reset(numpy.zeros(3, numpy.float32))
+        self.master_gd = self._gd(self.master_fwd)
+        self.slave_fwd = TrivialForward(self.parent)
+        self.slave_gd = self._gd(self.slave_fwd)
+        self.slave = Slave("a")
+        self.lock = threading.Lock()
+
+    def _gd(self, fwd):
+        gd = GradientDescent(self.parent, gradient_moment=0,
+                             gradient_moment_bias=0)
+        gd.weights = fwd.weights
+        gd.bias = fwd.bias
+        gd.gradient_weights_with_moment = Array(
+            numpy.zeros((3, 4), numpy.float32))
+        gd.gradient_bias_with_moment = Array(numpy.zeros(3, numpy.float32))
+        return gd
+
+    def test_depth(self):
+        generated = []
+        applied = []
+        outstanding = [0]
+
+        def fetch():
+            with self.lock:
+                if len(generated) == self.JOBS:
+                    return None
+                # the learning rate policy of the master
+                self.master_gd.learning_rate = 0.1 * (len(generated) + 1)
+                job = (self.master_fwd.generate_data_for_slave(self.slave),
+                       self.master_gd.generate_data_for_slave(self.slave))
+                generated.append((job[0]["version"],
+                                  self.master_fwd.weights.mem.copy()))
+                outstanding[0] = max(outstanding[0], len(
+                    self.master_gd._slave_jobs_[self.slave.id]))
+                return pickle.loads(pickle.dumps(job))
+
+        def process(job):
+            self.slave_fwd.apply_data_from_master(job[0])
+            self.slave_gd.apply_data_from_master(job[1])
+            applied.append((job[0]["base"], job[0]["version"],
+                            self.slave_gd.learning_rate,
+                            self.slave_fwd.weights.mem.copy()))
+            # let the fetcher request the next job
+            time.sleep(0.01)
+            for vec in (self.slave_gd.gradient_weights_with_moment,
+                        self.slave_gd.gradient_bias_with_moment):
+                vec.mem[:] = -self.slave_gd.learning_rate
+            self.slave_gd.gradient_changed = True
+            return pickle.loads(pickle.dumps(
+                self.slave_gd.generate_data_for_master()))
+
+        def send(update):
+            with self.lock:
+                self.master_gd.apply_data_from_slave(update, self.slave)
+
+        pipeline = JobPipeline(fetch, process, send, depth=1)
+        self.assertEqual(pipeline.run(), self.JOBS)
+        self.assertEqual(outstanding[0], 2)
+        self.assertIsNone(applied[0][0])
+        for (_, version, _, _), (base, _, _, _) in zip(applied, applied[1:]):
+            # each delta is against the weights of the previous job
+            self.assertEqual(base, version)
+        for (version, weights), (_, applied_version, _, slave_weights) in \
+                zip(generated, applied):
+            self.assertEqual(version, applied_version)
+            self.assertTrue((weights == slave_weights).all())
+        learning_rates = [a[2] for a in applied]
+        self.assertEqual(learning_rates, [0.1 * (i + 1)
+                                          for i in range(self.JOBS)])
+        self.assertTrue(numpy.allclose(self.master_fwd.weights.mem,
+                                       -sum(learning_rates)))
+        self.assertTrue(numpy.allclose(self.master_fwd.bias.mem,
+                                       -sum(learning_rates)))
+
+
+class Slave(object):
+    def __init__(self, id_):
+        self.id = id_
+
+
+class RollbackCounter(NNRollback):
+    def __init__(self, workflow, **kwargs):
+        super(RollbackCounter, self).__init__(workflow, **kwargs)
+        self.runs = 0
+
+    def run(self):
+        self.runs += 1
+
+
+class TestRollbackOutstandingJobs(unittest.TestCase):
+    def test_prefetched_jobs(self):
+        rollback = RollbackCounter(DummyWorkflow())
+        slave = Slave("a")
+        rollback.generate_data_for_slave(slave)
+        rollback.generate_data_for_slave(slave)
+        rollback.apply_data_from_slave(True, slave)
+        self.assertEqual(rollback.runs, 0)
+        rollback.apply_data_from_slave(True, slave)
+        self.assertEqual(rollback.runs, 1)
+        rollback.generate_data_for_slave(slave)
+        rollback.drop_slave(slave)
+        self.assertEqual(rollback.runs, 2)
+        self.assertFalse(rollback.slaves)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -38,6 +38,7 @@ import unittest
 
 from veles.memory import Array
 from veles.tests import AcceleratedTest, assign_backend
+from veles.znicz.csr import CSRMatrix
 import veles.znicz.kohonen as kohonen
 
 
@@ -315,6 +316,64 @@ class TestKohonen(AcceleratedTest):
         self.assertLess(max_diff, 0.0001, "Result differs by %.6f" % max_diff)
 
 
+@assign_backend("numpy")
+class NumpyTestSparseKohonen(AcceleratedTest):
+    def setUp(self):
+        super(NumpyTestSparseKohonen, self).setUp()
+        rand = numpy.random.RandomState(13)
+        self.input = (rand.rand(20, 30) *
+                      (rand.rand(20, 30) < 0.2)).astype(self.dtype)
+        self.input[3] = 0
+        mask = self.input != 0
+        self.sparse = CSRMatrix(
+            numpy.append(0, numpy.cumsum(mask.sum(axis=1))),
+            numpy.nonzero(mask)[1], self.input[mask], self.input.shape)
+        self.weights = rand.rand(16, 30).astype(self.dtype) * 0.1
+
+    def test_csr(self):
+        rows = [5, 3, 0, 5, 19]
+        batch = self.sparse[rows]
+        self.assertTrue((batch.todense() == self.input[rows]).all())
+        dense = numpy.arange(30 * 4, dtype=self.dtype).reshape(30, 4)
+        self.assertLess(numpy.fabs(
+            batch.dot(dense) - self.input[rows].dot(dense)).max(), 0.001)
+        dense = dense[:5]
+        self.assertLess(numpy.fabs(
+            batch.transpose_dot(dense) -
+            self.input[rows].transpose().dot(dense)).max(), 0.001)
+
+    def _train(self, sparse):
+        c = kohonen.KohonenTrainer(self.parent, shape=(4, 4))
+        c.input = Array(self.input.copy())
+        c.weights.mem = self.weights.copy()
+        c.initialize(device=self.device)
+        c.sparse_input = self.sparse if sparse else None
+        for _ in range(3):
+            c.numpy_run()
+        return c
+
+    def test_train(self):
+        dense = self._train(False)
+        sparse = self._train(True)
+        self.assertTrue((dense.winners.mem == sparse.winners.mem).all())
+        max_diff = numpy.fabs(dense.weights.mem - sparse.weights.mem).max()
+        self.assertLess(max_diff, 0.0001, "Result differs by %.6f" % max_diff)
+
+    def test_forward(self):
+        dense = kohonen.KohonenForward(self.parent)
+        dense.input = Array(self.input.copy())
+        dense.weights = Array(self.weights.copy())
+        dense.initialize(device=self.device)
+        dense.numpy_run()
+        sparse = kohonen.KohonenForward(self.parent)
+        sparse.input = Array(self.input.copy())
+        sparse.weights = Array(self.weights.copy())
+        sparse.sparse_input = self.sparse
+        sparse.initialize(device=self.device)
+        sparse.numpy_run()
+        self.assertTrue((dense.output.mem == sparse.output.mem).all())
+
+
 @assign_backend("ocl")
 class OpenCLTestKohonen(TestKohonen):
     pass
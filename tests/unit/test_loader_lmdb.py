@@ -37,10 +37,17 @@ under the License.
 
 import logging
 import os
+import shutil
+import tempfile
 import time
 
+import lmdb
+import numpy
+
 from veles.config import root
 from veles.tests import AcceleratedTest, assign_backend
+from veles.znicz.loader.caffe import Datum
+from veles.znicz.loader.datum import decode_datum, DatumDecodePool
 from veles.znicz.loader.loader_lmdb import LMDBLoader
 
 
@@ -69,6 +76,63 @@ class TestLMDBLoader(AcceleratedTest):
         kwargs["use_cache"] = True
         self.lmdb_speed(kwargs)
 
+    def test_lru_cache(self):
+        self.info("Will test LMDB datum cache")
+        path = tempfile.mkdtemp()
+        try:
+            env = lmdb.open(path)
+            with env.begin(write=True) as txn:
+                for index in range(10):
+                    datum = Datum(channels=1, height=4, width=25,
+                                  data=bytes(bytearray([index] * 100)),
+                                  label=index)
+                    txn.put(b"%08d" % (9 - index), datum.SerializeToString())
+            env.close()
+            loader = LMDBLoader(self.parent, train_path=path,
+                                db_shape=(4, 25, 1), cache_size=500)
+            keys = loader.get_keys(2)
+            self.assertEqual(keys, sorted(keys))
+            self.assertEqual(len(keys), 10)
+            batch = keys[5:] + keys[:2]
+            labels = [d.label for d in loader.get_data(batch)]
+            self.assertEqual(labels, [4, 3, 2, 1, 0, 9, 8])
+            self.assertEqual(loader.cache_misses, 7)
+            self.assertEqual(loader.cache_bytes, 500)
+            self.assertEqual(loader.get_image_label(keys[9]), 0)
+            self.assertEqual(loader.cache_hits, 1)
+            self.assertEqual(loader.get_image_data(keys[0]).shape,
+                             (4, 25, 1))
+            self.assertEqual(loader.cache_misses, 8)
+            self.assertEqual(loader.cache_bytes, 500)
+            # keys[5] was the least recently used
+            self.assertEqual(loader.get_image_label(keys[5]), 4)
+            self.assertEqual(loader.cache_misses, 9)
+        finally:
+            shutil.rmtree(path)
+
+    def test_decode_datum(self):
+        self.info("Will test the fast Datum decoder")
+        data = numpy.arange(3 * 5 * 7, dtype=numpy.uint8).tobytes()
+        raws = [Datum(channels=3, height=5, width=7, data=data,
+                      label=label, float_data=[0.5, -2]).SerializeToString()
+                for label in (0, 7, -3)]
+        for raw in raws:
+            expected = Datum()
+            expected.ParseFromString(raw)
+            datum = decode_datum(raw)
+            for attr in "channels", "height", "width", "label":
+                self.assertEqual(getattr(datum, attr),
+                                 getattr(expected, attr))
+            self.assertEqual(datum.data.tobytes(), expected.data)
+            self.assertEqual(list(datum.float_data),
+                             list(expected.float_data))
+        pool = DatumDecodePool(2)
+        try:
+            self.assertEqual([d.label for d in pool.decode(raws)],
+                             [0, 7, -3])
+        finally:
+            pool.close()
+
     def get_kwargs(self):
         data_path = os.path.join(
             root.common.dirs.datasets, "AlexNet/LMDB_old")
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Tests the IDX reader of MNIST loader.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import numpy
+
+from veles.error import BadFormatError
+from veles.znicz.loader.loader_mnist import read_idx
+
+
+class TestReadIdx(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.images = numpy.random.randint(
+            0, 256, (5, 28, 28)).astype(numpy.uint8)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _write(self, header, data):
+        file_name = os.path.join(self.dir, "images.idx3-ubyte")
+        with open(file_name, "wb") as fout:
+            fout.write(header)
+            fout.write(data.tobytes())
+        return file_name
+
+    def test_read(self):
+        file_name = self._write(struct.pack(">i3i", 2051, 5, 28, 28),
+                                self.images)
+        images = read_idx(file_name, (5, 28, 28))
+        self.assertIsInstance(images, numpy.memmap)
+        self.assertEqual(images.dtype, numpy.uint8)
+        self.assertTrue((images == self.images).all())
+        data = numpy.zeros((5, 28, 28), dtype=numpy.float32)
+        numpy.copyto(data, images)
+        self.assertTrue((data == self.images).all())
+
+    def test_validation(self):
+        file_name = self._write(struct.pack(">i3i", 2051, 5, 28, 28),
+                                self.images[:4])
+        self.assertRaises(BadFormatError, read_idx, file_name)
+        file_name = self._write(struct.pack(">i3i", 2051, 5, 28, 28),
+                                self.images)
+        self.assertRaises(BadFormatError, read_idx, file_name, (5, 28, 27))
+        file_name = self._write(struct.pack(">i3i", 0x1803, 5, 28, 28),
+                                self.images)
+        self.assertRaises(BadFormatError, read_idx, file_name)
+        file_name = self._write(struct.pack(">i", 2051), self.images[:0])
+        self.assertRaises(BadFormatError, read_idx, file_name)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Unit test for the micro-batching request server.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import threading
+import unittest
+
+import numpy
+
+from veles.znicz.micro_batching import MicroBatchingServer
+
+
+class TestMicroBatchingServer(unittest.TestCase):
+    def setUp(self):
+        self.weights = numpy.random.RandomState(1234).rand(8, 3)
+        self.calls = []
+
+    def predictor_factory(self):
+        def predict(batch):
+            self.calls.append(len(batch))
+            return numpy.dot(batch, self.weights)
+        return predict
+
+    def test_coalescing(self):
+        samples = numpy.random.RandomState(4321).rand(200, 8)
+        results = [None] * len(samples)
+        server = MicroBatchingServer(
+            self.predictor_factory, max_batch_size=16, max_wait=0.05,
+            concurrency=2)
+
+        def client(indices):
+            futures = [(i, server.submit(samples[i])) for i in indices]
+            for i, future in futures:
+                results[i] = future.result(10)
+
+        with server:
+            clients = [threading.Thread(target=client,
+                                        args=(range(i, len(samples), 4),))
+                       for i in range(4)]
+            for thread in clients:
+                thread.start()
+            for thread in clients:
+                thread.join()
+        self.assertFalse(server.is_running)
+        numpy.testing.assert_allclose(numpy.array(results),
+                                      numpy.dot(samples, self.weights))
+        self.assertEqual(sum(self.calls), len(samples))
+        self.assertLessEqual(max(self.calls), 16)
+        self.assertLess(len(self.calls), len(samples))
+        stats = server.stats
+        self.assertEqual(stats["requests"], len(samples))
+        self.assertEqual(stats["batches"], len(self.calls))
+        self.assertEqual(stats["errors"], 0)
+        self.assertGreater(stats["throughput"], 0)
+        self.assertLessEqual(stats["latency_p50"], stats["latency_max"])
+
+    def test_max_wait(self):
+        with MicroBatchingServer(self.predictor_factory, max_batch_size=64,
+                                 max_wait=0.001) as server:
+            result = server.predict(numpy.ones(8), timeout=10)
+        numpy.testing.assert_allclose(result, self.weights.sum(axis=0))
+        self.assertEqual(self.calls, [1])
+
+    def test_errors(self):
+        def factory():
+            def predict(batch):
+                raise ValueError("bad batch")
+            return predict
+
+        with MicroBatchingServer(factory) as server:
+            future = server.submit(numpy.ones(8))
+            self.assertRaises(ValueError, future.result, 10)
+        self.assertEqual(server.stats["errors"], 1)
+        self.assertRaises(ValueError, server.submit, numpy.ones(8))
+
+    def test_submit_during_stop(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def factory():
+            def predict(batch):
+                started.set()
+                release.wait(10)
+                return numpy.dot(batch, self.weights)
+            return predict
+
+        server = MicroBatchingServer(factory, max_wait=0).start()
+        futures = [server.submit(numpy.ones(8))]
+        self.assertTrue(started.wait(10))
+        futures.append(server.submit(numpy.ones(8)))
+        stopper = threading.Thread(target=server.stop)
+        stopper.start()
+        while not server._stopping:
+            stopper.join(0.001)
+        self.assertRaises(ValueError, server.submit, numpy.ones(8))
+        release.set()
+        stopper.join(10)
+        self.assertFalse(stopper.is_alive())
+        self.assertFalse(server.is_running)
+        # the samples submitted before stop() are processed
+        for future in futures:
+            numpy.testing.assert_allclose(future.result(10),
+                                          self.weights.sum(axis=0))
+
+    def test_cancel(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def factory():
+            def predict(batch):
+                started.set()
+                release.wait(10)
+                self.calls.append(len(batch))
+                return numpy.dot(batch, self.weights)
+            return predict
+
+        server = MicroBatchingServer(factory, max_wait=0).start()
+        try:
+            busy = server.submit(numpy.ones(8))
+            self.assertTrue(started.wait(10))
+            # waits in the queue while the worker is busy
+            cancelled = server.submit(numpy.ones(8))
+            self.assertTrue(cancelled.cancel())
+            release.set()
+            numpy.testing.assert_allclose(busy.result(10),
+                                          self.weights.sum(axis=0))
+            numpy.testing.assert_allclose(
+                server.predict(numpy.ones(8) * 2, 10),
+                self.weights.sum(axis=0) * 2)
+            self.assertFalse(busy.cancel())
+        finally:
+            server.stop()
+        self.assertEqual(self.calls, [1, 1])
+        self.assertTrue(cancelled.cancelled())
+
+
+if __name__ == "__main__":
+    unittest.main()
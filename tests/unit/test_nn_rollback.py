@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Tests of NNRollback.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import logging
+import unittest
+
+import numpy
+
+from veles.dummy import DummyWorkflow
+from veles.memory import Array
+from veles.znicz.nn_rollback import NNRollback, RingBuffer
+
+
+class GD(object):
+    def __init__(self):
+        self.weights = Array(numpy.ones((3, 4), dtype=numpy.float32))
+        self.bias = Array(numpy.ones(3, dtype=numpy.float32))
+        self.gradient_weights = Array(numpy.ones((3, 4), dtype=numpy.float32))
+        self.gradient_bias = Array(numpy.ones(3, dtype=numpy.float32))
+        self.learning_rate = 1.0
+        self.learning_rate_bias = 1.0
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_ring(self):
+        ring = RingBuffer(3)
+        self.assertFalse(ring)
+        for i in range(5):
+            ring.append(numpy.full(4, i))
+        buffer = ring.buffer
+        self.assertEqual(len(ring), 3)
+        self.assertEqual([ring[i][0] for i in range(3)], [2, 3, 4])
+        self.assertEqual(ring[-1][0], 4)
+        self.assertRaises(IndexError, ring.__getitem__, 3)
+        ring.truncate(1)
+        self.assertEqual(len(ring), 1)
+        self.assertEqual(ring[-1][0], 2)
+        ring.append(numpy.full(4, 7))
+        self.assertEqual([ring[i][0] for i in range(2)], [2, 7])
+        # no reallocation
+        self.assertIs(ring.buffer, buffer)
+        self.assertRaises(ValueError, RingBuffer, 0)
+
+
+class TestNNRollback(unittest.TestCase):
+    def setUp(self):
+        self.parent = DummyWorkflow()
+
+    def tearDown(self):
+        del self.parent
+
+    def test_rollback(self):
+        gd = GD()
+        rollback = NNRollback(self.parent, minus_steps=1,
+                              store_gradients=False)
+        rollback.add_gd(gd)
+        rollback.improved = True
+        rollback.run()
+        gd.weights.mem[:] = 2
+        rollback.run()
+        kv = rollback._gds[gd]
+        self.assertNotIn("gradient_weights", kv)
+        self.assertEqual(len(kv["weights"]), 2)
+        weights = gd.weights.mem
+        gd.weights.mem[:] = 5
+        gd.bias.mem[:] = 5
+        rollback.improved = False
+        rollback.run()
+        # restored in place to the oldest state
+        self.assertIs(gd.weights.mem, weights)
+        self.assertTrue((gd.weights.mem == 1).all())
+        self.assertTrue((gd.bias.mem == 1).all())
+        self.assertAlmostEqual(gd.learning_rate, rollback.lr_plus *
+                               rollback.lr_plus * rollback.lr_minus)
+        self.assertEqual(len(kv["weights"]), 1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
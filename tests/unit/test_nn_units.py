@@ -34,14 +34,22 @@ under the License.
 
 
 import logging
+import numpy
+import os
+import pickle
+import shutil
+import tempfile
+import time
 import unittest
 from zope.interface import implementer
 
 from veles import prng
 from veles.accelerated_units import IOpenCLUnit, ICUDAUnit, INumpyUnit
 from veles.dummy import DummyWorkflow
+from veles.memory import Array
 from veles.znicz.gd import GradientDescent
-from veles.znicz.nn_units import Forward, NNSnapshotterToFile
+from veles.znicz.nn_units import Forward, NNSnapshotterToFile, \
+    NNWorkflow, MAPPED_EXPORT_ALIGNMENT
 
 
 @implementer(IOpenCLUnit, ICUDAUnit, INumpyUnit)
@@ -62,6 +70,11 @@ class TrivialForward(Forward):
         pass
 
 
+class Slave(object):
+    def __init__(self, id_):
+        self.id = id_
+
+
 class Test(unittest.TestCase):
     def setUp(self):
         self.parent = DummyWorkflow()
@@ -82,12 +95,255 @@ class Test(unittest.TestCase):
             self.assertTrue(u.ocl_set_const_args)
             self.assertEqual(getattr(u, attr), vle)
 
+    def _gd_master(self, **kwargs):
+        gd = GradientDescent(self.parent, gradient_moment=0.5,
+                             gradient_moment_bias=0.5, **kwargs)
+        gd.weights = Array(numpy.zeros((3, 4), dtype=numpy.float32))
+        gd.bias = Array(numpy.zeros(3, dtype=numpy.float32))
+        gd.gradient_weights_with_moment = Array(
+            numpy.ones_like(gd.weights.mem))
+        gd.gradient_bias_with_moment = Array(numpy.ones_like(gd.bias.mem))
+        return gd
+
+    def test_aggregate_updates(self):
+        gd = self._gd_master(aggregate_updates=3)
+        self.assertTrue(gd.aggregates)
+        updates = [(numpy.full((3, 4), i, dtype=numpy.float32),
+                    numpy.full(3, i, dtype=numpy.float32))
+                   for i in (1, 2, 3)]
+        for update in updates[:2]:
+            gd.apply_data_from_slave(update, None)
+        self.assertFalse(gd.weights.mem.any())
+        gd.apply_data_from_slave(updates[2], None)
+        # the moment is applied once to the sum of 3 updates
+        self.assertTrue((gd.weights.mem == 6.5).all())
+        self.assertTrue((gd.bias.mem == 6.5).all())
+        self.assertTrue((gd.gradient_weights_with_moment.mem == 6.5).all())
+
+        gd = self._gd_master(aggregate_updates=100, aggregate_timeout=0.01)
+        gd.apply_data_from_slave(updates[0], None)
+        gd.generate_data_for_slave(None)
+        self.assertFalse(gd.weights.mem.any())
+        time.sleep(0.02)
+        gd.generate_data_for_slave(None)
+        self.assertTrue((gd.weights.mem == 1.5).all())
+
+    def test_backup_workers(self):
+        gd = self._gd_master(backup_workers=1)
+        slaves = [Slave(i) for i in range(3)]
+
+        def step():
+            for slave in slaves:
+                gd.generate_data_for_slave(slave)
+
+        def update(value):
+            return (numpy.full((3, 4), value, dtype=numpy.float32),
+                    numpy.full(3, value, dtype=numpy.float32))
+
+        step()
+        self.assertEqual(gd.quorum, 2)
+        gd.apply_data_from_slave(update(1), slaves[0])
+        self.assertFalse(gd.weights.mem.any())
+        self.assertFalse(gd.has_data_for_slave)
+        gd.apply_data_from_slave(update(2), slaves[1])
+        self.assertTrue(gd.has_data_for_slave)
+        self.assertEqual(gd.aggregation_step, 1)
+        self.assertTrue((gd.weights.mem == 3.5).all())
+        # the straggler's update is discarded
+        gd.apply_data_from_slave(update(4), slaves[2])
+        self.assertTrue((gd.weights.mem == 3.5).all())
+
+        gd.late_update_weight = 0.5
+        step()
+        gd.apply_data_from_slave(update(1), slaves[0])
+        gd.apply_data_from_slave(update(1), slaves[1])
+        self.assertTrue((gd.weights.mem == 7.25).all())
+        # slave 2 gets the next job before it reports
+        step()
+        gd.apply_data_from_slave(update(4), slaves[2])
+        self.assertTrue((gd.weights.mem == 7.25).all())
+        gd.apply_data_from_slave(update(1), slaves[0])
+        gd.apply_data_from_slave(update(1), slaves[1])
+        # the late update of slave 2 is folded into step 3 with weight 0.5
+        self.assertTrue((gd.gradient_weights_with_moment.mem == 5.875).all())
+        self.assertTrue((gd.weights.mem == 13.125).all())
+        self.assertEqual(gd.slave_latencies[2].sum(), 2)
+        self.assertEqual(gd.latency_quantile(0.9), gd.LATENCY_BINS[0])
+
+        step()
+        gd.apply_data_from_slave(update(1), slaves[0])
+        gd.drop_slave(slaves[1])
+        self.assertEqual(gd.aggregation_step, 4)
+        self.assertNotIn(1, gd._slave_jobs_)
+
+    def test_backup_workers_idle_slave(self):
+        gd = self._gd_master(backup_workers=1)
+        slaves = [Slave(i) for i in range(4)]
+        update = (numpy.ones((3, 4), dtype=numpy.float32),
+                  numpy.ones(3, dtype=numpy.float32))
+        for slave in slaves:
+            gd.generate_data_for_slave(slave)
+        for slave in slaves[:3]:
+            gd.apply_data_from_slave(update, slave)
+        self.assertEqual(gd.aggregation_step, 1)
+        # slave 3 is the straggler
+        for slave in slaves[:3]:
+            gd.generate_data_for_slave(slave)
+        self.assertEqual(gd.quorum, 2)
+        gd.apply_data_from_slave(update, slaves[0])
+        self.assertFalse(gd.has_data_for_slave)
+        gd.apply_data_from_slave(update, slaves[3])
+        # slave 3 is idle now and is refused until the step completes,
+        # but it does not count towards the quorum
+        self.assertFalse(gd.has_data_for_slave)
+        self.assertEqual(gd.quorum, 2)
+        gd.apply_data_from_slave(update, slaves[1])
+        self.assertEqual(gd.aggregation_step, 2)
+        self.assertTrue(gd.has_data_for_slave)
+        gd.generate_data_for_slave(slaves[3])
+        self.assertEqual(gd.quorum, 1)
+
+    def test_local_sgd(self):
+        master = self._gd_master(local_steps=4)
+        master.weights.mem[:] = 1
+        slaves = [self._gd_master(local_steps=4) for _ in range(2)]
+        ids = [Slave(i) for i in range(2)]
+        syncs = deltas = 0
+        for _ in range(8):
+            for index, slave in enumerate(slaves):
+                data = master.generate_data_for_slave(ids[index])
+                syncs += data[6] is not None
+                slave.apply_data_from_master(data)
+                # the local training
+                slave.weights.mem += index + 1
+                delta = slave.generate_data_for_master()
+                deltas += delta is not None
+                master.apply_data_from_slave(delta, ids[index])
+        self.assertEqual(syncs, 4)
+        self.assertEqual(deltas, 4)
+        # the average of the slaves' models
+        self.assertTrue((master.weights.mem == 13).all())
+        for slave in slaves:
+            self.assertTrue((slave.weights.mem ==
+                             7 + 4 * (slaves.index(slave) + 1)).all())
+            # the own moment is kept
+            self.assertTrue((slave.gradient_weights_with_moment.mem ==
+                             1).all())
+        fwd = TrivialForward(self.parent, local_steps=4)
+        self.assertIsNone(fwd.generate_data_for_slave(ids[0]))
+        fwd.weights.reset(numpy.ones((3, 4), dtype=numpy.float32))
+        # the export still gets the weights
+        self.assertIs(fwd.generate_data_for_slave(None)[0], fwd.weights.mem)
+        # the forward unit follows the gradient descent unit
+        fwd = TrivialForward(self.parent)
+        fwd.weights = master.weights
+        fwd.link_from(self.parent.start_point)
+        master.link_from(fwd)
+        master.link_local_steps()
+        self.assertEqual(fwd.local_steps, 4)
+        self.assertIsNone(fwd.generate_data_for_slave(ids[0]))
+
+        master = self._gd_master(local_steps=4, adaptive_local_steps=True)
+        master.generate_data_for_slave(ids[0])
+        master.apply_data_from_slave(
+            {"weights": numpy.zeros((3, 4)), "comm_ratio": 2.0}, ids[0])
+        syncs = [master.generate_data_for_slave(ids[0])[6]
+                 for _ in range(4)]
+        self.assertEqual(syncs[:3], [None] * 3)
+        self.assertEqual(syncs[3]["local_steps"], 8)
+
     def test_nnsnapshotter(self):
         nns = NNSnapshotterToFile(self.parent)
         nns.suffix = "suffix"
         nns.initialize()
         nns.run()
 
+    def _workflow(self, shapes):
+        wf = NNWorkflow(self.parent)
+        for shape in shapes:
+            fwd = TrivialForward(wf)
+            if shape is not None:
+                fwd.weights.reset(prng.get().rand(*shape).astype(
+                    numpy.float32))
+                fwd.bias.reset(prng.get().rand(shape[0]))
+            wf.forwards.append(fwd)
+        return wf
+
+    def test_export_mapped(self):
+        shapes = ((3, 5), None, (7, 3))
+        src = self._workflow(shapes)
+        dirname = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(dirname, "model.json")
+            src.export_mapped(file_name)
+            dst = self._workflow((None,) * len(shapes))
+            manifest = dst.load_mapped(file_name)
+            for desc in manifest["units"]:
+                for arr in desc["arrays"].values():
+                    self.assertEqual(arr["offset"] % MAPPED_EXPORT_ALIGNMENT,
+                                     0)
+            for fsrc, fdst in zip(src.forwards, dst.forwards):
+                for attr in "weights", "bias":
+                    arr = getattr(fsrc, attr)
+                    if not arr:
+                        self.assertFalse(getattr(fdst, attr))
+                        continue
+                    mem = getattr(fdst, attr).mem
+                    self.assertIsInstance(mem, numpy.memmap)
+                    self.assertEqual(mem.dtype, arr.mem.dtype)
+                    self.assertTrue((mem == arr.mem).all())
+            self.assertRaises(ValueError, dst.forwards[0].weights.mem.fill,
+                              0)
+            del dst
+        finally:
+            shutil.rmtree(dirname)
+
+    def test_weights_delta(self):
+        master = TrivialForward(self.parent, weights_history=2)
+        master.weights.reset(prng.get().rand(10, 20).astype(numpy.float32))
+        master.bias.reset(prng.get().rand(10).astype(numpy.float32))
+        slaves = [TrivialForward(self.parent) for _ in range(2)]
+
+        def job(index):
+            data = pickle.loads(pickle.dumps(
+                master.generate_data_for_slave(Slave(index))))
+            slaves[index].apply_data_from_master(data)
+            for attr in "weights", "bias":
+                self.assertTrue((getattr(slaves[index], attr).mem ==
+                                 getattr(master, attr).mem).all())
+            return data
+
+        for index in range(2):
+            data = job(index)
+            self.assertIsNone(data["base"])
+            self.assertIsInstance(data["weights"], numpy.ndarray)
+        data = job(0)
+        self.assertEqual(data["base"], data["version"])
+        self.assertIsNone(data["weights"])
+        self.assertIsNone(data["bias"])
+
+        master.weights.mem[3, 4:7] += 1
+        data = job(0)
+        self.assertEqual(data["version"], data["base"] + 1)
+        self.assertEqual(data["weights"][0].tolist(), [64, 65, 66])
+        self.assertIsNone(data["bias"])
+        master.weights.mem += 1
+        data = job(0)
+        self.assertIsInstance(data["weights"], numpy.ndarray)
+
+        # slave 1 is 2 versions behind, which is more than weights_history
+        data = job(1)
+        self.assertIsNone(data["base"])
+        self.assertIsInstance(data["bias"], numpy.ndarray)
+        master.drop_slave(Slave(1))
+        self.assertIsNone(job(1)["base"])
+        # the forward workflow extraction gets the full tensors
+        weights, bias = master.generate_data_for_slave(None)
+        self.assertIs(weights, master.weights.mem)
+        self.assertIs(bias, master.bias.mem)
+        self.assertRaises(ValueError, slaves[0].apply_data_from_master,
+                          dict(data, base=1))
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
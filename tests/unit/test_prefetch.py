@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Unit test and benchmark of the minibatch prefetching.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy
+
+import veles.prng as prng
+from veles.tests import AcceleratedTest, assign_backend
+from veles.znicz.loader.imagenet_pickle_loader import ImagenetLoader
+from veles.znicz.loader.prefetch import MinibatchPrefetcher
+
+
+class TestMinibatchPrefetcher(unittest.TestCase):
+    BATCH = 8
+    IO_DELAY = 0.01
+
+    def fill(self, indices, minibatch_class, data, labels, shift=0):
+        # simulates reading and decoding
+        time.sleep(self.IO_DELAY)
+        data[:len(indices)] = indices[:, numpy.newaxis] * 10 + shift
+        labels[:len(indices)] = minibatch_class
+
+    def setUp(self):
+        self.data = numpy.zeros((self.BATCH, 3))
+        self.labels = numpy.zeros(self.BATCH, dtype=numpy.int32)
+        self.shuffled = numpy.random.RandomState(1234).permutation(64)
+
+    def window(self, offset):
+        return self.shuffled[offset:offset + self.BATCH]
+
+    def test_fetch(self):
+        prefetcher = MinibatchPrefetcher(
+            self.fill, self.data, self.labels, depth=2, workers=2).start()
+        try:
+            self.assertTrue(prefetcher.schedule(0, self.window(0), 2))
+            self.assertTrue(prefetcher.schedule(8, self.window(8), 2))
+            self.assertFalse(prefetcher.schedule(16, self.window(16), 2))
+            self.assertTrue(prefetcher.fetch(self.window(0), 2, self.data,
+                                             self.labels))
+            self.assertTrue((self.data[:, 0] == self.window(0) * 10).all())
+            self.assertTrue((self.labels == 2).all())
+            self.assertFalse(prefetcher.schedule(8, self.window(8), 2))
+            # reshuffled
+            self.shuffled = self.shuffled[::-1]
+            self.assertFalse(prefetcher.fetch(self.window(8), 2, self.data,
+                                              self.labels))
+            self.assertEqual(prefetcher.pending_keys, [])
+            self.assertTrue(prefetcher.schedule(8, self.window(8), 1))
+            self.assertFalse(prefetcher.fetch(self.window(8), 2, self.data,
+                                              self.labels))
+            self.assertEqual((prefetcher.hits, prefetcher.misses), (1, 2))
+        finally:
+            prefetcher.stop()
+
+    def test_params(self):
+        prefetcher = MinibatchPrefetcher(
+            self.fill, self.data, self.labels, depth=2).start()
+        try:
+            self.assertTrue(prefetcher.schedule(0, self.window(0), 2, (1,)))
+            self.assertFalse(prefetcher.fetch(self.window(0), 2, self.data,
+                                              self.labels, (3,)))
+            self.assertTrue(prefetcher.schedule(0, self.window(0), 2, (1,)))
+            self.assertTrue(prefetcher.schedule(8, self.window(8), 2, (2,)))
+            self.assertTrue(prefetcher.fetch(self.window(8), 2, self.data,
+                                             self.labels, (2,)))
+            self.assertTrue((self.data[:, 0] == self.window(8) * 10 + 2)
+                            .all())
+        finally:
+            prefetcher.stop()
+
+    def _benchmark(self, prefetcher, batches, compute_delay):
+        loader_time = 0
+        for index in range(batches):
+            offset = (index * self.BATCH) % len(self.shuffled)
+            start = time.time()
+            indices = self.window(offset)
+            if prefetcher is None or not prefetcher.fetch(
+                    indices, 2, self.data, self.labels):
+                self.fill(indices, 2, self.data, self.labels)
+            if prefetcher is not None:
+                for ahead in range(1, prefetcher.depth + 1):
+                    next_offset = (offset + ahead * self.BATCH) % \
+                        len(self.shuffled)
+                    prefetcher.schedule(next_offset, self.window(next_offset),
+                                        2)
+            loader_time += time.time() - start
+            self.assertTrue((self.data[:, 0] == indices * 10).all())
+            # simulates the forward and backward propagation
+            time.sleep(compute_delay)
+        return batches * self.BATCH / loader_time
+
+    def test_benchmark(self):
+        batches = 20
+        serial = self._benchmark(None, batches, self.IO_DELAY)
+        prefetcher = MinibatchPrefetcher(
+            self.fill, self.data, self.labels, depth=2, workers=2).start()
+        try:
+            prefetched = self._benchmark(prefetcher, batches, self.IO_DELAY)
+        finally:
+            prefetcher.stop()
+        logging.info("Loader throughput: %.0f samples/sec serial, "
+                     "%.0f samples/sec with prefetching", serial, prefetched)
+        self.assertEqual(prefetcher.misses, 1)
+        self.assertGreater(prefetched, serial)
+
+
+@assign_backend("numpy")
+class TestImagenetLoaderPrefetch(AcceleratedTest):
+    SIZE = 8
+    CROP = 5
+    CLASS_LENGTHS = {"test": 4, "val": 3, "train": 13}
+
+    def setUp(self):
+        super(TestImagenetLoaderPrefetch, self).setUp()
+        self.data_dir = tempfile.mkdtemp()
+        count = sum(self.CLASS_LENGTHS.values())
+        random = numpy.random.RandomState(1234)
+        random.randint(0, 256, (count, self.SIZE, self.SIZE, 3)).astype(
+            numpy.uint8).tofile(self.path("samples.dat"))
+        with open(self.path("labels.pickle"), "wb") as fout:
+            pickle.dump(list(random.randint(1, 10, count)), fout)
+        with open(self.path("count.json"), "w") as fout:
+            json.dump(self.CLASS_LENGTHS, fout)
+        with open(self.path("matrixes.pickle"), "wb") as fout:
+            pickle.dump([random.rand(self.SIZE, self.SIZE, 3) * 255,
+                         random.rand(self.SIZE, self.SIZE, 3) + 0.5], fout)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+        super(TestImagenetLoaderPrefetch, self).tearDown()
+
+    def path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def serve(self, minibatches, prefetch_depth):
+        prng.get().seed(1234)
+        loader = ImagenetLoader(
+            self.parent, minibatch_size=3, sx=self.SIZE, sy=self.SIZE,
+            crop_size_sx=self.CROP, crop_size_sy=self.CROP, mirror=True,
+            apply_rdisp=True, prefetch_depth=prefetch_depth,
+            prefetch_workers=2,
+            original_labels_filename=self.path("labels.pickle"),
+            count_samples_filename=self.path("count.json"),
+            matrixes_filename=self.path("matrixes.pickle"),
+            samples_filename=self.path("samples.dat"))
+        loader.initialize(device=self.device, snapshot=False)
+        served = []
+        try:
+            for _ in range(minibatches):
+                loader.run()
+                served.append((loader.minibatch_class,
+                               loader.minibatch_indices.mem.copy(),
+                               loader.minibatch_data.mem.copy(),
+                               loader.minibatch_labels.mem.copy()))
+        finally:
+            if loader._prefetcher_ is not None:
+                loader._prefetcher_.stop()
+        return served, loader
+
+    def test_deterministic(self):
+        # 3 epochs of 8 minibatches each
+        minibatches = 24
+        expected, _ = self.serve(minibatches, 0)
+        actual, loader = self.serve(minibatches, 2)
+        self.assertGreater(loader._prefetcher_.hits, minibatches // 2)
+        self.assertGreater(loader.epoch_number, 0)
+        for index, (exp, act) in enumerate(zip(expected, actual)):
+            self.assertEqual(exp[0], act[0])
+            for exp_array, act_array in zip(exp[1:], act[1:]):
+                self.assertTrue(numpy.array_equal(exp_array, act_array),
+                                "Minibatch %d differs" % index)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
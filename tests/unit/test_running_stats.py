@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Tests the streaming statistics of the datasets.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import logging
+import pickle
+import unittest
+
+import numpy
+
+from veles.znicz.loader.running_stats import RunningStatistics
+
+
+class TestRunningStatistics(unittest.TestCase):
+    def setUp(self):
+        self.samples = numpy.random.randint(
+            0, 256, (300, 4, 5, 3)).astype(numpy.uint8)
+
+    def test_merge(self):
+        first = RunningStatistics((4, 5, 3)).update_batches(
+            self.samples[:100], 7)
+        second = RunningStatistics((4, 5, 3)).update_batches(
+            self.samples[100:], 64)
+        first.merge(pickle.loads(pickle.dumps(second)))
+        self.assertEqual(first.mean().dtype, numpy.float32)
+        self.assertLess(numpy.fabs(
+            first.mean(numpy.float64) - self.samples.mean(axis=0)).max(),
+            1e-9)
+        self.assertLess(numpy.fabs(
+            first.variance(numpy.float64) - self.samples.var(axis=0)).max(),
+            1e-6)
+        self.assertTrue((first.range() == self.samples.max(axis=0) -
+                         self.samples.min(axis=0)).all())
+
+    def test_stability(self):
+        samples = 1e9 + numpy.random.rand(10000, 3)
+        stats = RunningStatistics((3,)).update_batches(samples, 100)
+        self.assertLess(numpy.fabs(
+            stats.variance(numpy.float64) - samples.var(axis=0)).max(),
+            1e-6)
+
+    def test_region(self):
+        stats = RunningStatistics((4, 4))
+        stats.update(numpy.ones((2, 2, 3)), (slice(1, 3), slice(1, 4)))
+        stats.update(numpy.full((1, 4, 4), 3.0))
+        self.assertEqual(stats.count[0, 0], 1)
+        self.assertEqual(stats.count[1, 1], 3)
+        self.assertAlmostEqual(stats.mean()[1, 1], 5.0 / 3)
+        self.assertEqual(stats.mean()[0, 0], 3)
+        self.assertEqual(stats.range()[2, 3], 2)
+        restored = RunningStatistics.from_dict(stats.to_dict())
+        self.assertTrue((restored.variance() == stats.variance()).all())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
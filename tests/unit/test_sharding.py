@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+.. invisible:
+     _   _ _____ _     _____ _____
+    | | | |  ___| |   |  ___/  ___|
+    | | | | |__ | |   | |__ \ `--.
+    | | | |  __|| |   |  __| `--. \
+    \ \_/ / |___| |___| |___/\__/ /
+     \___/\____/\_____|____/\____/
+
+Created on Oct 18, 2026
+
+Tests of the parameters sharding.
+
+███████████████████████████████████████████████████████████████████████████████
+
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing,
+software distributed under the License is distributed on an
+"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+KIND, either express or implied.  See the License for the
+specific language governing permissions and limitations
+under the License.
+
+███████████████████████████████████████████████████████████████████████████████
+"""
+
+
+import logging
+from multiprocessing import Pipe, Process
+import unittest
+
+import numpy
+
+from veles.memory import Array
+from veles.znicz.gradient_compression import TopKCompressor
+from veles.znicz.sharding import gradient_units, ParameterShard, ShardPlan
+
+
+SHAPES = [((300, 100), (300,)), ((50, 300), (50,)), ((10, 50), (10,)),
+          ((20, 20), None)]
+STEPS = 50
+
+
+def _shard(conn, plan, index, params):
+    """Plays the master shard.
+    """
+    shard = ParameterShard(plan, index, params, gradient_moment=0.9)
+    while True:
+        command, data = conn.recv()
+        if command == "weights":
+            conn.send(shard.generate_data_for_slave())
+        elif command == "update":
+            shard.apply_data_from_slave(data)
+        else:
+            conn.send(shard.version)
+            break
+    conn.close()
+
+
+class Unit(object):
+    def __init__(self, weights=None, bias=None):
+        self.weights = Array(numpy.zeros(weights)) if weights else Array()
+        self.bias = Array(numpy.zeros(bias)) if bias else Array()
+
+
+class Workflow(object):
+    """The layers with weights, a pooling and the last layer without GD.
+    """
+    def __init__(self):
+        self.forwards = [Unit(w, b) for w, b in SHAPES]
+        self.forwards.insert(2, Unit())
+        self.gds = [Unit() for _ in self.forwards[:-1]]
+        for gd, f in zip(self.gds, self.forwards):
+            gd.weights = f.weights
+
+
+class TestShardPlan(unittest.TestCase):
+    def test_assignment(self):
+        plan = ShardPlan(SHAPES, 3)
+        self.assertEqual(plan, ShardPlan(SHAPES, 3))
+        self.assertEqual(len(plan.slices), len(SHAPES))
+        self.assertEqual(plan.shards_of(0), [0])
+        self.assertEqual(plan.loads, [30000, 15000, 900])
+
+    def test_slicing(self):
+        plan = ShardPlan(SHAPES, 3, max_slice_size=5000)
+        self.assertNotEqual(plan, ShardPlan(SHAPES, 3))
+        self.assertEqual(sorted(plan.shards_of(0)), [0, 1, 2])
+        self.assertLessEqual(max(plan.loads) - min(plan.loads), 5000)
+        for unit, (wshape, _) in enumerate(SHAPES):
+            rows = []
+            for piece in plan.slices:
+                if piece.unit == unit:
+                    self.assertLessEqual(
+                        (piece.stop - piece.start) * wshape[1], 5000)
+                    rows.extend(range(piece.start, piece.stop))
+            self.assertEqual(rows, list(range(wshape[0])))
+        self.assertRaises(ValueError, ShardPlan, SHAPES, 0)
+
+    def test_split_merge(self):
+        plan = ShardPlan(SHAPES, 3, max_slice_size=5000)
+        params = [(numpy.random.rand(*w), numpy.random.rand(*b)
+                   if b is not None else None) for w, b in SHAPES]
+        parts = plan.split(params)
+        self.assertEqual(sum(len(p) for p in parts), len(plan.slices))
+        merged = plan.merge(parts)
+        for (w, b), (mw, mb) in zip(params, merged):
+            self.assertTrue((w == mw).all())
+            if b is None:
+                self.assertIsNone(mb)
+            else:
+                self.assertTrue((b == mb).all())
+        params[1] = None
+        self.assertFalse(any(key[0] == 1 for part in plan.split(params)
+                             for key in part))
+        params[0] = TopKCompressor(k=10).compress(
+            "weights", numpy.random.rand(300, 100)), None
+        self.assertRaises(ValueError, plan.split, params)
+
+    def test_from_workflow(self):
+        workflow = Workflow()
+        self.assertEqual(ShardPlan.from_workflow(workflow, 2),
+                         ShardPlan(SHAPES, 2))
+        gds = gradient_units(workflow)
+        self.assertEqual(gds[:2], workflow.gds[:2])
+        self.assertIs(gds[2], workflow.gds[3])
+        self.assertIsNone(gds[3])
+
+
+class TestShardProcesses(unittest.TestCase):
+    def _train(self, plan, send, receive):
+        """Plays the slave: the update pulls the weights to the target.
+        """
+        prng = numpy.random.RandomState(42)
+        targets = [(prng.rand(*w), prng.rand(*b) if b is not None else None)
+                   for w, b in SHAPES]
+        for _ in range(STEPS):
+            weights = plan.merge(receive())
+            updates = [(-0.1 * (w - tw), -0.1 * (b - tb) if b is not None
+                        else None)
+                       for (w, b), (tw, tb) in zip(weights, targets)]
+            send(plan.split(updates))
+        return plan.merge(receive()), targets
+
+    def test_processes(self):
+        params = [(numpy.zeros(w), numpy.zeros(b) if b is not None else None)
+                  for w, b in SHAPES]
+        reference_plan = ShardPlan(SHAPES, 1)
+        reference = ParameterShard(reference_plan, 0, params,
+                                   gradient_moment=0.9)
+
+        def apply_reference(parts):
+            reference.apply_data_from_slave(parts[0])
+
+        expected, targets = self._train(
+            reference_plan, apply_reference,
+            lambda: [reference.generate_data_for_slave()])
+
+        plan = ShardPlan(SHAPES, 3, max_slice_size=5000)
+        conns = []
+        shards = []
+        for index in range(plan.shards):
+            conn, child_conn = Pipe()
+            shard = Process(target=_shard,
+                            args=(child_conn, plan, index, params))
+            shard.start()
+            conns.append(conn)
+            shards.append(shard)
+
+        def send(parts):
+            for conn, part in zip(conns, parts):
+                conn.send(("update", part))
+
+        def receive():
+            for conn in conns:
+                conn.send(("weights", None))
+            return [conn.recv() for conn in conns]
+
+        try:
+            weights, _ = self._train(plan, send, receive)
+            versions = []
+            for conn in conns:
+                conn.send(("stop", None))
+                versions.append(conn.recv())
+        finally:
+            for shard in shards:
+                shard.join()
+        self.assertEqual(versions, [STEPS] * plan.shards)
+        for (w, b), (ew, eb), (tw, _) in zip(weights, expected, targets):
+            self.assertTrue(numpy.allclose(w, ew))
+            self.assertLess(numpy.fabs(w - tw).max(), 0.1)
+            if eb is not None:
+                self.assertTrue(numpy.allclose(b, eb))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
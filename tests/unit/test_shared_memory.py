@@ -0,0 +1,86 @@
+
+
+import logging
+from multiprocessing import Pipe, Process
+import os
+import pickle
+import unittest
+
+import numpy
+
+from veles.znicz.shared_memory import share, unshare, SharedArray, \
+    SharedMemoryTransport
+
+
+def _slave(conn):
+    """Plays the slave: maps the weights from the master and sends back
+    the gradient.
+    """
+    data = unshare(conn.recv())
+    weights = data["weights"]
+    weights += 1  # copy-on-write
+    conn.send(share((weights * 2, data["bias"], os.getpid())))
+    conn.close()
+
+
+class TestSharedMemory(unittest.TestCase):
+    def setUp(self):
+        self.weights = numpy.random.rand(300, 200).astype(numpy.float32)
+        self.bias = numpy.random.rand(10).astype(numpy.float32)
+
+    def test_pack(self):
+        transport = SharedMemoryTransport()
+        data = transport.pack({"weights": self.weights, "bias": self.bias,
+                               "list": [self.weights], "version": 3})
+        self.assertIsInstance(data["weights"], SharedArray)
+        self.assertIsInstance(data["list"], list)
+        self.assertIsInstance(data["list"][0], SharedArray)
+        # small arrays are passed as is
+        self.assertIs(data["bias"], self.bias)
+        self.assertEqual(transport.shared_bytes, self.weights.nbytes * 2)
+        self.assertLess(len(pickle.dumps(data)),
+                        self.bias.nbytes + 1024)
+        paths = [data["weights"].path, data["list"][0].path]
+        for path in paths:
+            self.assertTrue(os.path.exists(path))
+        data = SharedMemoryTransport.unpack(pickle.loads(pickle.dumps(data)))
+        self.assertTrue((data["weights"] == self.weights).all())
+        self.assertTrue((data["list"][0] == self.weights).all())
+        self.assertEqual(data["version"], 3)
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
+        self.assertIs(unshare(self.bias), self.bias)
+
+    def test_cleanup(self):
+        transport = SharedMemoryTransport()
+        shared = transport.pack(self.weights)
+        transport.cleanup()
+        self.assertFalse(os.path.exists(shared.path))
+
+    def test_other_host(self):
+        transport = SharedMemoryTransport()
+        shared = transport.pack(self.weights)
+        shared.host = "elsewhere/0"
+        try:
+            self.assertRaises(ValueError, shared.open)
+        finally:
+            transport.cleanup()
+
+    def test_processes(self):
+        conn, child_conn = Pipe()
+        slave = Process(target=_slave, args=(child_conn,))
+        slave.start()
+        try:
+            conn.send(share({"weights": self.weights, "bias": self.bias}))
+            gradient, bias, pid = unshare(conn.recv())
+        finally:
+            slave.join()
+        self.assertEqual(pid, slave.pid)
+        self.assertIsInstance(gradient, numpy.memmap)
+        self.assertTrue((gradient == (self.weights + 1) * 2).all())
+        self.assertTrue((bias == self.bias).all())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()